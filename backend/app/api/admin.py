@@ -13,7 +13,9 @@ from ..models.telegram_user import TelegramUser
 from ..models.financial import Transacao, Cartao, Conta, Categoria
 from ..core.security import get_current_admin_user
 from ..core.config import settings
-from ..services.telegram_service import TelegramService
+from ..models.telegram_outbox import TelegramBroadcast
+from ..services.telegram_broadcast_service import TelegramBroadcastService
+from ..services.rollup_service import RollupService
 
 logger = logging.getLogger(__name__)
 
@@ -249,6 +251,7 @@ async def delete_user(
             if outros_usuarios == 0:
                 # Excluir todos os dados do tenant
                 db.query(Transacao).filter(Transacao.tenant_id == tenant_id).delete()
+                RollupService.remover_tenant(db, tenant_id)
                 db.query(Cartao).filter(Cartao.tenant_id == tenant_id).delete()
                 db.query(Conta).filter(Conta.tenant_id == tenant_id).delete()
                 db.query(Categoria).filter(Categoria.tenant_id == tenant_id).delete()
@@ -307,6 +310,7 @@ async def delete_tenant(
         
         # Excluir todos os dados relacionados
         db.query(Transacao).filter(Transacao.tenant_id == tenant_id).delete()
+        RollupService.remover_tenant(db, tenant_id)
         db.query(Cartao).filter(Cartao.tenant_id == tenant_id).delete()
         db.query(Conta).filter(Conta.tenant_id == tenant_id).delete()
         db.query(Categoria).filter(Categoria.tenant_id == tenant_id).delete()
@@ -573,9 +577,9 @@ async def send_broadcast_message(
             # Apenas usuários específicos
             query = query.filter(TelegramUser.user_id.in_(target_users))
         
-        telegram_users = query.all()
+        chat_ids = [telegram_id for (telegram_id,) in query.with_entities(TelegramUser.telegram_id).all()]
         
-        if not telegram_users:
+        if not chat_ids:
             return {
                 "success": False,
                 "message": "Nenhum usuário conectado encontrado para enviar a mensagem",
@@ -584,45 +588,44 @@ async def send_broadcast_message(
             }
         
         # Preparar mensagem com cabeçalho administrativo
+        data_envio = datetime.now().strftime('%d/%m/%Y às %H:%M')
         admin_message = f"""🔔 **Mensagem da Administração - FinançasAI**
 
 {message}
 
 ---
-_Data: {datetime.now().strftime('%d/%m/%Y às %H:%M')}_"""
+_Data: {data_envio}_"""
         
-        # Inicializar serviço do Telegram
-        telegram_service = TelegramService()
-        
-        # Enviar mensagens
-        enviadas = 0
-        falharam = 0
-        
-        for telegram_user in telegram_users:
-            try:
-                success = await telegram_service.send_message(
-                    telegram_user.telegram_id, 
-                    admin_message
-                )
-                if success:
-                    enviadas += 1
-                else:
-                    falharam += 1
-            except Exception as e:
-                logger.error(f"Erro ao enviar mensagem para {telegram_user.telegram_id}: {e}")
-                falharam += 1
+        # Versão sem formatação, enviada se o Telegram recusar o Markdown da mensagem
+        fallback_message = f"""🔔 Mensagem da Administração - FinançasAI
+
+{message}
+
+---
+Data: {data_envio}"""
+        
+        # Enfileirar no outbox: o despachante envia respeitando os limites do Telegram
+        broadcast = TelegramBroadcastService.criar(
+            db,
+            mensagem=message,
+            texto=admin_message,
+            chat_ids=chat_ids,
+            target_type=target_type,
+            criado_por=current_admin.email,
+            texto_fallback=fallback_message
+        )
         
         # Log da ação
-        logger.info(f"Admin {current_admin.email} enviou broadcast: {enviadas} enviadas, {falharam} falharam")
+        logger.info(f"Admin {current_admin.email} enfileirou broadcast {broadcast.id} para {broadcast.total_destinatarios} usuários")
         
         return {
             "success": True,
-            "message": f"Mensagem broadcast enviada com sucesso",
-            "enviadas": enviadas,
-            "falharam": falharam,
-            "total_usuarios": len(telegram_users)
+            "message": "Mensagem broadcast enfileirada para envio",
+            **TelegramBroadcastService.progresso(db, broadcast)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao enviar broadcast: {e}")
         raise HTTPException(
@@ -630,6 +633,22 @@ _Data: {datetime.now().strftime('%d/%m/%Y às %H:%M')}_"""
             detail="Erro interno do servidor"
         )
 
+@router.get("/telegram/broadcast/{broadcast_id}")
+async def get_broadcast_status(
+    broadcast_id: int,
+    current_admin: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Progresso de um broadcast (enviadas, falharam, pendentes)"""
+    broadcast = db.query(TelegramBroadcast).filter(TelegramBroadcast.id == broadcast_id).first()
+    if not broadcast:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Broadcast não encontrado"
+        )
+    
+    return TelegramBroadcastService.progresso(db, broadcast)
+
 @router.get("/telegram/users")
 async def get_telegram_users(
     current_admin: User = Depends(get_current_admin_user),
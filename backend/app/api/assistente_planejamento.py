@@ -8,7 +8,8 @@ from ..schemas.financial import CategoriaCreate
 from ..core.security import get_current_tenant_user
 from ..models.user import User
 from ..core.config import settings
-from openai import OpenAI
+from ..core.openai_client import ClienteOpenAI
+from ..services.entidades_cache import EntidadesCache
 import json
 import re
 from datetime import datetime
@@ -136,7 +137,8 @@ class AssistentePlanejamentoService:
         self.tenant_id = tenant_id
         self.client = None
         if settings.OPENAI_API_KEY:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            # Rotas síncronas (threadpool do FastAPI): cliente síncrono compartilhado
+            self.client = ClienteOpenAI.sincrono()
 
     def determinar_classe_social(self, renda: float) -> str:
         """Determina a classe social baseada na renda"""
@@ -504,6 +506,8 @@ Responda APENAS com o JSON válido, sem comentários adicionais.
                 ids_criados.append(nova_categoria.id)
         
         self.db.commit()
+        if ids_criados:
+            EntidadesCache.invalidar(user.tenant_id)
         return ids_criados
 
 @router.post("/analisar")
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, extract
-from typing import List
+from sqlalchemy import and_, extract, case, func
+from typing import List, Dict
 from datetime import datetime, date
 from ..database import get_db
 from ..models.financial import Cartao, Transacao, Conta, CompraParcelada, ParcelaCartao, Fatura
@@ -10,81 +10,52 @@ from ..core.security import get_current_tenant_user
 from ..models.user import User
 from ..models.financial import TipoTransacao
 from ..services.fatura_service import FaturaService
+from ..services.rollup_service import RollupService
+from ..services.entidades_cache import EntidadesCache
 
 router = APIRouter()
 
-def calcular_fatura_cartao(cartao: Cartao, db: Session) -> FaturaInfo:
-    """Calcular informações da fatura do cartão com lógica correta de fechamento"""
-    hoje = date.today()
-    hoje_datetime = datetime.combine(hoje, datetime.min.time())
-    
+def _periodo_fatura(cartao: Cartao, hoje: date) -> dict:
+    """Janela da fatura mais relevante do cartão (período, busca, vencimento e status)"""
     # Definir dia de fechamento
     dia_fechamento = cartao.dia_fechamento or (cartao.vencimento - 5 if cartao.vencimento and cartao.vencimento > 5 else 25)
     
+    # Período: do fechamento do mês passado até fechamento deste mês
+    if hoje.month == 1:
+        inicio_periodo = date(hoje.year - 1, 12, dia_fechamento + 1)
+    else:
+        inicio_periodo = date(hoje.year, hoje.month - 1, dia_fechamento + 1)
+    
+    fim_periodo = date(hoje.year, hoje.month, dia_fechamento)
+    
+    # Vencimento: próximo mês
+    mes_venc = hoje.month + 1 if hoje.month < 12 else 1
+    ano_venc = hoje.year if hoje.month < 12 else hoje.year + 1
+    data_vencimento = date(ano_venc, mes_venc, cartao.vencimento)
+    
     # LÓGICA CORRIGIDA: Sempre mostrar a fatura mais relevante
     if hoje.day <= dia_fechamento:
-        # PERÍODO DE COMPRAS - Mostrar fatura atual (ainda aberta)
-        # Período: do fechamento do mês passado até fechamento deste mês
-        if hoje.month == 1:
-            inicio_periodo = date(hoje.year - 1, 12, dia_fechamento + 1)
-        else:
-            inicio_periodo = date(hoje.year, hoje.month - 1, dia_fechamento + 1)
-        
-        fim_periodo = date(hoje.year, hoje.month, dia_fechamento)
+        # PERÍODO DE COMPRAS - Mostrar fatura atual (ainda aberta), transações até hoje
         status_fatura = "ABERTA"
-        
-        # Vencimento: próximo mês
-        mes_venc = hoje.month + 1 if hoje.month < 12 else 1
-        ano_venc = hoje.year if hoje.month < 12 else hoje.year + 1
-        data_vencimento = date(ano_venc, mes_venc, cartao.vencimento)
-        
-        # Buscar transações até hoje
-        inicio_busca = inicio_periodo
         fim_busca = hoje
     else:
-        # PERÍODO DE PAGAMENTO - Mostrar fatura que fechou (precisa pagar)
-        # Período: do fechamento do mês passado até fechamento deste mês
-        if hoje.month == 1:
-            inicio_periodo = date(hoje.year - 1, 12, dia_fechamento + 1)
-        else:
-            inicio_periodo = date(hoje.year, hoje.month - 1, dia_fechamento + 1)
-        
-        fim_periodo = date(hoje.year, hoje.month, dia_fechamento)
-        
-        # Vencimento: próximo mês
-        mes_venc = hoje.month + 1 if hoje.month < 12 else 1
-        ano_venc = hoje.year if hoje.month < 12 else hoje.year + 1
-        data_vencimento = date(ano_venc, mes_venc, cartao.vencimento)
-        
-        # Verificar se já venceu
-        if hoje > data_vencimento:
-            status_fatura = "VENCIDA"
-        else:
-            status_fatura = "FECHADA"
-        
-        # Buscar transações do período completo (já fechou)
-        inicio_busca = inicio_periodo
+        # PERÍODO DE PAGAMENTO - Mostrar fatura que fechou (precisa pagar), período completo
+        status_fatura = "VENCIDA" if hoje > data_vencimento else "FECHADA"
         fim_busca = fim_periodo
     
-    # Buscar transações do período calculado
-    transacoes_periodo = db.query(Transacao).filter(
-        and_(
-            Transacao.cartao_id == cartao.id,
-            Transacao.data >= inicio_busca,
-            Transacao.data <= fim_busca,
-            Transacao.tipo == TipoTransacao.SAIDA
-        )
-    ).all()
-    
-    # Calcular valor total da fatura
-    valor_total_fatura = sum(transacao.valor for transacao in transacoes_periodo)
-    
-    # Calcular dias para vencimento
-    dias_para_vencimento = (data_vencimento - date.today()).days
-    
-    # Se já venceu, mostrar dias em atraso como número negativo
-    if dias_para_vencimento < 0:
-        dias_para_vencimento = abs(dias_para_vencimento) * -1
+    return {
+        "dia_fechamento": dia_fechamento,
+        "inicio_periodo": inicio_periodo,
+        "fim_periodo": fim_periodo,
+        "inicio_busca": inicio_periodo,
+        "fim_busca": fim_busca,
+        "data_vencimento": data_vencimento,
+        "status": status_fatura
+    }
+
+def _montar_fatura_info(cartao: Cartao, periodo: dict, valor_total_fatura: float) -> FaturaInfo:
+    # Calcular dias para vencimento (negativo = dias em atraso)
+    dias_para_vencimento = (periodo["data_vencimento"] - date.today()).days
     
     # Calcular percentual do limite usado
     percentual_limite_usado = (valor_total_fatura / cartao.limite * 100) if cartao.limite > 0 else 0
@@ -93,14 +64,64 @@ def calcular_fatura_cartao(cartao: Cartao, db: Session) -> FaturaInfo:
         valor_atual=valor_total_fatura,
         valor_total_mes=valor_total_fatura,
         dias_para_vencimento=dias_para_vencimento,
-        data_vencimento=datetime.combine(data_vencimento, datetime.min.time()),
+        data_vencimento=datetime.combine(periodo["data_vencimento"], datetime.min.time()),
         percentual_limite_usado=round(percentual_limite_usado, 2),
-        status=status_fatura,  # Adicionar status se não existe no modelo
-        periodo_inicio=inicio_periodo,
-        periodo_fim=fim_periodo,
-        dia_fechamento=dia_fechamento
+        status=periodo["status"],
+        periodo_inicio=periodo["inicio_periodo"],
+        periodo_fim=periodo["fim_periodo"],
+        dia_fechamento=periodo["dia_fechamento"]
     )
 
+def calcular_fatura_cartao(cartao: Cartao, db: Session) -> FaturaInfo:
+    """Calcular informações da fatura do cartão com lógica correta de fechamento"""
+    return calcular_faturas_cartoes([cartao], db)[cartao.id]
+
+def calcular_faturas_cartoes(cartoes: List[Cartao], db: Session) -> Dict[int, FaturaInfo]:
+    """
+    Calcular as faturas de vários cartões com uma única consulta agrupada
+    Cada cartão tem sua janela de datas; um CASE por cartão soma só o que cai na janela dele
+    Retorna {cartao_id: FaturaInfo}
+    """
+    if not cartoes:
+        return {}
+    
+    hoje = date.today()
+    periodos = {cartao.id: _periodo_fatura(cartao, hoje) for cartao in cartoes}
+    
+    valor_na_janela = case(
+        *[
+            (
+                and_(
+                    Transacao.cartao_id == cartao_id,
+                    Transacao.data >= periodo["inicio_busca"],
+                    Transacao.data <= periodo["fim_busca"]
+                ),
+                Transacao.valor
+            )
+            for cartao_id, periodo in periodos.items()
+        ],
+        else_=0.0
+    )
+    
+    totais = dict(
+        db.query(
+            Transacao.cartao_id,
+            func.coalesce(func.sum(valor_na_janela), 0.0)
+        ).filter(
+            and_(
+                Transacao.cartao_id.in_(list(periodos.keys())),
+                Transacao.data >= min(p["inicio_busca"] for p in periodos.values()),
+                Transacao.data <= max(p["fim_busca"] for p in periodos.values()),
+                Transacao.tipo == TipoTransacao.SAIDA
+            )
+        ).group_by(Transacao.cartao_id).all()
+    )
+    
+    return {
+        cartao.id: _montar_fatura_info(cartao, periodos[cartao.id], float(totais.get(cartao.id, 0) or 0))
+        for cartao in cartoes
+    }
+
 @router.post("/", response_model=CartaoResponse)
 def create_cartao(
     cartao_data: CartaoCreate,
@@ -162,6 +183,7 @@ def create_cartao(
     
     db.add(cartao)
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     db.refresh(cartao)
     
     # Incluir dados da conta vinculada na resposta
@@ -219,13 +241,13 @@ def list_cartoes_com_fatura(
         query = query.filter(Cartao.ativo == True)
     
     cartoes = query.all()
+    faturas = calcular_faturas_cartoes(cartoes, db)
     
     result = []
     for cartao in cartoes:
-        fatura_info = calcular_fatura_cartao(cartao, db)
         cartao_com_fatura = CartaoComFatura(
             **cartao.__dict__,
-            fatura=fatura_info
+            fatura=faturas[cartao.id]
         )
         result.append(cartao_com_fatura)
     
@@ -325,6 +347,7 @@ def update_cartao(
         setattr(cartao, field, value)
     
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     db.refresh(cartao)
     
     # Incluir dados da conta vinculada na resposta
@@ -457,8 +480,13 @@ def delete_cartao(
             print(f"Erro ao excluir cartão: {e}")
             raise e
         
+        # DELETE em massa não passa pelos eventos do ORM: reconstruir o rollup do tenant
+        if transacoes_excluidas:
+            RollupService.reconstruir_tenant(db, current_user.tenant_id)
+        
         # Commit da transação
         db.commit()
+        EntidadesCache.invalidar(current_user.tenant_id)
         
         return {
             "message": "Cartão e todos os dados relacionados foram excluídos com sucesso",
@@ -508,11 +536,12 @@ def list_cartoes_com_parcelamentos(
         query = query.filter(Cartao.ativo == True)
     
     cartoes = query.all()
+    faturas = calcular_faturas_cartoes(cartoes, db)
     
     result = []
     for cartao in cartoes:
         # Calcular fatura
-        fatura_info = calcular_fatura_cartao(cartao, db)
+        fatura_info = faturas[cartao.id]
         
         # Calcular resumo de parcelamentos
         resumo_parcelamentos = calcular_resumo_parcelamentos(cartao.id, db, current_user.tenant_id)
@@ -7,6 +7,8 @@ from ..models.financial import Categoria, Transacao
 from ..schemas.financial import CategoriaCreate, CategoriaUpdate, CategoriaResponse
 from ..core.security import get_current_tenant_user
 from ..models.user import User
+from ..services.rollup_service import RollupService
+from ..services.entidades_cache import EntidadesCache
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -37,6 +39,7 @@ def create_categoria(
     
     db.add(categoria)
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     db.refresh(categoria)
     
     return CategoriaResponse.from_orm(categoria)
@@ -199,6 +202,7 @@ def update_categoria(
         setattr(categoria, field, value)
     
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     db.refresh(categoria)
     
     return CategoriaResponse.from_orm(categoria)
@@ -235,6 +239,7 @@ def delete_categoria(
     
     db.delete(categoria)
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     
     return {"message": "Categoria deleted successfully"}
 
@@ -344,6 +349,9 @@ def mover_transacoes_categoria(
         Transacao.tenant_id == current_user.tenant_id
     ).update({"categoria_id": nova_categoria_id})
     
+    # UPDATE em massa não passa pelos eventos do ORM: reconstruir o rollup do tenant
+    RollupService.reconstruir_tenant(db, current_user.tenant_id)
+    
     db.commit()
     
     return {
@@ -383,9 +391,13 @@ def forcar_exclusao_categoria(
         Transacao.tenant_id == current_user.tenant_id
     ).delete()
     
+    # DELETE em massa não passa pelos eventos do ORM: reconstruir o rollup do tenant
+    RollupService.reconstruir_tenant(db, current_user.tenant_id)
+    
     # Excluir a categoria
     db.delete(categoria)
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     
     return {
         "message": f"Categoria '{categoria.nome}' e {transacoes_count} transações excluídas com sucesso",
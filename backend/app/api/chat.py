@@ -5,13 +5,16 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 from ..database import get_db
-from ..core.security import get_current_active_user, get_current_user
+from ..core.security import get_current_active_user, get_current_user, get_current_admin_user
 from ..core.config import settings
 from ..models.user import User
 from ..models.chat_history import ChatHistory
 from ..services.chat_ai_service import ChatAIService
 from ..services.chat_history_service import ChatHistoryService
 from ..services.vision_service import VisionService
+from ..services.llm_cache import LLMCache
+from ..services.entidades_cache import EntidadesCache
+from ..core.openai_client import ClienteOpenAI
 from ..schemas.financial import TransacaoResponse
 from ..schemas.chat import (
     ChatHistoryFilters, ChatSearchResponse, ChatSessionResponse,
@@ -19,7 +22,6 @@ from ..schemas.chat import (
 )
 from ..services.enhanced_chat_ai_service import enhanced_chat_service
 import logging
-import openai
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -58,7 +60,6 @@ def get_chat_service(db: Session = Depends(get_db), current_user: User = Depends
         
         return ChatAIService(
             db=db,
-            openai_api_key=settings.OPENAI_API_KEY,
             tenant_id=tenant_id
         )
     except Exception as e:
@@ -185,22 +186,11 @@ async def analisar_extrato_bancario(
 ):
     """Análise automática de extrato bancário com IA"""
     try:
-        # Importar modelos necessários
-        from ..models.financial import Cartao, Conta, Categoria
-        
-        # Buscar cartões e contas do usuário para contexto da IA
-        cartoes_usuario = db.query(Cartao).filter(
-            Cartao.tenant_id == current_user.tenant_id,
-            Cartao.ativo == True
-        ).all()
-        
-        contas_usuario = db.query(Conta).filter(
-            Conta.tenant_id == current_user.tenant_id
-        ).all()
-        
-        categorias_usuario = db.query(Categoria).filter(
-            Categoria.tenant_id == current_user.tenant_id
-        ).all()
+        # Buscar cartões, contas e categorias do usuário para contexto da IA (cache por tenant)
+        entidades = await EntidadesCache.obter_async(current_user.tenant_id)
+        cartoes_usuario = entidades.cartoes_ativos
+        contas_usuario = entidades.contas
+        categorias_usuario = entidades.categorias
         
         # Preparar informações dos cartões para a IA
         info_cartoes = []
@@ -224,8 +214,8 @@ async def analisar_extrato_bancario(
                 detail="OPENAI_API_KEY não configurada"
             )
         
-        # Configurar cliente OpenAI com variável de ambiente
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Cliente OpenAI assíncrono compartilhado
+        client = ClienteOpenAI.obter()
         
         # Prompt específico para análise de extrato
         prompt = f"""
@@ -255,7 +245,7 @@ Responda APENAS com um array JSON válido, sem texto adicional:
 """
 
         # Chamar OpenAI
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "Você é um especialista em análise de extratos bancários. Retorne sempre JSON válido."},
@@ -290,6 +280,13 @@ async def obter_estatisticas(
         print(f"Erro ao obter estatísticas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache-ia/metricas")
+async def obter_metricas_cache_ia(
+    current_admin: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """Métricas do cache de respostas do OpenAI do processo inteiro (hits, misses, tokens economizados)"""
+    return LLMCache.metricas()
+
 # NOVOS ENDPOINTS DE HISTÓRICO
 
 @router.get("/historico", response_model=ChatSearchResponse)
@@ -7,6 +7,7 @@ from ..schemas.financial import ContaCreate, ContaUpdate, ContaResponse, ContaCo
 from ..core.security import get_current_tenant_user
 from ..models.user import User
 from ..services.conta_service import ContaService
+from ..services.entidades_cache import EntidadesCache
 
 router = APIRouter()
 
@@ -36,6 +37,7 @@ def create_conta(
     
     db.add(conta)
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     db.refresh(conta)
     
     return conta
@@ -167,6 +169,7 @@ def update_conta(
         setattr(conta, field, value)
     
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     db.refresh(conta)
     
     return conta
@@ -194,5 +197,6 @@ def delete_conta(
     
     db.delete(conta)
     db.commit()
+    EntidadesCache.invalidar(current_user.tenant_id)
     
     return {"message": "Conta deleted successfully"} 
\ No newline at end of file
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, inspect
 from datetime import date
 from ..database import get_db
+from ..models.financial import Transacao
+from ..models.transacao_recorrente import TransacaoRecorrente
+from ..models.telegram_outbox import TelegramOutbox, TelegramBroadcast
+from ..services.recorrencia_service import RecorrenciaService
+from ..services.busca_service import BuscaService
 import logging
+import re
 
 router = APIRouter()
 
@@ -96,6 +102,247 @@ async def update_cartoes_dia_fechamento(db: Session = Depends(get_db)):
             detail=f"Erro ao atualizar cartões: {str(e)}"
         )
 
+@router.post("/add-indices-transacoes")
+async def add_indices_transacoes(db: Session = Depends(get_db)):
+    """
+    Endpoint de migração para criar os índices compostos declarados em Transacao.__table_args__
+    Idempotente: índices já existentes são ignorados (funciona em SQLite e PostgreSQL)
+    """
+    try:
+        connection = db.connection()
+        criados = []
+        existentes = []
+        
+        for index in sorted(Transacao.__table__.indexes, key=lambda i: i.name):
+            if not index.name.startswith("idx_transacoes_"):
+                continue  # ix_transacoes_id já é criado junto com a tabela
+            
+            ja_existe = db.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :nome")
+                if connection.dialect.name == "postgresql" else
+                text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :nome"),
+                {"nome": index.name}
+            ).first() is not None
+            
+            if ja_existe:
+                existentes.append(index.name)
+                continue
+            
+            index.create(bind=connection)
+            criados.append(index.name)
+        
+        db.commit()
+        
+        logger.info(f"Índices de transacoes criados: {criados} (já existentes: {existentes})")
+        
+        return {
+            "status": "success",
+            "message": f"{len(criados)} índice(s) criado(s) na tabela transacoes",
+            "indices_criados": criados,
+            "indices_existentes": existentes,
+            "migration_applied": len(criados) > 0
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao criar índices de transacoes: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao executar migração: {str(e)}"
+        )
+
+@router.post("/add-busca-transacoes")
+async def add_busca_transacoes(db: Session = Depends(get_db)):
+    """
+    Endpoint de migração para criar a estrutura de busca textual de transacoes
+    PostgreSQL: extensões unaccent/pg_trgm e índices GIN; SQLite: tabela FTS5 + triggers
+    Idempotente: pode ser chamado novamente (no SQLite reconstrói o índice FTS)
+    """
+    try:
+        comandos = BuscaService.instalar(db.connection())
+        db.commit()
+        
+        logger.info(f"Estrutura de busca de transacoes instalada ({len(comandos)} comandos)")
+        
+        return {
+            "status": "success",
+            "message": "Estrutura de busca textual instalada na tabela transacoes",
+            "comandos": comandos,
+            "migration_applied": len(comandos) > 0
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao instalar busca de transacoes: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao executar migração: {str(e)}"
+        )
+
+@router.post("/add-proxima-ocorrencia-recorrentes")
+async def add_proxima_ocorrencia_recorrentes(db: Session = Depends(get_db)):
+    """
+    Endpoint de migração para a coluna proxima_ocorrencia em transacoes_recorrentes
+    Cria a coluna e o índice (ativa, proxima_ocorrencia) e preenche as recorrências sem valor
+    Idempotente: pode ser chamado novamente (só calcula as que ainda estão com NULL)
+    """
+    try:
+        connection = db.connection()
+        colunas = {coluna["name"] for coluna in inspect(connection).get_columns("transacoes_recorrentes")}
+        coluna_criada = "proxima_ocorrencia" not in colunas
+        if coluna_criada:
+            db.execute(text("ALTER TABLE transacoes_recorrentes ADD COLUMN proxima_ocorrencia DATE NULL"))
+        
+        indices = {indice["name"] for indice in inspect(connection).get_indexes("transacoes_recorrentes")}
+        indice_criado = False
+        for index in TransacaoRecorrente.__table__.indexes:
+            if index.name.startswith("idx_recorrentes_") and index.name not in indices:
+                index.create(bind=connection)
+                indice_criado = True
+        
+        recorrentes = db.query(TransacaoRecorrente).filter(TransacaoRecorrente.proxima_ocorrencia.is_(None)).all()
+        for transacao in recorrentes:
+            RecorrenciaService.recalcular_proxima(transacao)
+        
+        db.commit()
+        
+        logger.info(f"proxima_ocorrencia preenchida para {len(recorrentes)} transações recorrentes")
+        
+        return {
+            "status": "success",
+            "message": f"proxima_ocorrencia calculada para {len(recorrentes)} transação(ões) recorrente(s)",
+            "coluna_criada": coluna_criada,
+            "indice_criado": indice_criado,
+            "migration_applied": coluna_criada or indice_criado
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao adicionar proxima_ocorrencia: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao executar migração: {str(e)}"
+        )
+
+@router.post("/add-transacao-recorrente-id")
+async def add_transacao_recorrente_id(db: Session = Depends(get_db)):
+    """
+    Endpoint de migração para o vínculo transacoes.transacao_recorrente_id
+    Cria a coluna, vincula as transações já geradas pelo agendador (pela observação) e cria o
+    índice único (transacao_recorrente_id, dia). Idempotente.
+    """
+    try:
+        connection = db.connection()
+        colunas = {coluna["name"] for coluna in inspect(connection).get_columns("transacoes")}
+        coluna_criada = "transacao_recorrente_id" not in colunas
+        if coluna_criada:
+            db.execute(text(
+                "ALTER TABLE transacoes ADD COLUMN transacao_recorrente_id INTEGER NULL "
+                "REFERENCES transacoes_recorrentes(id) ON DELETE SET NULL"
+            ))
+        
+        # Vincular transações geradas antes da coluna (uma por recorrência e dia)
+        padrao = re.compile(r"recorrência ID: (\d+)")
+        recorrentes = {id_ for id_, in db.query(TransacaoRecorrente.id)}
+        vinculos = {}
+        for transacao_id, data, observacoes in db.query(Transacao.id, Transacao.data, Transacao.observacoes).filter(
+            Transacao.transacao_recorrente_id.is_(None),
+            Transacao.observacoes.like("Gerada automaticamente da recorrência ID: %")
+        ).order_by(Transacao.id):
+            encontrado = padrao.search(observacoes)
+            if encontrado and int(encontrado.group(1)) in recorrentes:
+                vinculos.setdefault((int(encontrado.group(1)), data.date()), transacao_id)
+        
+        ja_vinculadas = {
+            (recorrente_id, data.date())
+            for recorrente_id, data in db.query(Transacao.transacao_recorrente_id, Transacao.data).filter(
+                Transacao.transacao_recorrente_id.isnot(None)
+            )
+        }
+        vinculadas = 0
+        for (recorrente_id, dia), transacao_id in vinculos.items():
+            if (recorrente_id, dia) not in ja_vinculadas:
+                db.query(Transacao).filter(Transacao.id == transacao_id).update(
+                    {Transacao.transacao_recorrente_id: recorrente_id}, synchronize_session=False
+                )
+                vinculadas += 1
+        
+        # Índice de expressão: o inspector não lista, então consultar o catálogo como em add-indices-transacoes
+        indice_criado = db.execute(
+            text("SELECT 1 FROM pg_indexes WHERE indexname = 'uq_transacoes_recorrente_dia'")
+            if connection.dialect.name == "postgresql" else
+            text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_transacoes_recorrente_dia'")
+        ).first() is None
+        if indice_criado:
+            next(
+                index for index in Transacao.__table__.indexes if index.name == "uq_transacoes_recorrente_dia"
+            ).create(bind=connection)
+        
+        db.commit()
+        
+        logger.info(f"transacao_recorrente_id aplicado: {vinculadas} transações vinculadas")
+        
+        return {
+            "status": "success",
+            "message": f"{vinculadas} transação(ões) vinculada(s) à recorrência de origem",
+            "coluna_criada": coluna_criada,
+            "indice_criado": indice_criado,
+            "migration_applied": coluna_criada or indice_criado
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao adicionar transacao_recorrente_id: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao executar migração: {str(e)}"
+        )
+
+@router.post("/add-telegram-broadcasts")
+async def add_telegram_broadcasts(db: Session = Depends(get_db)):
+    """
+    Endpoint de migração para broadcasts do admin via outbox do Telegram
+    Cria telegram_broadcasts (e telegram_outbox, se ainda não existir) e a coluna broadcast_id no outbox
+    Idempotente: pode ser chamado novamente
+    """
+    try:
+        connection = db.connection()
+        tabelas = set(inspect(connection).get_table_names())
+        tabelas_criadas = []
+        for tabela in (TelegramBroadcast.__table__, TelegramOutbox.__table__):
+            if tabela.name not in tabelas:
+                tabela.create(bind=connection)
+                tabelas_criadas.append(tabela.name)
+        
+        colunas = {coluna["name"] for coluna in inspect(connection).get_columns("telegram_outbox")}
+        coluna_criada = "broadcast_id" not in colunas
+        if coluna_criada:
+            db.execute(text("ALTER TABLE telegram_outbox ADD COLUMN broadcast_id INTEGER NULL REFERENCES telegram_broadcasts(id)"))
+        
+        indices = {indice["name"] for indice in inspect(connection).get_indexes("telegram_outbox")}
+        if "ix_telegram_outbox_broadcast_id" not in indices:
+            db.execute(text("CREATE INDEX ix_telegram_outbox_broadcast_id ON telegram_outbox (broadcast_id)"))
+        
+        db.commit()
+        
+        logger.info(f"Broadcasts do Telegram: tabelas criadas {tabelas_criadas}, coluna broadcast_id criada: {coluna_criada}")
+        
+        return {
+            "status": "success",
+            "message": "Tabelas de broadcast do Telegram prontas",
+            "tabelas_criadas": tabelas_criadas,
+            "coluna_criada": coluna_criada,
+            "migration_applied": bool(tabelas_criadas) or coluna_criada
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao criar broadcasts do Telegram: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao executar migração: {str(e)}"
+        )
+
 @router.get("/migration-status")
 async def check_migration_status(db: Session = Depends(get_db)):
     """
@@ -14,6 +14,7 @@ from ..schemas.financial import (
 )
 from ..core.security import get_current_tenant_user
 from ..models.user import User
+from ..services.rollup_service import RollupService
 
 router = APIRouter()
 
@@ -373,6 +374,9 @@ def excluir_compra_parcelada(
             Transacao.tenant_id == current_user.tenant_id
         ).delete()
         
+        # DELETE em massa não passa pelos eventos do ORM: reconstruir o rollup do tenant
+        RollupService.reconstruir_tenant(db, current_user.tenant_id)
+        
         # Terceira etapa - Excluir todas as parcelas
         parcelas_excluidas = db.query(ParcelaCartao).filter(
             ParcelaCartao.compra_parcelada_id == parcela_id,
@@ -785,11 +789,16 @@ def limpar_dados_orfaos(
         
         # 2.1. Excluir também transações marcadas como parceladas (is_parcelada=true)
         transacoes_parceladas_extras = db.query(Transacao).filter(
+            Transacao.tenant_id == current_user.tenant_id,
             Transacao.is_parcelada == True
         ).delete(synchronize_session=False)
         
         total_transacoes_excluidas = transacoes_excluidas + transacoes_parceladas_extras
         
+        # DELETE em massa não passa pelos eventos do ORM: reconstruir o rollup do tenant
+        if total_transacoes_excluidas:
+            RollupService.reconstruir_tenant(db, current_user.tenant_id)
+        
         db.commit()
         
         return {
@@ -833,6 +842,10 @@ def zerar_todos_parcelamentos(db: Session = Depends(get_db)):
         # 4. Excluir TODAS as compras parceladas
         compras_excluidas = db.query(CompraParcelada).delete(synchronize_session=False)
         
+        # DELETE em massa não passa pelos eventos do ORM: reconstruir o rollup
+        if total_transacoes_excluidas:
+            RollupService.reconstruir_todos(db)
+        
         db.commit()
         
         print(f"✅ LIMPEZA CONCLUÍDA:")
@@ -924,6 +937,7 @@ def limpar_transacoes_parceladas_completo(db: Session = Depends(get_db)):
         # Excluir todas de uma vez
         if ids_para_excluir:
             excluidas = db.query(Transacao).filter(Transacao.id.in_(list(ids_para_excluir))).delete(synchronize_session=False)
+            RollupService.reconstruir_todos(db)
             db.commit()
             print(f"✅ {excluidas} transações excluídas")
         else:
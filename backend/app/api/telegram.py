@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any
 from pydantic import BaseModel
 from ..database import get_db
 from ..services.telegram_service import TelegramService
 from ..services.telegram_polling_service import telegram_polling
-from ..core.security import get_current_user
+from ..services.telegram_update_queue import telegram_updates
+from ..core.security import get_current_user, get_current_admin_user
 from ..models.user import User
 import logging
 
@@ -17,51 +19,30 @@ class TelegramAuthRequest(BaseModel):
     auth_code: str
 
 @router.post("/webhook")
-async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
-    """Webhook para receber mensagens do Telegram (produção)"""
+async def telegram_webhook(request: Request):
+    """Webhook para receber mensagens do Telegram (produção) - enfileira e responde na hora"""
     try:
         telegram_data = await request.json()
-        logger.info(f"📱 Webhook Telegram recebido: {telegram_data}")
+        logger.info(f"📱 Webhook Telegram recebido: update {telegram_data.get('update_id')}")
         
-        telegram_service = TelegramService()
-        
-        # Verificar se é uma mensagem
-        if "message" in telegram_data:
-            message = telegram_data["message"]
-            logger.info(f"🔍 Tipo de mensagem detectado: {list(message.keys())}")
-            
-            # Verificar se é uma foto
-            if "photo" in message:
-                logger.info("📸 Processando foto...")
-                result = await telegram_service.process_photo(db, telegram_data)
-                logger.info(f"📸 Foto processada: {result}")
-            
-            # Verificar se é áudio/voice
-            elif "voice" in message or "audio" in message:
-                logger.info("🎤 Detectado áudio/voice - iniciando processamento...")
-                if "voice" in message:
-                    logger.info(f"🎤 Voice detectado: {message['voice']}")
-                if "audio" in message:
-                    logger.info(f"🎵 Audio detectado: {message['audio']}")
-                
-                result = await telegram_service.process_audio(db, telegram_data)
-                logger.info(f"🎤 Áudio processado: {result}")
-            
-            # Verificar se é texto
-            elif "text" in message:
-                logger.info(f"💬 Processando texto: {message.get('text', '')[:50]}...")
-                result = await telegram_service.process_message(db, telegram_data)
-                logger.info(f"💬 Mensagem processada: {result}")
-                
-            else:
-                logger.warning(f"⚠️ Tipo de mensagem não reconhecido: {list(message.keys())}")
+        # O processamento (IA, áudio, banco) roda nos workers da fila
+        resultado = telegram_updates.enfileirar(telegram_data)
+        if resultado == "fila_cheia":
+            # Telegram reenvia o update mais tarde
+            logger.warning("⚠️ Fila de updates do Telegram cheia - update recusado")
+            return JSONResponse(status_code=503, content={"status": "busy"})
         
-        return {"status": "ok"}
+        return {"status": "ok", "queue": resultado}
         
     except Exception as e:
         logger.error(f"❌ Erro no webhook Telegram: {e}")
         return {"status": "error", "message": str(e)}
 
+@router.get("/webhook/metrics")
+async def get_webhook_metrics(current_admin: User = Depends(get_current_admin_user)):
+    """Métricas da fila de updates do webhook (profundidade, duplicados, tempos)"""
+    return telegram_updates.metricas()
+
 @router.post("/start-polling")
 async def start_telegram_polling(background_tasks: BackgroundTasks):
     """Iniciar polling do Telegram para desenvolvimento local"""
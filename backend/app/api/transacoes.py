@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_, or_, desc, func, extract
 from typing import List, Optional
 from datetime import datetime, date
+import base64
+import importlib.util
+import json
 import logging
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..models.financial import Transacao, Categoria, Conta, Cartao, TipoTransacao
 
 logger = logging.getLogger(__name__)
@@ -15,9 +18,14 @@ from ..schemas.financial import (
     TipoTransacaoEnum
 )
 from ..core.security import get_current_tenant_user
+from ..core.openai_client import ClienteOpenAI
 from ..models.user import User
 from ..services.fatura_service import FaturaService
-from fastapi.responses import Response
+from ..services.busca_service import BuscaService
+from ..services.entidades_cache import EntidadesCache
+from ..services.importacao_service import ImportacaoService, EXTENSOES_ACEITAS
+from ..services.exportacao_service import ExportacaoService, FORMATOS as FORMATOS_EXPORTACAO, LOTE_EXPORTACAO
+from fastapi.responses import Response, StreamingResponse
 import pandas as pd
 import io
 
@@ -144,27 +152,41 @@ def create_transacao(
     
     return transacao
 
-@router.get("/", response_model=List[TransacaoResponse])
-def list_transacoes(
-    skip: int = Query(0, ge=0),
-    limit: Optional[int] = Query(None, ge=1, le=1000),
+# Paginação por cursor (keyset) em (data, id)
+PAGINA_PADRAO = 500
+PAGINA_MAXIMA = 1000
+STREAM_LOTE = 500
+
+def _codificar_cursor(transacao: Transacao) -> str:
+    """Cursor opaco com a posição (data, id) da última transação da página"""
+    bruto = json.dumps({"d": transacao.data.isoformat(), "i": transacao.id})
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str) -> tuple:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        dados = json.loads(bruto)
+        return datetime.fromisoformat(dados["d"]), int(dados["i"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+def _aplicar_filtros_transacoes(
+    query,
+    tenant_id: int,
     tipo: Optional[TipoTransacaoEnum] = None,
     categoria_id: Optional[int] = None,
     conta_id: Optional[int] = None,
     cartao_id: Optional[int] = None,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
-    busca: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_tenant_user)
+    busca: Optional[str] = None
 ):
-    """Listar transações com filtros"""
+    """Aplica os filtros comuns da listagem de transações"""
+    query = query.filter(Transacao.tenant_id == tenant_id)
     
-    query = db.query(Transacao).filter(
-        Transacao.tenant_id == current_user.tenant_id
-    )
-    
-    # Aplicar filtros
     if tipo:
         query = query.filter(Transacao.tipo == tipo)
     
@@ -186,23 +208,104 @@ def list_transacoes(
         query = query.filter(Transacao.data <= data_fim_completa)
     
     if busca:
-        search_pattern = f"%{busca}%"
+        query = query.filter(BuscaService.filtro(query.session, busca))
+    
+    return query
+
+def _query_listagem(db: Session, tenant_id: int, cursor: Optional[str] = None, relevancia=None, **filtros):
+    """
+    Query ordenada por (data, id) desc com relacionamentos carregados em lote (sem N+1)
+    Com `relevancia`, ordena pela relevância da busca (sem cursor - paginação por skip)
+    """
+    query = _aplicar_filtros_transacoes(db.query(Transacao), tenant_id, **filtros).options(
+        selectinload(Transacao.categoria),
+        selectinload(Transacao.cartao),
+        selectinload(Transacao.conta)
+    )
+    
+    if relevancia is not None:
+        return query.order_by(desc(relevancia), desc(Transacao.data), desc(Transacao.id))
+    
+    if cursor:
+        cursor_data, cursor_id = _decodificar_cursor(cursor)
         query = query.filter(
             or_(
-                Transacao.descricao.ilike(search_pattern),
-                Transacao.observacoes.ilike(search_pattern)
+                Transacao.data < cursor_data,
+                and_(Transacao.data == cursor_data, Transacao.id < cursor_id)
             )
         )
     
-    # Ordenar por data mais recente
-    query = query.order_by(desc(Transacao.data))
+    return query.order_by(desc(Transacao.data), desc(Transacao.id))
+
+def _stream_ndjson(tenant_id: int, cursor: Optional[str], limit: Optional[int], ordenar: str, filtros: dict):
+    """Gera uma transação por linha (NDJSON) lendo do banco em lotes via cursor do servidor"""
+    db = SessionLocal()
+    try:
+        relevancia = _relevancia(db, ordenar, filtros.get("busca"))
+        query = _query_listagem(db, tenant_id, cursor, relevancia, **filtros).yield_per(STREAM_LOTE)
+        if limit is not None:
+            query = query.limit(limit)
+        
+        for transacao in query:
+            yield TransacaoResponse.model_validate(transacao).model_dump_json() + "\n"
+    finally:
+        db.close()
+
+def _relevancia(db: Session, ordenar: str, busca: Optional[str]):
+    """Expressão de relevância quando a ordenação por relevância foi pedida e há índice de busca"""
+    if ordenar != "relevancia" or not busca:
+        return None
+    return BuscaService.relevancia(db, busca)
+
+@router.get("/", response_model=List[TransacaoResponse])
+def list_transacoes(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=PAGINA_MAXIMA),
+    cursor: Optional[str] = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    formato: str = Query("json", pattern="^(json|ndjson)$"),
+    ordenar: str = Query("data", pattern="^(data|relevancia)$"),
+    tipo: Optional[TipoTransacaoEnum] = None,
+    categoria_id: Optional[int] = None,
+    conta_id: Optional[int] = None,
+    cartao_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    busca: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_tenant_user)
+):
+    """
+    Listar transações com filtros
+    
+    - Paginação por cursor: envie `cursor` com o valor do header `X-Next-Cursor` da página anterior
+      (`skip` continua aceito para compatibilidade, mas é ignorado quando há cursor)
+    - `formato=ndjson`: transmite uma transação por linha, sem limite padrão de página
+    - `busca`: busca textual indexada em descrição/observações (sem acentos);
+      com `ordenar=relevancia` os resultados vêm ranqueados e a paginação é por `skip`
+    """
+    filtros = dict(
+        tipo=tipo, categoria_id=categoria_id, conta_id=conta_id, cartao_id=cartao_id,
+        data_inicio=data_inicio, data_fim=data_fim, busca=busca
+    )
+    
+    if formato == "ndjson":
+        return StreamingResponse(
+            _stream_ndjson(current_user.tenant_id, cursor, limit, ordenar, filtros),
+            media_type="application/x-ndjson"
+        )
+    
+    limit = limit or PAGINA_PADRAO
+    relevancia = _relevancia(db, ordenar, busca)
+    query = _query_listagem(db, current_user.tenant_id, cursor, relevancia, **filtros)
+    if (not cursor or relevancia is not None) and skip:
+        query = query.offset(skip)
     
-    # Aplicar paginação apenas se limit for especificado
-    query = query.offset(skip)
-    if limit is not None:
-        query = query.limit(limit)
+    transacoes = query.limit(limit).all()
     
-    transacoes = query.all()
+    # Página cheia: pode haver mais resultados (cursor só vale para a ordenação por data)
+    if len(transacoes) == limit and relevancia is None:
+        response.headers["X-Next-Cursor"] = _codificar_cursor(transacoes[-1])
     
     return transacoes
 
@@ -220,39 +323,12 @@ def get_resumo_transacoes(
 ):
     """Obter resumo das transações por período"""
     
-    query = db.query(Transacao).filter(
-        Transacao.tenant_id == current_user.tenant_id
+    query = _aplicar_filtros_transacoes(
+        db.query(Transacao), current_user.tenant_id,
+        tipo=tipo, categoria_id=categoria_id, conta_id=conta_id, cartao_id=cartao_id,
+        data_inicio=data_inicio, data_fim=data_fim, busca=busca
     )
     
-    # Aplicar todos os filtros
-    if data_inicio:
-        query = query.filter(Transacao.data >= data_inicio)
-    
-    if data_fim:
-        data_fim_completa = datetime.combine(data_fim, datetime.max.time())
-        query = query.filter(Transacao.data <= data_fim_completa)
-    
-    if tipo:
-        query = query.filter(Transacao.tipo == tipo)
-    
-    if categoria_id:
-        query = query.filter(Transacao.categoria_id == categoria_id)
-    
-    if conta_id:
-        query = query.filter(Transacao.conta_id == conta_id)
-    
-    if cartao_id:
-        query = query.filter(Transacao.cartao_id == cartao_id)
-    
-    if busca:
-        search_pattern = f"%{busca}%"
-        query = query.filter(
-            or_(
-                Transacao.descricao.ilike(search_pattern),
-                Transacao.observacoes.ilike(search_pattern)
-            )
-        )
-    
     # Calcular totais
     entradas = query.filter(Transacao.tipo == TipoTransacao.ENTRADA).with_entities(
         func.sum(Transacao.valor)
@@ -275,6 +351,74 @@ def get_resumo_transacoes(
         "data_fim": data_fim
     }
 
+def _linhas_exportacao(tenant_id: int, filtros: dict):
+    """Linhas da exportação lidas via cursor do servidor, em sessão própria (a resposta é transmitida)"""
+    db = SessionLocal()
+    try:
+        query = _aplicar_filtros_transacoes(
+            db.query(
+                Transacao.id,
+                Transacao.data,
+                Transacao.descricao,
+                Transacao.valor,
+                Transacao.tipo,
+                Categoria.nome,
+                Conta.nome,
+                Cartao.nome,
+                Transacao.observacoes,
+                Transacao.created_by_name
+            ).outerjoin(
+                Categoria, Transacao.categoria_id == Categoria.id
+            ).outerjoin(
+                Conta, Transacao.conta_id == Conta.id
+            ).outerjoin(
+                Cartao, Transacao.cartao_id == Cartao.id
+            ),
+            tenant_id,
+            **filtros
+        ).order_by(Transacao.data, Transacao.id)
+        
+        for linha in query.yield_per(LOTE_EXPORTACAO):
+            yield linha
+    finally:
+        db.close()
+
+@router.get("/export")
+def exportar_transacoes(
+    formato: str = Query("csv", pattern="^(csv|xlsx|parquet)$"),
+    tipo: Optional[TipoTransacaoEnum] = None,
+    categoria_id: Optional[int] = None,
+    conta_id: Optional[int] = None,
+    cartao_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    busca: Optional[str] = None,
+    current_user: User = Depends(get_current_tenant_user)
+):
+    """
+    Exportar o histórico de transações (CSV, XLSX ou Parquet) com os mesmos filtros da listagem
+    O arquivo é gerado e transmitido aos poucos, sem carregar todas as transações em memória
+    """
+    if formato == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Exportação Parquet indisponível: pyarrow não está instalado no servidor"
+        )
+    
+    filtros = dict(
+        tipo=tipo, categoria_id=categoria_id, conta_id=conta_id, cartao_id=cartao_id,
+        data_inicio=data_inicio, data_fim=data_fim, busca=busca
+    )
+    media_type = FORMATOS_EXPORTACAO[formato][0]
+    
+    logger.info(f"📤 Exportando transações ({formato}) do tenant {current_user.tenant_id}")
+    
+    return StreamingResponse(
+        ExportacaoService.gerar(formato, _linhas_exportacao(current_user.tenant_id, filtros)),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename={ExportacaoService.nome_arquivo(formato)}'}
+    )
+
 @router.get("/por-categoria")
 def get_transacoes_por_categoria(
     data_inicio: Optional[date] = None,
@@ -390,9 +534,14 @@ def update_transacao(
             )
     
     # Atualizar campos
-    for field, value in transacao_data.model_dump(exclude_unset=True).items():
+    campos = transacao_data.model_dump(exclude_unset=True)
+    for field, value in campos.items():
         setattr(transacao, field, value)
     
+    # Mudou cartão, data ou tipo: a transação pode ir para outra fatura (ou sair dela)
+    if {"cartao_id", "data", "tipo"} & campos.keys():
+        FaturaService.revincular_transacao_fatura(db, transacao)
+    
     db.commit()
     db.refresh(transacao)
     
@@ -630,157 +779,46 @@ async def upload_excel_transacoes(
     current_user: User = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    """Upload e processamento de arquivo Excel com transações"""
+    """Upload e processamento em lote de arquivo Excel, CSV ou OFX com transações"""
     try:
         # Validar arquivo
-        if not file.filename.endswith(('.xlsx', '.xls')):
+        if not file.filename.lower().endswith(EXTENSOES_ACEITAS):
             raise HTTPException(
                 status_code=400,
-                detail="Arquivo deve ser Excel (.xlsx ou .xls)"
+                detail="Arquivo deve ser Excel (.xlsx ou .xls), CSV (.csv) ou OFX (.ofx)"
             )
         
-        # Ler arquivo Excel
+        # Ler arquivo
         content = await file.read()
-        df = pd.read_excel(io.BytesIO(content), sheet_name='Transações')
+        df = ImportacaoService.ler_arquivo(file.filename, content)
         
         if df.empty:
             raise HTTPException(
                 status_code=400,
-                detail="Arquivo Excel está vazio"
+                detail="Arquivo está vazio"
             )
         
-        # Validar colunas obrigatórias
-        colunas_obrigatorias = ['Data', 'Valor', 'Tipo']
-        colunas_faltando = [col for col in colunas_obrigatorias if col not in df.columns]
-        
-        if colunas_faltando:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Colunas obrigatórias faltando: {', '.join(colunas_faltando)}"
+        extensao = file.filename.rsplit('.', 1)[-1].lower()
+        origem = 'Excel' if extensao in ('xlsx', 'xls') else extensao.upper()
+        try:
+            # Importação síncrona (banco + categorização pelo OpenAI) no pool do OpenAI, fora do event loop
+            resultado = await ClienteOpenAI.em_thread(
+                ImportacaoService.importar,
+                db,
+                current_user.tenant_id,
+                df,
+                origem=origem,
+                created_by_name=f"Importação {origem} ({current_user.full_name or current_user.email})"
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Buscar dados de referência
-        cartoes = {c.nome: c.id for c in db.query(Cartao).filter(
-            Cartao.tenant_id == current_user.tenant_id
-        ).all()}
-        
-        contas = {c.nome: c.id for c in db.query(Conta).filter(
-            Conta.tenant_id == current_user.tenant_id
-        ).all()}
-        
-        categorias = {c.nome: c.id for c in db.query(Categoria).filter(
-            Categoria.tenant_id == current_user.tenant_id
-        ).all()}
-        
-        # Processar transações
-        transacoes_criadas = []
-        transacoes_com_erro = []
-        
-        from ..services.chat_ai_service import ChatAIService
-        chat_service = ChatAIService()
-        chat_service.tenant_id = current_user.tenant_id
-        chat_service.db = db
-        
-        for index, row in df.iterrows():
-            try:
-                # Validar linha
-                if pd.isna(row['Valor']) or pd.isna(row['Tipo']):
-                    transacoes_com_erro.append({
-                        'linha': index + 2,
-                        'erro': 'Valor ou Tipo não informado'
-                    })
-                    continue
-                
-                # Processar data
-                try:
-                    if pd.isna(row['Data']):
-                        data_transacao = datetime.now().date()
-                    else:
-                        data_transacao = pd.to_datetime(row['Data']).date()
-                        
-                    # Validar data (não pode ser futura)
-                    hoje = datetime.now().date()
-                    if data_transacao > hoje:
-                        transacoes_com_erro.append({
-                            'linha': index + 2,
-                            'erro': f'Data futura não permitida: {data_transacao}. Use data de hoje ou anterior.'
-                        })
-                        continue
-                        
-                except Exception as e:
-                    data_transacao = datetime.now().date()
-                
-                # Descrição - usar IA se não informada
-                descricao = row.get('Descrição', '')
-                if pd.isna(descricao) or not descricao.strip():
-                    descricao = f"Transação importada - R$ {row['Valor']:.2f}"
-                
-                # Categoria - usar IA se não informada
-                categoria_id = None
-                categoria_nome = row.get('Categoria', '')
-                
-                if pd.isna(categoria_nome) or not categoria_nome.strip():
-                    # Usar IA para sugerir categoria
-                    categoria_nome = chat_service._determinar_categoria_automatica(descricao)
-                    categoria_id = chat_service._criar_categoria_automatica(categoria_nome)
-                else:
-                    # Tentar encontrar categoria existente
-                    categoria_id = categorias.get(categoria_nome)
-                    if not categoria_id:
-                        categoria_id = chat_service._criar_categoria_automatica(categoria_nome)
-                
-                # Cartão/Conta
-                cartao_id = None
-                conta_id = None
-                
-                cartao_nome = row.get('Cartão', '')
-                if not pd.isna(cartao_nome) and cartao_nome.strip():
-                    cartao_id = cartoes.get(cartao_nome.strip())
-                
-                # Se não tem cartão, usar primeira conta disponível
-                if not cartao_id and contas:
-                    conta_id = list(contas.values())[0]
-                
-                # Tipo
-                tipo = row['Tipo'].upper() if not pd.isna(row['Tipo']) else 'SAIDA'
-                if tipo not in ['ENTRADA', 'SAIDA']:
-                    tipo = 'SAIDA'
-                
-                # Criar transação
-                transacao = Transacao(
-                    descricao=descricao,
-                    valor=float(row['Valor']),
-                    tipo=TipoTransacao(tipo),
-                    data=data_transacao,
-                    categoria_id=categoria_id,
-                    cartao_id=cartao_id,
-                    conta_id=conta_id,
-                    tenant_id=current_user.tenant_id,
-                    processado_por_ia=True,
-                    prompt_original=f"Importação Excel - linha {index + 2}",
-                    created_by_name=f"Importação Excel ({current_user.first_name} {current_user.last_name})".strip() or f"Importação Excel ({current_user.email})"
-                )
-                
-                db.add(transacao)
-                db.flush()
-                
-                transacoes_criadas.append({
-                    'linha': index + 2,
-                    'descricao': descricao,
-                    'valor': row['Valor'],
-                    'categoria': categoria_nome,
-                    'id': transacao.id
-                })
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar linha {index + 2}: {e}")
-                transacoes_com_erro.append({
-                    'linha': index + 2,
-                    'erro': str(e)
-                })
-        
-        # Commit final
+        # Commit final (categorias criadas na importação entram no cache de entidades do chat)
         db.commit()
+        EntidadesCache.invalidar(current_user.tenant_id)
+        
+        transacoes_criadas = resultado["sucessos"]
+        transacoes_com_erro = resultado["erros"]
         
         return {
             "message": f"Processamento concluído: {len(transacoes_criadas)} transações criadas",
@@ -795,6 +833,7 @@ async def upload_excel_transacoes(
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Erro no upload Excel: {e}")
         raise HTTPException(
             status_code=500,
@@ -5,7 +5,7 @@ from typing import List, Optional
 from datetime import datetime, date, timedelta
 from ..database import get_db
 from ..models.transacao_recorrente import TransacaoRecorrente
-from ..models.financial import Categoria, Conta, Cartao
+from ..models.financial import Categoria, Conta, Cartao, Transacao
 from ..schemas.transacao_recorrente import (
     TransacaoRecorrenteCreate,
     TransacaoRecorrenteUpdate,
@@ -15,88 +15,13 @@ from ..schemas.transacao_recorrente import (
 )
 from ..core.security import get_current_tenant_user
 from ..models.user import User
+from ..services.recorrencia_service import RecorrenciaService
 
 router = APIRouter()
 
 def calcular_proximo_vencimento(data_inicio: date, frequencia: str) -> date:
-    """Calcula a próxima data de vencimento baseada APENAS na data de início e frequência"""
-    hoje = date.today()
-    
-    # Se ainda não começou, retornar data de início
-    if data_inicio > hoje:
-        return data_inicio
-    
-    # Calcular próxima ocorrência baseada na data de início
-    data_atual = data_inicio
-    
-    # Avançar até encontrar a próxima data (incluindo hoje se for data de início)
-    while data_atual < hoje:
-        if frequencia == "DIARIA":
-            data_atual += timedelta(days=1)
-        elif frequencia == "SEMANAL":
-            data_atual += timedelta(weeks=1)
-        elif frequencia == "QUINZENAL":
-            data_atual += timedelta(weeks=2)
-        elif frequencia == "MENSAL":
-            # Manter o mesmo dia do mês da data_inicio
-            if data_atual.month == 12:
-                nova_data = date(data_atual.year + 1, 1, data_inicio.day)
-            else:
-                try:
-                    nova_data = date(data_atual.year, data_atual.month + 1, data_inicio.day)
-                except ValueError:
-                    # Dia não existe no mês (ex: 31 em fevereiro)
-                    ultima_dia_mes = date(data_atual.year, data_atual.month + 1, 1) - timedelta(days=1)
-                    nova_data = ultima_dia_mes
-            data_atual = nova_data
-        elif frequencia == "BIMESTRAL":
-            # Avançar 2 meses mantendo o dia
-            novo_mes = data_atual.month + 2
-            novo_ano = data_atual.year
-            if novo_mes > 12:
-                novo_mes -= 12
-                novo_ano += 1
-            try:
-                data_atual = date(novo_ano, novo_mes, data_inicio.day)
-            except ValueError:
-                ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-                data_atual = ultima_dia_mes
-        elif frequencia == "TRIMESTRAL":
-            # Avançar 3 meses mantendo o dia
-            novo_mes = data_atual.month + 3
-            novo_ano = data_atual.year
-            while novo_mes > 12:
-                novo_mes -= 12
-                novo_ano += 1
-            try:
-                data_atual = date(novo_ano, novo_mes, data_inicio.day)
-            except ValueError:
-                ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-                data_atual = ultima_dia_mes
-        elif frequencia == "SEMESTRAL":
-            # Avançar 6 meses mantendo o dia
-            novo_mes = data_atual.month + 6
-            novo_ano = data_atual.year
-            while novo_mes > 12:
-                novo_mes -= 12
-                novo_ano += 1
-            try:
-                data_atual = date(novo_ano, novo_mes, data_inicio.day)
-            except ValueError:
-                ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-                data_atual = ultima_dia_mes
-        elif frequencia == "ANUAL":
-            # Avançar 1 ano mantendo mês e dia
-            try:
-                data_atual = date(data_atual.year + 1, data_inicio.month, data_inicio.day)
-            except ValueError:
-                # 29 de fevereiro em ano não bissexto
-                data_atual = date(data_atual.year + 1, data_inicio.month, 28)
-        else:
-            # Fallback para mensal
-            data_atual += timedelta(days=30)
-    
-    return data_atual
+    """Calcula a próxima data de vencimento (hoje incluso) baseada APENAS na data de início e frequência"""
+    return RecorrenciaService.proxima_ocorrencia(data_inicio, frequencia)
 
 @router.post("/", response_model=TransacaoRecorrenteResponse)
 def create_transacao_recorrente(
@@ -155,6 +80,7 @@ def create_transacao_recorrente(
         **transacao_dict,
         tenant_id=current_user.tenant_id
     )
+    RecorrenciaService.recalcular_proxima(transacao)
     
     db.add(transacao)
     db.commit()
@@ -437,6 +363,9 @@ def update_transacao_recorrente(
     for field, value in transacao_data.model_dump(exclude_unset=True).items():
         setattr(transacao, field, value)
     
+    # Data/frequência podem ter mudado: recalcular o que o agendador vai processar
+    RecorrenciaService.recalcular_proxima(transacao)
+    
     # Atualizar data de modificação
     transacao.updated_at = datetime.utcnow()
     
@@ -532,6 +461,7 @@ async def update_transacao_recorrente_cors(
             if "icone_personalizado" in data:
                 transacao.icone_personalizado = data["icone_personalizado"]
             
+            RecorrenciaService.recalcular_proxima(transacao)
             transacao.updated_at = datetime.utcnow()
             
             db.commit()
@@ -593,6 +523,11 @@ def delete_transacao_recorrente(
             detail="Transação recorrente não encontrada"
         )
     
+    # Transações já geradas ficam, sem o vínculo (bancos em que a coluna foi criada sem ON DELETE SET NULL)
+    db.query(Transacao).filter(
+        Transacao.transacao_recorrente_id == transacao.id
+    ).update({Transacao.transacao_recorrente_id: None}, synchronize_session=False)
+    
     db.delete(transacao)
     db.commit()
     
@@ -618,6 +553,9 @@ def toggle_transacao_recorrente(
         )
     
     transacao.ativa = not transacao.ativa
+    if transacao.ativa:
+        # Ocorrências do período pausado não são geradas retroativamente
+        RecorrenciaService.recalcular_proxima(transacao)
     transacao.updated_at = datetime.utcnow()
     
     db.commit()
@@ -631,168 +569,12 @@ def toggle_transacao_recorrente(
 def calcular_ocorrencias_no_mes(transacao: TransacaoRecorrente, inicio_mes: date, fim_mes: date) -> int:
     """Calcular quantas vezes uma transação recorrente ocorre em um mês específico"""
     
-    if not transacao.ativa:
-        return 0
-    
-    # Se data de início é depois do fim do mês, não há ocorrências
-    if transacao.data_inicio and transacao.data_inicio > fim_mes:
-        return 0
-    
-    # Se data de fim é antes do início do mês, não há ocorrências
-    if transacao.data_fim and transacao.data_fim < inicio_mes:
+    if not transacao.ativa or not transacao.data_inicio:
         return 0
     
-    # CORREÇÃO: Sempre começar da data_inicio, nunca antes dela
-    data_atual = transacao.data_inicio if transacao.data_inicio else inicio_mes
-    
-    # Se a data de início é antes do período, avançar até o período
-    contador = 0
-    while data_atual < inicio_mes and contador < 365:
-        contador += 1
-        data_atual = calcular_proxima_data_simples(data_atual, transacao.frequencia, transacao.data_inicio)
-    
-    # Contar ocorrências no período
-    ocorrencias = 0
-    contador = 0
-    while data_atual <= fim_mes and contador < 365:
-        contador += 1
-        
-        # Verificar se está no período E não é antes da data de início
-        if (inicio_mes <= data_atual <= fim_mes and 
-            data_atual >= transacao.data_inicio):
-            ocorrencias += 1
-        
-        data_atual = calcular_proxima_data_simples(data_atual, transacao.frequencia, transacao.data_inicio)
-        
-        # Se próxima data passou do período, parar
-        if data_atual > fim_mes:
-            break
-    
-    return ocorrencias
-
-def calcular_proxima_data_simples(data_base: date, frequencia: str, data_inicio: date) -> date:
-    """Calcular próxima data baseada na frequência, mantendo mesmo dia da data_inicio"""
-    if frequencia == "DIARIA":
-        return data_base + timedelta(days=1)
-    elif frequencia == "SEMANAL":
-        return data_base + timedelta(weeks=1)
-    elif frequencia == "QUINZENAL":
-        return data_base + timedelta(weeks=2)
-    elif frequencia == "MENSAL":
-        if data_base.month == 12:
-            novo_ano = data_base.year + 1
-            novo_mes = 1
-        else:
-            novo_ano = data_base.year
-            novo_mes = data_base.month + 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            # Dia não existe no mês (ex: 31 em fevereiro)
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "BIMESTRAL":
-        novo_mes = data_base.month + 2
-        novo_ano = data_base.year
-        if novo_mes > 12:
-            novo_mes -= 12
-            novo_ano += 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "TRIMESTRAL":
-        novo_mes = data_base.month + 3
-        novo_ano = data_base.year
-        while novo_mes > 12:
-            novo_mes -= 12
-            novo_ano += 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "SEMESTRAL":
-        novo_mes = data_base.month + 6
-        novo_ano = data_base.year
-        while novo_mes > 12:
-            novo_mes -= 12
-            novo_ano += 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "ANUAL":
-        try:
-            return date(data_base.year + 1, data_inicio.month, data_inicio.day)
-        except ValueError:
-            # 29 de fevereiro em ano não bissexto
-            return date(data_base.year + 1, data_inicio.month, 28)
-    else:
-        return data_base + timedelta(days=30)  # Fallback
-
-def calcular_data_anterior_simples(data_base: date, frequencia: str, data_inicio: date) -> date:
-    """Calcular data anterior baseada na frequência, mantendo mesmo dia da data_inicio"""
-    if frequencia == "DIARIA":
-        return data_base - timedelta(days=1)
-    elif frequencia == "SEMANAL":
-        return data_base - timedelta(weeks=1)
-    elif frequencia == "QUINZENAL":
-        return data_base - timedelta(weeks=2)
-    elif frequencia == "MENSAL":
-        if data_base.month == 1:
-            novo_ano = data_base.year - 1
-            novo_mes = 12
-        else:
-            novo_ano = data_base.year
-            novo_mes = data_base.month - 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "BIMESTRAL":
-        novo_mes = data_base.month - 2
-        novo_ano = data_base.year
-        if novo_mes < 1:
-            novo_mes += 12
-            novo_ano -= 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "TRIMESTRAL":
-        novo_mes = data_base.month - 3
-        novo_ano = data_base.year
-        if novo_mes < 1:
-            novo_mes += 12
-            novo_ano -= 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "SEMESTRAL":
-        novo_mes = data_base.month - 6
-        novo_ano = data_base.year
-        if novo_mes < 1:
-            novo_mes += 12
-            novo_ano -= 1
-        try:
-            return date(novo_ano, novo_mes, data_inicio.day)
-        except ValueError:
-            ultima_dia_mes = date(novo_ano, novo_mes + 1, 1) - timedelta(days=1)
-            return ultima_dia_mes
-    elif frequencia == "ANUAL":
-        try:
-            return date(data_base.year - 1, data_inicio.month, data_inicio.day)
-        except ValueError:
-            return date(data_base.year - 1, data_inicio.month, 28)
-    else:
-        return data_base - timedelta(days=30)  # Fallback 
+    return RecorrenciaService.contar_ocorrencias(
+        transacao.data_inicio, transacao.frequencia, inicio_mes, fim_mes, transacao.data_fim
+    )
 
 # Endpoint especial com CORS explícito para obter detalhes
 @router.get("/cors/{transacao_id}", include_in_schema=False)
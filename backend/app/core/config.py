@@ -24,10 +24,39 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     OPENAI_PROJECT_ID: Optional[str] = os.getenv("OPENAI_PROJECT_ID")
+    OPENAI_MAX_CONCORRENCIA: int = int(os.getenv("OPENAI_MAX_CONCORRENCIA", "16"))  # conexões (= chamadas simultâneas) por event loop
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "2"))  # retries do SDK (429/5xx/conexão) com backoff exponencial
+    OPENAI_TIMEOUT_SEGUNDOS: float = float(os.getenv("OPENAI_TIMEOUT_SEGUNDOS", "60"))
+    OPENAI_EXECUTOR_WORKERS: int = int(os.getenv("OPENAI_EXECUTOR_WORKERS", "8"))  # threads dos pipelines síncronos com OpenAI (imagem, importação)
+    
+    # Pool de threads para consultas ao banco feitas a partir de código async
+    DB_EXECUTOR_WORKERS: int = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+    
+    # Transcrição de áudio (Whisper)
+    TRANSCRICAO_MAX_WORKERS: int = int(os.getenv("TRANSCRICAO_MAX_WORKERS", "4"))  # chamadas simultâneas ao Whisper
+    TRANSCRICAO_FILA_MAXIMA: int = int(os.getenv("TRANSCRICAO_FILA_MAXIMA", "16"))  # acima disso o áudio é recusado
+    TRANSCRICAO_TIMEOUT_SEGUNDOS: float = float(os.getenv("TRANSCRICAO_TIMEOUT_SEGUNDOS", "45"))
+    
+    # Cache de cartões/contas/categorias por tenant usado pelos chats
+    CACHE_ENTIDADES_TTL_SEGUNDOS: float = float(os.getenv("CACHE_ENTIDADES_TTL_SEGUNDOS", "300"))
+    CACHE_ENTIDADES_MAX_TENANTS: int = int(os.getenv("CACHE_ENTIDADES_MAX_TENANTS", "1000"))
+    
+    # Cache de respostas do OpenAI (fallbacks de extração e chat genérico)
+    LLM_CACHE_MAX_ITENS: int = int(os.getenv("LLM_CACHE_MAX_ITENS", "5000"))
+    LLM_CACHE_TTL_EXTRACAO_SEGUNDOS: float = float(os.getenv("LLM_CACHE_TTL_EXTRACAO_SEGUNDOS", str(7 * 24 * 3600)))
+    LLM_CACHE_TTL_CHAT_SEGUNDOS: float = float(os.getenv("LLM_CACHE_TTL_CHAT_SEGUNDOS", "3600"))
+    LLM_CACHE_PERSISTENTE: bool = os.getenv("LLM_CACHE_PERSISTENTE", "false").lower() == "true"  # camada no banco (llm_respostas_cache)
     
     # Telegram Bot
     TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
     TELEGRAM_WEBHOOK_URL: Optional[str] = os.getenv("TELEGRAM_WEBHOOK_URL")
+    TELEGRAM_OUTBOX_CONCORRENCIA: int = int(os.getenv("TELEGRAM_OUTBOX_CONCORRENCIA", "8"))  # envios simultâneos do despachante
+    TELEGRAM_OUTBOX_TENTATIVAS: int = int(os.getenv("TELEGRAM_OUTBOX_TENTATIVAS", "6"))
+    TELEGRAM_OUTBOX_INTERVALO_SEGUNDOS: float = float(os.getenv("TELEGRAM_OUTBOX_INTERVALO_SEGUNDOS", "5"))
+    TELEGRAM_LIMITE_POR_SEGUNDO: float = float(os.getenv("TELEGRAM_LIMITE_POR_SEGUNDO", "25"))  # limite global do Bot API ~30/s
+    TELEGRAM_INTERVALO_POR_CHAT_SEGUNDOS: float = float(os.getenv("TELEGRAM_INTERVALO_POR_CHAT_SEGUNDOS", "1"))
+    TELEGRAM_WEBHOOK_WORKERS: int = int(os.getenv("TELEGRAM_WEBHOOK_WORKERS", "8"))  # workers da fila de updates do webhook
+    TELEGRAM_WEBHOOK_FILA_MAXIMA: int = int(os.getenv("TELEGRAM_WEBHOOK_FILA_MAXIMA", "1000"))  # acima disso o webhook responde 503 e o Telegram reenvia
     
     # WhatsApp Business API
     WHATSAPP_APP_ID: Optional[str] = os.getenv("WHATSAPP_APP_ID")
@@ -72,6 +101,12 @@ class Settings(BaseSettings):
     # Cron Job
     CRON_SECRET_KEY: str = os.getenv("CRON_SECRET_KEY", "cron-secret-key-change-in-production")
     
+    # Agendador (lotes por tenant processados em paralelo; cada lote usa uma conexão do pool)
+    AGENDADOR_MAX_WORKERS: int = int(os.getenv("AGENDADOR_MAX_WORKERS", "4"))
+    AGENDADOR_TAMANHO_LOTE: int = int(os.getenv("AGENDADOR_TAMANHO_LOTE", "200"))
+    AGENDADOR_TENTATIVAS: int = int(os.getenv("AGENDADOR_TENTATIVAS", "3"))
+    AGENDADOR_BACKOFF_SEGUNDOS: float = float(os.getenv("AGENDADOR_BACKOFF_SEGUNDOS", "0.5"))
+    
     def get_database_url(self) -> str:
         """Get PostgreSQL connection string if available, fallback to DATABASE_URL"""
         if all([
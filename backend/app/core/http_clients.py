@@ -0,0 +1,75 @@
+"""
+Clientes HTTP compartilhados (Telegram, WhatsApp, OpenAI)
+
+Um httpx.AsyncClient por API, com keep-alive, HTTP/2 (quando o pacote h2 está instalado),
+limites de conexão e timeouts, reaproveitado entre requisições em vez de abrir um cliente
+(e um handshake TLS) por chamada. Os clientes são criados sob demanda e fechados no
+shutdown da aplicação (ou ao final de scripts que usam asyncio.run).
+
+Conexões httpx ficam presas ao event loop em que foram abertas, então cada loop tem o
+próprio cliente de cada API.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Tuple
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - habilita HTTP/2 no httpx
+    HTTP2_DISPONIVEL = True
+except ImportError:
+    HTTP2_DISPONIVEL = False
+
+# API -> configuração do cliente (timeouts padrão; chamadas longas como getUpdates passam timeout próprio)
+PERFIS = {
+    "telegram": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    },
+    "whatsapp": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    },
+    # Sem HTTP/2: com uma requisição por conexão, max_connections é o limite de chamadas
+    # simultâneas ao OpenAI (as excedentes esperam até `pool` segundos por uma conexão livre)
+    "openai": {
+        "http2": False,
+        "timeout": httpx.Timeout(settings.OPENAI_TIMEOUT_SEGUNDOS, connect=5.0, pool=settings.OPENAI_TIMEOUT_SEGUNDOS),
+        "limits": httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONCORRENCIA,
+            max_keepalive_connections=settings.OPENAI_MAX_CONCORRENCIA,
+            keepalive_expiry=60.0
+        ),
+    },
+}
+
+
+class ClientesHTTP:
+
+    _clientes: Dict[Tuple[str, int], httpx.AsyncClient] = {}
+
+    @staticmethod
+    def obter(nome: str) -> httpx.AsyncClient:
+        """Cliente compartilhado da API `nome` para o event loop atual"""
+        chave = (nome, id(asyncio.get_running_loop()))
+        client = ClientesHTTP._clientes.get(chave)
+        if client is None or client.is_closed:
+            perfil = {"http2": HTTP2_DISPONIVEL, **PERFIS[nome]}
+            client = httpx.AsyncClient(**perfil)
+            ClientesHTTP._clientes[chave] = client
+            logger.info(f"🌐 Cliente HTTP '{nome}' criado (HTTP/2: {'sim' if perfil['http2'] else 'não'})")
+        return client
+
+    @staticmethod
+    async def fechar() -> None:
+        """Fecha os clientes do event loop atual (shutdown da aplicação / fim de script)"""
+        loop_id = id(asyncio.get_running_loop())
+        for chave in [chave for chave in ClientesHTTP._clientes if chave[1] == loop_id]:
+            client = ClientesHTTP._clientes.pop(chave)
+            await client.aclose()
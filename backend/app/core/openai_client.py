@@ -0,0 +1,82 @@
+"""
+Cliente OpenAI compartilhado
+
+- obter(): AsyncOpenAI do event loop atual, sobre o httpx.AsyncClient "openai" de ClientesHTTP
+  (keep-alive, limite de conexões = limite de chamadas simultâneas, timeouts). É fechado junto
+  com os demais clientes HTTP (shutdown da aplicação, fim dos workers do Telegram e de scripts)
+- sincrono(): um único OpenAI síncrono, com o mesmo perfil, para código que já roda fora do
+  event loop (pipelines síncronos executados em threads, rotas `def` do FastAPI)
+- em_thread(): roda esses pipelines síncronos num pool próprio, separado do pool do banco
+  (chamadas ao OpenAI levam segundos e ocupariam as threads das consultas curtas)
+- Retries do próprio SDK (429, 5xx e erros de conexão, com backoff exponencial)
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from .config import settings
+from .http_clients import ClientesHTTP, PERFIS
+
+logger = logging.getLogger(__name__)
+
+
+class ClienteOpenAI:
+
+    _clientes: Dict[int, Tuple[httpx.AsyncClient, AsyncOpenAI]] = {}
+    _sincrono: Optional[OpenAI] = None
+    _lock = threading.Lock()
+    _executor = ThreadPoolExecutor(max_workers=settings.OPENAI_EXECUTOR_WORKERS, thread_name_prefix="openai")
+
+    @staticmethod
+    def obter() -> AsyncOpenAI:
+        """AsyncOpenAI compartilhado do event loop atual"""
+        http_client = ClientesHTTP.obter("openai")
+        chave = id(asyncio.get_running_loop())
+        atual = ClienteOpenAI._clientes.get(chave)
+        # Recriado quando o cliente HTTP do loop foi fechado e aberto de novo
+        if atual is None or atual[0] is not http_client:
+            atual = (http_client, AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+                http_client=http_client
+            ))
+            ClienteOpenAI._clientes[chave] = atual
+        return atual[1]
+
+    @staticmethod
+    def sincrono() -> OpenAI:
+        """OpenAI síncrono compartilhado (thread-safe); nunca chamar de dentro do event loop"""
+        with ClienteOpenAI._lock:
+            if ClienteOpenAI._sincrono is None:
+                perfil = PERFIS["openai"]
+                ClienteOpenAI._sincrono = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    http_client=httpx.Client(timeout=perfil["timeout"], limits=perfil["limits"])
+                )
+                logger.info("🌐 Cliente OpenAI síncrono criado")
+            return ClienteOpenAI._sincrono
+
+    @staticmethod
+    def fechar_sincrono() -> None:
+        with ClienteOpenAI._lock:
+            if ClienteOpenAI._sincrono is not None:
+                ClienteOpenAI._sincrono.close()
+                ClienteOpenAI._sincrono = None
+
+    @staticmethod
+    async def em_thread(funcao, *args, **kwargs):
+        """Roda funcao(*args, **kwargs) (pipeline síncrono que chama o OpenAI) no pool próprio"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(ClienteOpenAI._executor, partial(funcao, *args, **kwargs))
+
+    @staticmethod
+    def encerrar_executor() -> None:
+        ClienteOpenAI._executor.shutdown(wait=True)
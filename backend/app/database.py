@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -26,4 +29,28 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Pool de threads dedicado ao banco para código async (chats, MCP, Telegram): as consultas
+# síncronas do SQLAlchemy rodam aqui e o event loop fica livre para I/O. O tamanho fica
+# abaixo do limite de conexões do engine (pool + overflow), então nenhuma thread fica
+# esperando conexão enquanto segura uma vaga do pool.
+_db_executor = ThreadPoolExecutor(max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+async def em_thread_db(funcao, *args, **kwargs):
+    """Roda funcao(*args, **kwargs) no pool do banco (para trabalho com uma sessão que já existe)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(funcao, *args, **kwargs))
+
+async def executar_db(funcao, *args, **kwargs):
+    """Roda funcao(db, *args, **kwargs) no pool do banco com uma sessão própria, fechada ao final"""
+    def com_sessao():
+        db = SessionLocal()
+        try:
+            return funcao(db, *args, **kwargs)
+        finally:
+            db.close()
+    return await em_thread_db(com_sessao)
+
+def encerrar_executor_db():
+    _db_executor.shutdown(wait=True)
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+import asyncio
 import logging
 from starlette.middleware.base import BaseHTTPMiddleware
 from datetime import date
@@ -117,6 +118,16 @@ async def startup_event():
         Base.metadata.create_all(bind=engine)
         logger.info("✅ Database tables created successfully")
         
+        # Busca textual: no SQLite a tabela FTS5 é criada aqui; no PostgreSQL via migração
+        if engine.dialect.name == "sqlite":
+            try:
+                from .services.busca_service import BuscaService
+                with engine.begin() as connection:
+                    BuscaService.instalar(connection)
+                logger.info("✅ Search index (FTS5) ready")
+            except Exception as e:
+                logger.warning(f"⚠️ Search index not created: {e}")
+        
         # Initialize database with admin user and basic data
         db = next(get_db())
         
@@ -138,6 +149,15 @@ async def startup_event():
         initialize_basic_data(db)
         
         db.close()
+        
+        # Despachante do outbox do Telegram (notificações gravadas pelo agendador e afins)
+        from .services.telegram_outbox_service import telegram_outbox
+        telegram_outbox.iniciar()
+        
+        # Workers da fila de updates do webhook do Telegram
+        from .services.telegram_update_queue import telegram_updates
+        telegram_updates.iniciar()
+        
         logger.info("🚀 Application startup completed successfully")
         
     except Exception as e:
@@ -153,6 +173,25 @@ async def shutdown_event():
         if telegram_polling.is_running:
             await telegram_polling.stop_polling()
             logger.info("🛑 Telegram polling stopped on shutdown")
+        
+        # Drain webhook update queue
+        from .services.telegram_update_queue import telegram_updates
+        await asyncio.to_thread(telegram_updates.parar)
+        
+        # Stop telegram outbox dispatcher
+        from .services.telegram_outbox_service import telegram_outbox
+        await telegram_outbox.parar()
+        
+        # Close shared HTTP clients (Telegram, WhatsApp, OpenAI)
+        from .core.http_clients import ClientesHTTP
+        from .core.openai_client import ClienteOpenAI
+        await ClientesHTTP.fechar()
+        ClienteOpenAI.fechar_sincrono()
+        
+        # Wait for in-flight async DB work
+        from .database import encerrar_executor_db
+        await asyncio.to_thread(encerrar_executor_db)
+        await asyncio.to_thread(ClienteOpenAI.encerrar_executor)
     except Exception as e:
         logger.error(f"❌ Shutdown error: {e}")
 
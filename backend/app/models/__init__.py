@@ -4,4 +4,8 @@ from .financial import *
 from .financiamento import *
 from .telegram_user import *
 from .transacao_recorrente import *
-from .notification import *
\ No newline at end of file
+from .notification import *
+from .rollup import *
+from .telegram_outbox import *
+from .telegram_polling import *
+from .llm_cache import *
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Enum as SQLEnum, Text, Date
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Enum as SQLEnum, Text, Date, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
 from enum import Enum
@@ -189,6 +189,13 @@ class ParcelaCartao(Base):
 
 class Transacao(Base):
     __tablename__ = "transacoes"
+    __table_args__ = (
+        # Índices compostos dos caminhos quentes (aplicar em bancos existentes via POST /api/migration/add-indices-transacoes)
+        Index("idx_transacoes_tenant_data", "tenant_id", "data"),  # dashboard, listagens, resumos por período
+        Index("idx_transacoes_cartao_data_tipo", "cartao_id", "data", "tipo"),  # calcular_fatura_cartao
+        Index("idx_transacoes_tenant_categoria_data", "tenant_id", "categoria_id", "data"),  # planejamento
+        Index("idx_transacoes_fatura", "fatura_id"),  # recalcular_valor_fatura
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     descricao = Column(String, nullable=False)
@@ -231,6 +238,9 @@ class Transacao(Base):
     is_financiamento = Column(Boolean, default=False)
     parcela_financiamento_id = Column(Integer, ForeignKey("parcelas_financiamento.id"), nullable=True)
     
+    # Transação recorrente que gerou esta transação (agendador ou confirmação via Telegram)
+    transacao_recorrente_id = Column(Integer, ForeignKey("transacoes_recorrentes.id", ondelete="SET NULL"), nullable=True)
+    
     # Tenant isolation
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -247,6 +257,14 @@ class Transacao(Base):
     # Relacionamento para financiamentos
     parcela_financiamento = relationship("ParcelaFinanciamento", foreign_keys=[parcela_financiamento_id])
 
+# No máximo uma transação por recorrência e dia: reexecuções do agendador não duplicam
+Index(
+    "uq_transacoes_recorrente_dia",
+    Transacao.transacao_recorrente_id,
+    func.date(Transacao.data),
+    unique=True
+)
+
 class PlanejamentoMensal(Base):
     __tablename__ = "planejamentos_mensais"
     
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+from datetime import datetime
+from ..database import Base
+
+class LLMRespostaCache(Base):
+    """Respostas do OpenAI já obtidas, por chave (modelo + prompt normalizado + contexto do tenant)"""
+    __tablename__ = "llm_respostas_cache"
+
+    chave = Column(String(64), primary_key=True)  # sha256 hex
+    modelo = Column(String, nullable=False)
+    resposta = Column(Text, nullable=False)
+    tokens = Column(Integer, default=0)  # tokens gastos na chamada original (economizados a cada hit)
+    hits = Column(Integer, default=0)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    expira_em = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('idx_llm_respostas_cache_expira_em', 'expira_em'),
+    )
+
+    def __repr__(self):
+        return f"<LLMRespostaCache(chave='{self.chave[:12]}', modelo='{self.modelo}', hits={self.hits})>"
@@ -0,0 +1,246 @@
+"""
+Rollup mensal de transações por tenant
+
+Mantém somas e contagens de `transacoes` agrupadas por
+(tenant_id, ano, mes, categoria_id, conta_id, cartao_id, tipo).
+A manutenção é incremental: os eventos de flush da Session aplicam os deltas
+de cada Transacao criada, alterada ou excluída via ORM.
+
+Os mesmos eventos mantêm Fatura.valor_total (soma das SAIDAs vinculadas à fatura)
+com deltas, inclusive quando a transação muda de fatura/cartão.
+"""
+
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint, Index, event, select, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Tuple, List
+
+from ..database import Base
+from .financial import Transacao, TipoTransacao, Fatura
+
+# conta_id/cartao_id = 0 representa "sem conta"/"sem cartão" (permite a chave única)
+SEM_VINCULO = 0
+
+
+class TransacaoRollupMensal(Base):
+    __tablename__ = "transacoes_rollup_mensal"
+    __table_args__ = (
+        UniqueConstraint(
+            "tenant_id", "ano", "mes", "categoria_id", "conta_id", "cartao_id", "tipo",
+            name="uq_transacoes_rollup_mensal_chave"
+        ),
+        Index("idx_transacoes_rollup_mensal_periodo", "tenant_id", "ano", "mes"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    ano = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)  # 1-12
+    categoria_id = Column(Integer, nullable=False)
+    conta_id = Column(Integer, nullable=False, default=SEM_VINCULO)
+    cartao_id = Column(Integer, nullable=False, default=SEM_VINCULO)
+    tipo = Column(SQLEnum(TipoTransacao), nullable=False)
+
+    total = Column(Float, nullable=False, default=0.0)
+    quantidade = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RollupMensalTenant(Base):
+    """Marca os tenants cujo rollup já foi reconstruído e pode ser usado nas leituras"""
+    __tablename__ = "transacoes_rollup_tenants"
+
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), primary_key=True)
+    reconstruido_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+ChaveRollup = Tuple[int, int, int, int, int, int, str]
+
+_COLUNAS_ROLLUP = (
+    Transacao.id, Transacao.tenant_id, Transacao.data, Transacao.categoria_id,
+    Transacao.conta_id, Transacao.cartao_id, Transacao.tipo, Transacao.valor, Transacao.fatura_id
+)
+_CAMPOS_ROLLUP = ("tenant_id", "data", "categoria_id", "conta_id", "cartao_id", "tipo", "valor", "fatura_id")
+_ESTADO_ANTERIOR = "rollup_mensal_estado_anterior"
+
+
+def _chave(linha) -> ChaveRollup:
+    tipo = linha.tipo.value if isinstance(linha.tipo, TipoTransacao) else str(linha.tipo)
+    return (
+        linha.tenant_id,
+        linha.data.year,
+        linha.data.month,
+        linha.categoria_id,
+        linha.conta_id or SEM_VINCULO,
+        linha.cartao_id or SEM_VINCULO,
+        tipo,
+    )
+
+
+def _carregar_linhas(connection, ids: List[int]) -> Dict[int, object]:
+    if not ids:
+        return {}
+    linhas = connection.execute(select(*_COLUNAS_ROLLUP).where(Transacao.id.in_(ids))).all()
+    return {linha.id: linha for linha in linhas}
+
+
+def aplicar_deltas_rollup(connection, deltas: Dict[ChaveRollup, List[float]]) -> None:
+    """
+    Aplica deltas {chave: [total, quantidade]} ao rollup com upsert
+    Usa INSERT ... ON CONFLICT no PostgreSQL/SQLite e UPDATE+INSERT nos demais bancos
+    """
+    tabela = TransacaoRollupMensal.__table__
+    agora = datetime.utcnow()
+
+    for chave, (total, quantidade) in deltas.items():
+        if quantidade == 0 and abs(total) < 1e-9:
+            continue
+
+        tenant_id, ano, mes, categoria_id, conta_id, cartao_id, tipo = chave
+        valores = dict(
+            tenant_id=tenant_id, ano=ano, mes=mes, categoria_id=categoria_id,
+            conta_id=conta_id, cartao_id=cartao_id, tipo=tipo,
+            total=total, quantidade=quantidade, atualizado_em=agora
+        )
+        dialeto = connection.dialect.name
+
+        if dialeto in ("postgresql", "sqlite"):
+            if dialeto == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(tabela).values(**valores)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["tenant_id", "ano", "mes", "categoria_id", "conta_id", "cartao_id", "tipo"],
+                set_={
+                    "total": tabela.c.total + stmt.excluded.total,
+                    "quantidade": tabela.c.quantidade + stmt.excluded.quantidade,
+                    "atualizado_em": agora,
+                }
+            )
+            connection.execute(stmt)
+            continue
+
+        resultado = connection.execute(
+            tabela.update().where(
+                (tabela.c.tenant_id == tenant_id) & (tabela.c.ano == ano) & (tabela.c.mes == mes) &
+                (tabela.c.categoria_id == categoria_id) & (tabela.c.conta_id == conta_id) &
+                (tabela.c.cartao_id == cartao_id) & (tabela.c.tipo == tipo)
+            ).values(
+                total=tabela.c.total + total,
+                quantidade=tabela.c.quantidade + quantidade,
+                atualizado_em=agora
+            )
+        )
+        if resultado.rowcount == 0:
+            connection.execute(tabela.insert().values(**valores))
+
+
+def _acumular(deltas: Dict[ChaveRollup, List[float]], linha, sinal: int) -> None:
+    delta = deltas.setdefault(_chave(linha), [0.0, 0])
+    delta[0] += sinal * float(linha.valor or 0)
+    delta[1] += sinal
+
+
+def _acumular_fatura(deltas_fatura: Dict[int, float], linha, sinal: int) -> None:
+    """Só SAIDAs vinculadas a uma fatura compõem Fatura.valor_total"""
+    tipo = linha.tipo.value if isinstance(linha.tipo, TipoTransacao) else str(linha.tipo)
+    if linha.fatura_id and tipo == TipoTransacao.SAIDA.value:
+        deltas_fatura[linha.fatura_id] = deltas_fatura.get(linha.fatura_id, 0.0) + sinal * float(linha.valor or 0)
+
+
+def aplicar_deltas_fatura(session: Session, connection, deltas_fatura: Dict[int, float]) -> None:
+    """
+    Soma os deltas em faturas.valor_total direto no banco (UPDATE atômico, sem reler as transações)
+    e sincroniza as instâncias de Fatura já carregadas na sessão
+    """
+    tabela = Fatura.__table__
+    for fatura_id, delta in deltas_fatura.items():
+        if abs(delta) < 1e-9:
+            continue
+
+        connection.execute(
+            tabela.update().where(tabela.c.id == fatura_id).values(
+                valor_total=func.coalesce(tabela.c.valor_total, 0.0) + delta
+            )
+        )
+
+        fatura = session.identity_map.get(session.identity_key(Fatura, fatura_id))
+        if fatura is not None and "valor_total" in fatura.__dict__:
+            set_committed_value(fatura, "valor_total", (fatura.valor_total or 0.0) + delta)
+
+
+def registrar_insercoes_rollup(connection, mapeamentos: List[dict]) -> None:
+    """
+    Aplica ao rollup as transações inseridas fora do unit of work (INSERT em lote)
+    Cada mapeamento precisa de tenant_id, data, categoria_id, conta_id, cartao_id, tipo e valor
+    """
+    deltas: Dict[ChaveRollup, List[float]] = {}
+    for mapeamento in mapeamentos:
+        _acumular(deltas, SimpleNamespace(**mapeamento), +1)
+    aplicar_deltas_rollup(connection, deltas)
+
+
+def _alterou_rollup(session: Session, obj: Transacao) -> bool:
+    if not session.is_modified(obj):
+        return False
+    estado = obj._sa_instance_state
+    return any(estado.attrs[campo].history.has_changes() for campo in _CAMPOS_ROLLUP)
+
+
+@event.listens_for(Session, "before_flush")
+def _capturar_estado_anterior(session, flush_context, instances):
+    """Lê do banco, antes do flush, o estado das transações alteradas/excluídas"""
+    ids = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, Transacao) and obj.id is not None and _alterou_rollup(session, obj)
+    ]
+    ids += [obj.id for obj in session.deleted if isinstance(obj, Transacao) and obj.id is not None]
+    if not ids:
+        return
+
+    anteriores = session.info.setdefault(_ESTADO_ANTERIOR, {})
+    for transacao_id, linha in _carregar_linhas(session.connection(), ids).items():
+        # Em vários flushes na mesma transação, o primeiro estado já foi consumido no after_flush
+        anteriores[transacao_id] = linha
+
+
+@event.listens_for(Session, "after_flush")
+def _atualizar_rollup(session, flush_context):
+    """Aplica ao rollup os deltas das transações gravadas neste flush"""
+    anteriores = session.info.pop(_ESTADO_ANTERIOR, {})
+    novos_ids = [obj.id for obj in session.new if isinstance(obj, Transacao)]
+    alterados_ids = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, Transacao) and obj.id in anteriores
+    ]
+    excluidos_ids = [
+        obj.id for obj in session.deleted
+        if isinstance(obj, Transacao) and obj.id in anteriores
+    ]
+    if not novos_ids and not alterados_ids and not excluidos_ids:
+        return
+
+    connection = session.connection()
+    atuais = _carregar_linhas(connection, novos_ids + alterados_ids)
+    deltas: Dict[ChaveRollup, List[float]] = {}
+    deltas_fatura: Dict[int, float] = {}
+
+    def somar(linha, sinal: int) -> None:
+        _acumular(deltas, linha, sinal)
+        _acumular_fatura(deltas_fatura, linha, sinal)
+
+    for transacao_id in novos_ids:
+        if transacao_id in atuais:
+            somar(atuais[transacao_id], +1)
+    for transacao_id in alterados_ids:
+        somar(anteriores[transacao_id], -1)
+        if transacao_id in atuais:
+            somar(atuais[transacao_id], +1)
+    for transacao_id in excluidos_ids:
+        somar(anteriores[transacao_id], -1)
+
+    aplicar_deltas_rollup(connection, deltas)
+    aplicar_deltas_fatura(session, connection, deltas_fatura)
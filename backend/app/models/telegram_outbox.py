@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
+from datetime import datetime
+from ..database import Base
+
+class TelegramOutbox(Base):
+    """Mensagens do Telegram a enviar, gravadas na mesma transação que as originou e drenadas pelo despachante"""
+    __tablename__ = "telegram_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(String, nullable=False)
+    texto = Column(Text, nullable=False)
+    parse_mode = Column(String(20), nullable=True, default="Markdown")
+    reply_markup = Column(Text, nullable=True)  # JSON dos botões inline
+    texto_fallback = Column(Text, nullable=True)  # Enviado sem botões se o Telegram recusar a mensagem (ex.: Markdown inválido)
+
+    # Controle de envio
+    status = Column(String(20), nullable=False, default="PENDENTE")  # PENDENTE, ENVIANDO, ENVIADA, FALHA
+    tentativas = Column(Integer, nullable=False, default=0)
+    proxima_tentativa_em = Column(DateTime, nullable=False, default=datetime.utcnow)  # Em ENVIANDO: fim da reserva do despachante
+    despachante = Column(String(64), nullable=True)  # Quem reservou a mensagem (evita envio duplicado entre processos)
+    ultimo_erro = Column(Text, nullable=True)
+    telegram_message_id = Column(String, nullable=True)
+
+    # Origem
+    confirmacao_id = Column(Integer, ForeignKey("confirmacoes_transacao.id"), nullable=True)
+    broadcast_id = Column(Integer, ForeignKey("telegram_broadcasts.id"), nullable=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True)
+
+    criada_em = Column(DateTime, default=datetime.utcnow)
+    enviada_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_telegram_outbox_status_proxima", "status", "proxima_tentativa_em"),
+    )
+
+    def __repr__(self):
+        return f"<TelegramOutbox(id={self.id}, chat_id='{self.chat_id}', status='{self.status}')>"
+
+
+class TelegramBroadcast(Base):
+    """Broadcast do admin: o público vira linhas no outbox e o progresso é contado a partir delas"""
+    __tablename__ = "telegram_broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mensagem = Column(Text, nullable=False)
+    target_type = Column(String(20), nullable=False, default="all")  # all, active, specific
+    total_destinatarios = Column(Integer, nullable=False, default=0)
+    status = Column(String(20), nullable=False, default="EM_ANDAMENTO")  # EM_ANDAMENTO, CONCLUIDO
+    criado_por = Column(String, nullable=True)  # Email do admin
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    concluido_em = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<TelegramBroadcast(id={self.id}, total={self.total_destinatarios}, status='{self.status}')>"
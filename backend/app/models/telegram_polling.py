@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from datetime import datetime
+from ..database import Base
+
+class TelegramPollingOffset(Base):
+    """Último update_id processado pelo polling (getUpdates) de cada bot"""
+    __tablename__ = "telegram_polling_offsets"
+
+    bot_id = Column(String, primary_key=True)  # Parte numérica do token (antes do ':')
+    last_update_id = Column(BigInteger, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TelegramPollingOffset(bot_id='{self.bot_id}', last_update_id={self.last_update_id})>"
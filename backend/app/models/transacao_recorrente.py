@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, Date, DateTime, ForeignKey, CheckConstraint, Text
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, Date, DateTime, ForeignKey, CheckConstraint, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -17,6 +17,7 @@ class TransacaoRecorrente(Base):
     data_inicio = Column(Date, nullable=False)
     data_fim = Column(Date, nullable=True)
     ativa = Column(Boolean, default=True)
+    proxima_ocorrencia = Column(Date, nullable=True)  # Próxima ocorrência ainda não processada pelo agendador (None = encerrada)
     icone_personalizado = Column(String(50), nullable=True)  # Ícone personalizado (netflix, spotify, etc.)
     created_by_name = Column(String(255), nullable=True)  # Identificação de quem criou a transação recorrente
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
@@ -40,6 +41,7 @@ class TransacaoRecorrente(Base):
             "frequencia IN ('DIARIA', 'SEMANAL', 'QUINZENAL', 'MENSAL', 'BIMESTRAL', 'TRIMESTRAL', 'SEMESTRAL', 'ANUAL')",
             name='check_frequencia_valida'
         ),
+        Index("idx_recorrentes_ativa_proxima", "ativa", "proxima_ocorrencia"),  # agendador: só as que vencem no dia
     )
     
     def __repr__(self):
@@ -0,0 +1,138 @@
+"""
+Execução em lotes do agendador
+
+O trabalho do dia (ids + tenant) é dividido em lotes agrupados por tenant e os lotes rodam
+em paralelo em um pool limitado de threads. Cada lote tem a própria sessão e faz o próprio
+commit, então uma linha problemática ou um lote lento não seguram locks do job inteiro.
+Falhas de banco no lote (deadlock, lock timeout, conexão perdida) são repetidas com backoff.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import random
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+ProcessarLote = Callable[[Session, List[int]], Dict[str, Any]]
+
+
+class ExecutorLotes:
+
+    @staticmethod
+    def particionar(itens: List[Tuple[int, int]], tamanho_lote: int) -> List[Dict[str, Any]]:
+        """
+        Agrupa (id, tenant_id) em lotes de até tamanho_lote itens sem misturar tenants além do necessário:
+        tenants pequenos dividem um lote; um tenant maior que o lote ocupa vários lotes só dele
+        """
+        por_tenant: Dict[int, List[int]] = {}
+        for item_id, tenant_id in itens:
+            por_tenant.setdefault(tenant_id, []).append(item_id)
+
+        lotes = []
+        atual = {"tenants": [], "ids": []}
+        for tenant_id, ids in sorted(por_tenant.items(), key=lambda par: -len(par[1])):
+            if len(ids) >= tamanho_lote:
+                for inicio in range(0, len(ids), tamanho_lote):
+                    lotes.append({"tenants": [tenant_id], "ids": ids[inicio:inicio + tamanho_lote]})
+                continue
+
+            if len(atual["ids"]) + len(ids) > tamanho_lote:
+                lotes.append(atual)
+                atual = {"tenants": [], "ids": []}
+            atual["tenants"].append(tenant_id)
+            atual["ids"].extend(ids)
+
+        if atual["ids"]:
+            lotes.append(atual)
+        return lotes
+
+    @staticmethod
+    def _executar_lote(nome: str, numero: int, lote: Dict[str, Any], processar_lote: ProcessarLote, tentativas: int) -> Dict[str, Any]:
+        """Processa um lote em sessão própria com commit próprio, repetindo com backoff em erro de banco"""
+        inicio = time.perf_counter()
+        info = {"lote": numero, "tenants": lote["tenants"], "itens": len(lote["ids"]), "tentativas": 0, "erro": None}
+
+        for tentativa in range(1, tentativas + 1):
+            info["tentativas"] = tentativa
+            db = SessionLocal()
+            try:
+                resultado = processar_lote(db, lote["ids"])
+                db.commit()
+                info["duracao_segundos"] = round(time.perf_counter() - inicio, 3)
+                return {"info": info, "resultado": resultado}
+            except SQLAlchemyError as e:
+                db.rollback()
+                if tentativa == tentativas:
+                    info["erro"] = str(e)
+                    break
+                espera = settings.AGENDADOR_BACKOFF_SEGUNDOS * 2 ** (tentativa - 1) * (1 + random.random())
+                logger.warning(f"⚠️ {nome}: lote {numero} falhou (tentativa {tentativa}/{tentativas}), nova tentativa em {espera:.1f}s: {e}")
+                time.sleep(espera)
+            except Exception as e:
+                db.rollback()
+                info["erro"] = str(e)
+                break
+            finally:
+                db.close()
+
+        logger.error(f"❌ {nome}: lote {numero} (tenants {lote['tenants']}) abortado: {info['erro']}")
+        info["duracao_segundos"] = round(time.perf_counter() - inicio, 3)
+        return {"info": info, "resultado": None}
+
+    @staticmethod
+    def executar(
+        nome: str,
+        itens: List[Tuple[int, int]],
+        processar_lote: ProcessarLote,
+        max_workers: Optional[int] = None,
+        tamanho_lote: Optional[int] = None,
+        tentativas: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa processar_lote(db, ids) para cada lote de itens (id, tenant_id)
+        processar_lote devolve contadores numéricos + "detalhes"; o retorno agrega tudo e
+        inclui "lotes" com tenants, itens, tentativas e duração de cada lote
+        """
+        tamanho_lote = tamanho_lote or settings.AGENDADOR_TAMANHO_LOTE
+        tentativas = tentativas or settings.AGENDADOR_TENTATIVAS
+        max_workers = max_workers or settings.AGENDADOR_MAX_WORKERS
+        if engine.dialect.name == "sqlite":
+            max_workers = 1  # SQLite serializa escritas: lotes em paralelo só disputariam o lock do arquivo
+
+        lotes = ExecutorLotes.particionar(itens, tamanho_lote)
+        inicio = time.perf_counter()
+        logger.info(f"🧩 {nome}: {len(itens)} item(ns) em {len(lotes)} lote(s), {max_workers} worker(s)")
+
+        agregado: Dict[str, Any] = {"detalhes": [], "lotes": [], "lotes_com_falha": 0}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agendador") as pool:
+            futuros = [
+                pool.submit(ExecutorLotes._executar_lote, nome, numero, lote, processar_lote, tentativas)
+                for numero, lote in enumerate(lotes, start=1)
+            ]
+            for futuro in as_completed(futuros):
+                execucao = futuro.result()
+                agregado["lotes"].append(execucao["info"])
+                resultado = execucao["resultado"]
+                if resultado is None:
+                    agregado["lotes_com_falha"] += 1
+                    agregado["erros"] = agregado.get("erros", 0) + execucao["info"]["itens"]
+                    continue
+
+                for chave, valor in resultado.items():
+                    if chave == "detalhes":
+                        agregado["detalhes"].extend(valor)
+                    elif isinstance(valor, (int, float)):
+                        agregado[chave] = agregado.get(chave, 0) + valor
+
+        agregado["lotes"].sort(key=lambda info: info["lote"])
+        agregado["duracao_segundos"] = round(time.perf_counter() - inicio, 3)
+        logger.info(f"✅ {nome}: {len(lotes)} lote(s) em {agregado['duracao_segundos']:.2f}s ({agregado['lotes_com_falha']} com falha)")
+        return agregado
@@ -4,18 +4,23 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, text
 from typing import List, Dict, Any, Optional
 
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..models.transacao_recorrente import TransacaoRecorrente
 from ..models.financial import Transacao, TipoTransacao, Conta
 from ..models.telegram_user import TelegramUser
 from ..models.user import User
-from ..api.transacoes_recorrentes import calcular_proximo_vencimento
+from ..services.recorrencia_service import RecorrenciaService
 from ..models.transacao_recorrente import ConfirmacaoTransacao
 from ..models.financiamento import Financiamento, ParcelaFinanciamento, StatusParcela
 from ..services.financiamento_service import FinanciamentoService
+from ..services.agendador_runner import ExecutorLotes
+from ..services.telegram_outbox_service import TelegramOutboxService
 
 logger = logging.getLogger(__name__)
 
+# Tamanho máximo das listas IN nas consultas em lote
+LOTE_IDS = 1000
+
 class AgendadorService:
     """Serviço para processar transações recorrentes e criar transações reais"""
     
@@ -29,78 +34,116 @@ class AgendadorService:
             
         logger.info(f"🔄 Iniciando processamento de transações recorrentes para {data_processamento}")
         
-        db = next(get_db())
+        db = SessionLocal()
         try:
-            # Buscar todas as transações recorrentes ativas
-            transacoes_recorrentes = db.query(TransacaoRecorrente).filter(
-                TransacaoRecorrente.ativa == True,
-                TransacaoRecorrente.data_inicio <= data_processamento,
-                # Se tem data_fim, verificar se ainda não expirou
-                or_(
-                    TransacaoRecorrente.data_fim.is_(None),
-                    TransacaoRecorrente.data_fim >= data_processamento
-                )
-            ).all()
-            
-            estatisticas = {
-                "data_processamento": data_processamento.isoformat(),
-                "total_recorrentes_ativas": len(transacoes_recorrentes),
-                "processadas": 0,
-                "criadas": 0,
-                "erros": 0,
-                "detalhes": []
-            }
-            
-            for transacao_recorrente in transacoes_recorrentes:
-                try:
-                    resultado = AgendadorService._processar_transacao_individual(
-                        db, transacao_recorrente, data_processamento
-                    )
-                    
-                    estatisticas["processadas"] += 1
-                    if resultado["criada"]:
-                        estatisticas["criadas"] += 1
-                        
-                    estatisticas["detalhes"].append(resultado)
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erro ao processar transação {transacao_recorrente.id}: {e}")
-                    estatisticas["erros"] += 1
-                    estatisticas["detalhes"].append({
-                        "transacao_recorrente_id": transacao_recorrente.id,
-                        "descricao": transacao_recorrente.descricao,
-                        "erro": str(e),
-                        "criada": False
-                    })
-            
+            # Recorrências antigas (anteriores à coluna proxima_ocorrencia) ganham o valor na primeira execução
+            AgendadorService._preencher_proximas_ocorrencias(db, data_processamento)
             db.commit()
-            logger.info(f"✅ Processamento concluído: {estatisticas['criadas']} transações criadas, {estatisticas['erros']} erros")
-            return estatisticas
             
+            # Só as recorrências que vencem até hoje (índice ativa + proxima_ocorrencia); as linhas são carregadas por lote
+            vencendo = db.query(TransacaoRecorrente.id, TransacaoRecorrente.tenant_id).filter(
+                TransacaoRecorrente.ativa == True,
+                TransacaoRecorrente.proxima_ocorrencia <= data_processamento
+            ).all()
         except Exception as e:
             db.rollback()
             logger.error(f"❌ Erro geral no processamento: {e}")
             raise
         finally:
             db.close()
+        
+        resultado = ExecutorLotes.executar(
+            "Transações recorrentes",
+            [(transacao_id, tenant_id) for transacao_id, tenant_id in vencendo],
+            lambda db_lote, ids: AgendadorService._processar_lote_recorrentes(db_lote, ids, data_processamento)
+        )
+        estatisticas = {
+            "data_processamento": data_processamento.isoformat(),
+            "total_recorrentes_vencendo": len(vencendo),
+            "processadas": 0,
+            "criadas": 0,
+            "erros": 0,
+            **resultado
+        }
+        
+        logger.info(f"✅ Processamento concluído: {estatisticas['criadas']} transações criadas, {estatisticas['erros']} erros")
+        return estatisticas
+    
+    @staticmethod
+    def _processar_lote_recorrentes(db: Session, ids: List[int], data_processamento: date) -> Dict[str, Any]:
+        """Processa um lote de recorrências na sessão do lote (o commit é feito pelo ExecutorLotes)"""
+        transacoes_recorrentes = db.query(TransacaoRecorrente).filter(
+            TransacaoRecorrente.id.in_(ids),
+            TransacaoRecorrente.ativa == True,
+            TransacaoRecorrente.proxima_ocorrencia <= data_processamento
+        ).order_by(TransacaoRecorrente.id).all()
+        
+        estatisticas = {"processadas": 0, "criadas": 0, "erros": 0, "detalhes": []}
+        
+        # Uma consulta por lote (em vez de 3-5 por recorrência): ocorrências já geradas e destinatários Telegram
+        materializadas = AgendadorService._ocorrencias_materializadas(
+            db, [transacao.id for transacao in transacoes_recorrentes], data_processamento
+        )
+        destinatarios = AgendadorService._destinatarios_telegram(
+            db, {transacao.tenant_id for transacao in transacoes_recorrentes}
+        )
+        
+        for transacao_recorrente in transacoes_recorrentes:
+            try:
+                # Savepoint: se a recorrência falhar, o avanço de proxima_ocorrencia é desfeito junto
+                with db.begin_nested():
+                    resultado = AgendadorService._processar_transacao_individual(
+                        db, transacao_recorrente, data_processamento, materializadas, destinatarios
+                    )
+                
+                estatisticas["processadas"] += 1
+                if resultado["criada"]:
+                    estatisticas["criadas"] += 1
+                    
+                estatisticas["detalhes"].append(resultado)
+                
+            except Exception as e:
+                logger.error(f"❌ Erro ao processar transação {transacao_recorrente.id}: {e}")
+                estatisticas["erros"] += 1
+                estatisticas["detalhes"].append({
+                    "transacao_recorrente_id": transacao_recorrente.id,
+                    "descricao": transacao_recorrente.descricao,
+                    "erro": str(e),
+                    "criada": False
+                })
+        
+        return estatisticas
     
     @staticmethod
     def _processar_transacao_individual(
         db: Session, 
         transacao_recorrente: TransacaoRecorrente, 
-        data_processamento: date
+        data_processamento: date,
+        materializadas: Optional[Dict[int, Optional[int]]] = None,
+        destinatarios: Optional[Dict[int, Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
-        """Processa uma transação recorrente individual"""
-        # Calcular próximo vencimento
-        proximo_vencimento = calcular_proximo_vencimento(
+        """
+        Processa uma transação recorrente individual
+        materializadas/destinatarios vêm pré-carregados do lote; se omitidos, são buscados só para esta recorrência
+        """
+        if materializadas is None:
+            materializadas = AgendadorService._ocorrencias_materializadas(db, [transacao_recorrente.id], data_processamento)
+        if destinatarios is None:
+            destinatarios = AgendadorService._destinatarios_telegram(db, {transacao_recorrente.tenant_id})
+        
+        # Calcular próximo vencimento (ocorrências perdidas em dias sem execução não são geradas)
+        # None: a recorrência terminou (data_fim) - mesmo com proxima_ocorrencia atrasada nada é criado
+        proximo_vencimento = RecorrenciaService.proxima_ocorrencia(
             transacao_recorrente.data_inicio,
-            transacao_recorrente.frequencia
+            transacao_recorrente.frequencia,
+            a_partir_de=data_processamento,
+            data_fim=transacao_recorrente.data_fim
         )
         
         resultado = {
             "transacao_recorrente_id": transacao_recorrente.id,
             "descricao": transacao_recorrente.descricao,
-            "proximo_vencimento": proximo_vencimento.isoformat(),
+            "proximo_vencimento": proximo_vencimento.isoformat() if proximo_vencimento else None,
             "criada": False,
             "confirmacao_criada": False,
             "transacao_id": None,
@@ -108,72 +151,24 @@ class AgendadorService:
             "motivo": None
         }
         
+        # Avançar proxima_ocorrencia antes de gerar a transação; se outra execução já avançou, não duplicar
+        if not AgendadorService._avancar_proxima_ocorrencia(db, transacao_recorrente, data_processamento):
+            resultado["motivo"] = "Ocorrência já processada por outra execução"
+            return resultado
+        
         # Verificar se deve criar transação hoje
         if proximo_vencimento == data_processamento:
-            # Verificar se já existe transação para esta data
-            transacao_existente = db.query(Transacao).filter(
-                Transacao.tenant_id == transacao_recorrente.tenant_id,
-                Transacao.descricao == f"[AUTO] {transacao_recorrente.descricao}",
-                Transacao.data >= datetime.combine(data_processamento, datetime.min.time()),
-                Transacao.data < datetime.combine(data_processamento + timedelta(days=1), datetime.min.time())
-            ).first()
-            
-            if transacao_existente:
+            if transacao_recorrente.id in materializadas:
                 resultado["motivo"] = "Transação já existe para esta data"
-                resultado["transacao_id"] = transacao_existente.id
+                resultado["transacao_id"] = materializadas[transacao_recorrente.id]
                 logger.info(f"⚠️ Transação já existe: {transacao_recorrente.descricao}")
             else:
-                # Verificar se usuário quer confirmação via Telegram
-                telegram_user = None
-                try:
-                    # Buscar o usuário específico que criou esta transação recorrente
-                    # Primeiro, tenta encontrar pelo nome (created_by_name)
-                    if transacao_recorrente.created_by_name:
-                        # Buscar usuários do tenant
-                        from ..models.user import User
-                        
-                        # Primeiro, encontrar o usuário por nome
-                        user = db.query(User).filter(
-                            User.tenant_id == transacao_recorrente.tenant_id,
-                            User.full_name == transacao_recorrente.created_by_name
-                        ).first()
-                        
-                        if user:
-                            # Depois, buscar o telegram_user
-                            telegram_user = db.query(TelegramUser).filter(
-                                TelegramUser.user_id == user.id,
-                                TelegramUser.is_authenticated == True,
-                                TelegramUser.confirmar_transacoes_recorrentes == True
-                            ).first()
-                    
-                    # Se não encontrou, busca qualquer usuário do tenant com confirmação ativada
-                    if not telegram_user:
-                        # Buscar qualquer usuário do tenant
-                        from ..models.user import User
-                        
-                        users_do_tenant = db.query(User).filter(
-                            User.tenant_id == transacao_recorrente.tenant_id
-                        ).all()
-                        
-                        for user in users_do_tenant:
-                            telegram_user = db.query(TelegramUser).filter(
-                                TelegramUser.user_id == user.id,
-                                TelegramUser.is_authenticated == True,
-                                TelegramUser.confirmar_transacoes_recorrentes == True
-                            ).first()
-                            
-                            if telegram_user:
-                                logger.info(f"⚠️ Transação recorrente criada por '{transacao_recorrente.created_by_name}' - usando configuração de '{user.full_name}'")
-                                break
-                    
-                except Exception as e:
-                    # Campos não existem ainda (migração não executada)
-                    if "does not exist" in str(e):
-                        logger.warning("⚠️ Campos de confirmação não existem - execute a migração")
-                        telegram_user = None
-                    else:
-                        logger.error(f"❌ Erro ao buscar configuração telegram: {e}")
-                        telegram_user = None  # Continuar sem confirmação ao invés de falhar
+                # Verificar se usuário quer confirmação via Telegram (destinatários pré-carregados por tenant)
+                destinatarios_tenant = destinatarios.get(transacao_recorrente.tenant_id, {})
+                telegram_user = destinatarios_tenant.get("por_nome", {}).get(transacao_recorrente.created_by_name)
+                if not telegram_user and destinatarios_tenant.get("padrao"):
+                    telegram_user, nome_usuario = destinatarios_tenant["padrao"]
+                    logger.info(f"⚠️ Transação recorrente criada por '{transacao_recorrente.created_by_name}' - usando configuração de '{nome_usuario}'")
                 
                 if telegram_user:
                     # Criar confirmação ao invés de transação direta
@@ -187,11 +182,120 @@ class AgendadorService:
                         db, transacao_recorrente, data_processamento
                     )
                     resultado.update(resultado_transacao)
+                materializadas[transacao_recorrente.id] = resultado["transacao_id"]
+        elif proximo_vencimento is None:
+            resultado["motivo"] = "Recorrência encerrada (data_fim)"
         else:
             resultado["motivo"] = f"Não é dia de vencimento (próximo: {proximo_vencimento})"
         
         return resultado
     
+    @staticmethod
+    def _preencher_proximas_ocorrencias(db: Session, data_processamento: date) -> int:
+        """Calcula proxima_ocorrencia das recorrências ativas que ainda não têm o valor"""
+        pendentes = db.query(TransacaoRecorrente).filter(
+            TransacaoRecorrente.ativa == True,
+            TransacaoRecorrente.proxima_ocorrencia.is_(None),
+            or_(
+                TransacaoRecorrente.data_fim.is_(None),
+                TransacaoRecorrente.data_fim >= data_processamento
+            )
+        ).all()
+        
+        for transacao_recorrente in pendentes:
+            RecorrenciaService.recalcular_proxima(transacao_recorrente, a_partir_de=data_processamento)
+        
+        if pendentes:
+            db.flush()
+            logger.info(f"🗓️ proxima_ocorrencia preenchida para {len(pendentes)} recorrência(s)")
+        return len(pendentes)
+    
+    @staticmethod
+    def _ocorrencias_materializadas(db: Session, ids_recorrentes: List[int], data_processamento: date) -> Dict[int, Optional[int]]:
+        """
+        Recorrências que já têm transação (ou confirmação) gerada em data_processamento
+        Retorna {transacao_recorrente_id: transacao_id} (transacao_id None = só confirmação)
+        """
+        if not ids_recorrentes:
+            return {}
+        
+        materializadas = {}
+        inicio_dia = datetime.combine(data_processamento, datetime.min.time())
+        for inicio in range(0, len(ids_recorrentes), LOTE_IDS):
+            lote = ids_recorrentes[inicio:inicio + LOTE_IDS]
+            
+            for recorrente_id, in db.query(ConfirmacaoTransacao.transacao_recorrente_id).filter(
+                ConfirmacaoTransacao.transacao_recorrente_id.in_(lote),
+                ConfirmacaoTransacao.data_transacao == data_processamento
+            ):
+                materializadas[recorrente_id] = None
+            
+            for recorrente_id, transacao_id in db.query(Transacao.transacao_recorrente_id, Transacao.id).filter(
+                Transacao.transacao_recorrente_id.in_(lote),
+                Transacao.data >= inicio_dia,
+                Transacao.data < inicio_dia + timedelta(days=1)
+            ):
+                materializadas[recorrente_id] = transacao_id
+        
+        return materializadas
+    
+    @staticmethod
+    def _destinatarios_telegram(db: Session, tenant_ids) -> Dict[int, Dict[str, Any]]:
+        """
+        Usuários Telegram que querem confirmar transações recorrentes, por tenant (uma consulta com join)
+        {tenant_id: {"por_nome": {full_name: TelegramUser}, "padrao": (TelegramUser, full_name)}}
+        """
+        if not tenant_ids:
+            return {}
+        
+        destinatarios = {}
+        try:
+            linhas = db.query(User.tenant_id, User.full_name, TelegramUser).join(
+                TelegramUser, TelegramUser.user_id == User.id
+            ).filter(
+                User.tenant_id.in_(list(tenant_ids)),
+                TelegramUser.is_authenticated == True,
+                TelegramUser.confirmar_transacoes_recorrentes == True
+            ).order_by(User.id, TelegramUser.id).all()
+        except Exception as e:
+            # Campos não existem ainda (migração não executada)
+            if "does not exist" in str(e):
+                logger.warning("⚠️ Campos de confirmação não existem - execute a migração")
+            else:
+                logger.error(f"❌ Erro ao buscar configuração telegram: {e}")
+            return {}  # Continuar sem confirmação ao invés de falhar
+        
+        for tenant_id, full_name, telegram_user in linhas:
+            destinatarios_tenant = destinatarios.setdefault(tenant_id, {"por_nome": {}, "padrao": (telegram_user, full_name)})
+            destinatarios_tenant["por_nome"].setdefault(full_name, telegram_user)
+        
+        return destinatarios
+    
+    @staticmethod
+    def _avancar_proxima_ocorrencia(
+        db: Session,
+        transacao_recorrente: TransacaoRecorrente,
+        data_processamento: date
+    ) -> bool:
+        """
+        Move proxima_ocorrencia para a primeira ocorrência depois de data_processamento
+        UPDATE condicional no valor lido: retorna False se outra execução já avançou a recorrência
+        """
+        atual = transacao_recorrente.proxima_ocorrencia
+        nova = RecorrenciaService.proxima_ocorrencia(
+            transacao_recorrente.data_inicio,
+            transacao_recorrente.frequencia,
+            a_partir_de=data_processamento + timedelta(days=1),
+            data_fim=transacao_recorrente.data_fim
+        )
+        
+        atualizadas = db.query(TransacaoRecorrente).filter(
+            TransacaoRecorrente.id == transacao_recorrente.id,
+            TransacaoRecorrente.proxima_ocorrencia == atual
+        ).update({TransacaoRecorrente.proxima_ocorrencia: nova}, synchronize_session="fetch")
+        
+        return atualizadas == 1
+    
     @staticmethod
     def _criar_confirmacao(
         db: Session, 
@@ -233,11 +337,8 @@ class AgendadorService:
         db.add(confirmacao)
         db.flush()  # Para obter o ID
         
-        # Enviar notificação via Telegram (async - não bloqueia)
-        try:
-            AgendadorService._enviar_notificacao_confirmacao(confirmacao, telegram_user)
-        except Exception as e:
-            logger.error(f"❌ Erro ao enviar notificação de confirmação: {e}")
+        # Notificação via outbox do Telegram (só é enviada se a confirmação for gravada)
+        AgendadorService._enviar_notificacao_confirmacao(db, confirmacao, telegram_user)
         
         logger.info(f"📋 Confirmação criada: {confirmacao.descricao} - ID: {confirmacao.id}")
         
@@ -266,7 +367,8 @@ class AgendadorService:
             tenant_id=transacao_recorrente.tenant_id,
             created_by_name="Sistema Agendador",
             observacoes=f"Gerada automaticamente da recorrência ID: {transacao_recorrente.id}",
-            processado_por_ia=False
+            processado_por_ia=False,
+            transacao_recorrente_id=transacao_recorrente.id
         )
         
         db.add(nova_transacao)
@@ -281,14 +383,12 @@ class AgendadorService:
         }
     
     @staticmethod
-    def _enviar_notificacao_confirmacao(confirmacao: ConfirmacaoTransacao, telegram_user: TelegramUser):
-        """Envia notificação de confirmação via Telegram com botões inline específicos"""
-        try:
-            # Importar o TelegramService
-            from ..services.telegram_service import TelegramService
-            
-            # Criar mensagem melhorada com botões inline
-            message = f"""🔔 *Confirmação de Transação #{confirmacao.id}*
+    def _enviar_notificacao_confirmacao(db: Session, confirmacao: ConfirmacaoTransacao, telegram_user: TelegramUser):
+        """
+        Enfileira a notificação de confirmação (com botões inline específicos) no outbox do Telegram
+        Vai na mesma transação da confirmação; o envio é feito pelo despachante do outbox
+        """
+        message = f"""🔔 *Confirmação de Transação #{confirmacao.id}*
 
 💰 *{confirmacao.descricao}*
 💵 R$ {confirmacao.valor:.2f}
@@ -298,85 +398,48 @@ class AgendadorService:
 
 Use os botões abaixo para confirmar esta transação específica:"""
 
-            # Criar botões inline específicos para esta confirmação
-            inline_keyboard = {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": "✅ Aprovar",
-                            "callback_data": f"confirm_{confirmacao.id}_approve"
-                        },
-                        {
-                            "text": "❌ Rejeitar", 
-                            "callback_data": f"confirm_{confirmacao.id}_reject"
-                        }
-                    ],
-                    [
-                        {
-                            "text": "📋 Ver Detalhes",
-                            "callback_data": f"confirm_{confirmacao.id}_details"
-                        }
-                    ]
+        # Criar botões inline específicos para esta confirmação
+        inline_keyboard = {
+            "inline_keyboard": [
+                [
+                    {
+                        "text": "✅ Aprovar",
+                        "callback_data": f"confirm_{confirmacao.id}_approve"
+                    },
+                    {
+                        "text": "❌ Rejeitar", 
+                        "callback_data": f"confirm_{confirmacao.id}_reject"
+                    }
+                ],
+                [
+                    {
+                        "text": "📋 Ver Detalhes",
+                        "callback_data": f"confirm_{confirmacao.id}_details"
+                    }
                 ]
-            }
+            ]
+        }
 
-            # Enviar mensagem de forma assíncrona (não bloqueante)
-            telegram_service = TelegramService()
-            
-            # Executar de forma assíncrona em background
-            import asyncio
-            import threading
-            
-            def send_async():
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    # Enviar mensagem com botões inline
-                    success = loop.run_until_complete(
-                        telegram_service.send_message_with_buttons(
-                            telegram_user.telegram_id, 
-                            message,
-                            inline_keyboard
-                        )
-                    )
-                    loop.close()
-                    
-                    if success:
-                        logger.info(f"📱 Notificação com botões enviada para {telegram_user.telegram_id} - Confirmação {confirmacao.id}")
-                    else:
-                        logger.error(f"❌ Falha ao enviar notificação para {telegram_user.telegram_id}")
-                        
-                except Exception as e:
-                    logger.error(f"❌ Erro ao enviar notificação assíncrona: {e}")
-                    # Fallback: enviar mensagem simples sem botões
-                    try:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        fallback_message = f"""🔔 *Confirmação #{confirmacao.id}*
+        # Fallback: mensagem simples sem botões, caso o Telegram recuse a formatada
+        fallback_message = f"""🔔 Confirmação #{confirmacao.id}
 
 💰 {confirmacao.descricao} - R$ {confirmacao.valor:.2f}
 📅 {confirmacao.data_transacao.strftime('%d/%m/%Y')}
 
 ⏰ Responda até {confirmacao.expira_em.strftime('%d/%m %H:%M')}
 
-Digite: `/confirmar {confirmacao.id}` ou `/rejeitar {confirmacao.id}`"""
-                        
-                        loop.run_until_complete(
-                            telegram_service.send_message(telegram_user.telegram_id, fallback_message)
-                        )
-                        loop.close()
-                        logger.info(f"📱 Fallback - Mensagem simples enviada para confirmação {confirmacao.id}")
-                    except Exception as fallback_error:
-                        logger.error(f"❌ Erro no fallback também: {fallback_error}")
-            
-            # Executar em thread separada para não bloquear
-            thread = threading.Thread(target=send_async)
-            thread.daemon = True
-            thread.start()
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao preparar notificação de confirmação: {e}")
+Digite: /confirmar {confirmacao.id} ou /rejeitar {confirmacao.id}"""
+
+        TelegramOutboxService.enfileirar(
+            db,
+            telegram_user.telegram_id,
+            message,
+            reply_markup=inline_keyboard,
+            texto_fallback=fallback_message,
+            confirmacao_id=confirmacao.id,
+            tenant_id=confirmacao.tenant_id
+        )
+        logger.info(f"📱 Notificação enfileirada para {telegram_user.telegram_id} - Confirmação {confirmacao.id}")
     
     @staticmethod
     def processar_confirmacoes_expiradas(tenant_id: Optional[int] = None) -> Dict[str, Any]:
@@ -416,7 +479,8 @@ Digite: `/confirmar {confirmacao.id}` ou `/rejeitar {confirmacao.id}`"""
                         tenant_id=confirmacao.tenant_id,
                         created_by_name="Sistema Agendador (Auto-confirmado)",
                         observacoes=f"Auto-confirmada após expiração. Confirmação ID: {confirmacao.id}",
-                        processado_por_ia=False
+                        processado_por_ia=False,
+                        transacao_recorrente_id=confirmacao.transacao_recorrente_id
                     )
                     
                     db.add(nova_transacao)
@@ -464,58 +528,73 @@ Digite: `/confirmar {confirmacao.id}` ou `/rejeitar {confirmacao.id}`"""
             
         logger.info(f"💳 Iniciando processamento de débitos automáticos de financiamentos para {data_processamento}")
         
-        db = next(get_db())
+        db = SessionLocal()
         try:
-            # Buscar financiamentos ativos com débito automático
-            financiamentos_auto_debito = db.query(Financiamento).filter(
+            # Buscar financiamentos ativos com débito automático (as linhas são carregadas por lote)
+            financiamentos_auto_debito = db.query(Financiamento.id, Financiamento.tenant_id).filter(
                 Financiamento.auto_debito == True,
                 Financiamento.status == "ativo",
                 Financiamento.conta_debito_id.is_not(None)
             ).all()
-            
-            estatisticas = {
-                "data_processamento": data_processamento.isoformat(),
-                "total_financiamentos_auto_debito": len(financiamentos_auto_debito),
-                "processados": 0,
-                "parcelas_pagas": 0,
-                "transacoes_criadas": 0,
-                "erros": 0,
-                "detalhes": []
-            }
-            
-            for financiamento in financiamentos_auto_debito:
-                try:
-                    resultado = AgendadorService._processar_financiamento_individual(
-                        db, financiamento, data_processamento
-                    )
-                    
-                    estatisticas["processados"] += 1
-                    if resultado["parcela_paga"]:
-                        estatisticas["parcelas_pagas"] += 1
-                        estatisticas["transacoes_criadas"] += 1
-                        
-                    estatisticas["detalhes"].append(resultado)
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erro ao processar financiamento {financiamento.id}: {e}")
-                    estatisticas["erros"] += 1
-                    estatisticas["detalhes"].append({
-                        "financiamento_id": financiamento.id,
-                        "descricao": financiamento.descricao,
-                        "erro": str(e),
-                        "parcela_paga": False
-                    })
-            
-            db.commit()
-            logger.info(f"✅ Processamento de financiamentos concluído: {estatisticas['parcelas_pagas']} parcelas pagas, {estatisticas['erros']} erros")
-            return estatisticas
-            
         except Exception as e:
-            db.rollback()
             logger.error(f"❌ Erro geral no processamento de financiamentos: {e}")
             raise
         finally:
             db.close()
+        
+        resultado = ExecutorLotes.executar(
+            "Financiamentos com débito automático",
+            [(financiamento_id, tenant_id) for financiamento_id, tenant_id in financiamentos_auto_debito],
+            lambda db_lote, ids: AgendadorService._processar_lote_financiamentos(db_lote, ids, data_processamento)
+        )
+        estatisticas = {
+            "data_processamento": data_processamento.isoformat(),
+            "total_financiamentos_auto_debito": len(financiamentos_auto_debito),
+            "processados": 0,
+            "parcelas_pagas": 0,
+            "transacoes_criadas": 0,
+            "erros": 0,
+            **resultado
+        }
+        
+        logger.info(f"✅ Processamento de financiamentos concluído: {estatisticas['parcelas_pagas']} parcelas pagas, {estatisticas['erros']} erros")
+        return estatisticas
+    
+    @staticmethod
+    def _processar_lote_financiamentos(db: Session, ids: List[int], data_processamento: date) -> Dict[str, Any]:
+        """Processa um lote de financiamentos na sessão do lote (o commit é feito pelo ExecutorLotes)"""
+        financiamentos = db.query(Financiamento).filter(
+            Financiamento.id.in_(ids)
+        ).order_by(Financiamento.id).all()
+        
+        estatisticas = {"processados": 0, "parcelas_pagas": 0, "transacoes_criadas": 0, "erros": 0, "detalhes": []}
+        
+        for financiamento in financiamentos:
+            try:
+                # Savepoint: falha no pagamento desfaz só a transação deste financiamento
+                with db.begin_nested():
+                    resultado = AgendadorService._processar_financiamento_individual(
+                        db, financiamento, data_processamento
+                    )
+                
+                estatisticas["processados"] += 1
+                if resultado["parcela_paga"]:
+                    estatisticas["parcelas_pagas"] += 1
+                    estatisticas["transacoes_criadas"] += 1
+                    
+                estatisticas["detalhes"].append(resultado)
+                
+            except Exception as e:
+                logger.error(f"❌ Erro ao processar financiamento {financiamento.id}: {e}")
+                estatisticas["erros"] += 1
+                estatisticas["detalhes"].append({
+                    "financiamento_id": financiamento.id,
+                    "descricao": financiamento.descricao,
+                    "erro": str(e),
+                    "parcela_paga": False
+                })
+        
+        return estatisticas
     
     @staticmethod
     def _processar_financiamento_individual(
@@ -626,31 +705,27 @@ Digite: `/confirmar {confirmacao.id}` ou `/rejeitar {confirmacao.id}`"""
             db.add(nova_transacao)
             db.flush()  # Para obter o ID da transação
             
-            # Registrar pagamento da parcela usando o serviço
-            try:
-                FinanciamentoService.registrar_pagamento_parcela(
-                    db=db,
-                    parcela_id=parcela.id,
-                    valor_pago=valor_parcela,
-                    data_pagamento=data_processamento,
-                    tenant_id=financiamento.tenant_id,
-                    categoria_id=financiamento.categoria_id,
-                    conta_id=financiamento.conta_debito_id,
-                    observacoes=f"Débito automático - Transação ID: {nova_transacao.id}"
-                )
-                
-                resultado["parcela_paga"] = True
-                resultado["transacao_id"] = nova_transacao.id
-                resultado["valor_pago"] = valor_parcela
-                resultado["motivo"] = f"Parcela {numero_parcela_atual} paga automaticamente"
-                
-                logger.info(f"💳 Débito automático processado: {financiamento.descricao} - R$ {valor_parcela:.2f}")
-                
-            except Exception as e:
-                # Se falhar ao registrar pagamento, remover a transação
-                db.rollback()
-                raise e
-                
+            # Registrar pagamento da parcela usando o serviço (sem commit: o lote controla a transação;
+            # se falhar, o savepoint do lote remove a transação criada acima)
+            FinanciamentoService.registrar_pagamento_parcela(
+                db=db,
+                parcela_id=parcela.id,
+                valor_pago=valor_parcela,
+                data_pagamento=data_processamento,
+                tenant_id=financiamento.tenant_id,
+                categoria_id=financiamento.categoria_id,
+                conta_id=financiamento.conta_debito_id,
+                observacoes=f"Débito automático - Transação ID: {nova_transacao.id}",
+                commit=False
+            )
+            
+            resultado["parcela_paga"] = True
+            resultado["transacao_id"] = nova_transacao.id
+            resultado["valor_pago"] = valor_parcela
+            resultado["motivo"] = f"Parcela {numero_parcela_atual} paga automaticamente"
+            
+            logger.info(f"💳 Débito automático processado: {financiamento.descricao} - R$ {valor_parcela:.2f}")
+            
         else:
             resultado["motivo"] = f"Não é dia de vencimento (próximo: {data_vencimento})"
         
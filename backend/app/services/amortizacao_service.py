@@ -0,0 +1,193 @@
+"""
+Motor vetorizado de tabelas de amortização (NumPy)
+
+Calcula o cronograma inteiro como arrays (saldos, juros, amortização, parcelas e
+datas de vencimento com deslocamento de meses vetorizado). Os dicts por parcela só
+são montados na borda (FinanciamentoService / API), com o mesmo arredondamento de
+centavos dos cálculos originais em loop.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+
+Colunas = Dict[str, np.ndarray]
+
+CAMPOS_PARCELA = ('saldo_inicial', 'amortizacao', 'juros', 'seguro', 'valor_parcela', 'saldo_final', 'porcentagem_amortizada')
+
+
+class AmortizacaoService:
+
+    @staticmethod
+    def arredondar(valores) -> np.ndarray:
+        """
+        Arredonda para centavos com o mesmo resultado de round(x, 2) do Python
+        np.round só diverge perto de empates (x.xx5), então esses poucos casos usam round()
+        """
+        valores = np.asarray(valores, dtype=float)
+        escalado = valores * 100
+        resultado = np.round(escalado) / 100
+        perto_empate = np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6
+        if perto_empate.any():
+            resultado[perto_empate] = [round(valor, 2) for valor in valores[perto_empate].tolist()]
+        return resultado
+
+    @staticmethod
+    def datas_vencimento(data_inicio: date, quantidade: int) -> List[date]:
+        """
+        Datas mensais a partir de data_inicio, equivalentes a aplicar _adicionar_mes repetidamente
+        O dia fica "preso" no menor último dia já encontrado (31/01 -> 28/02 -> 28/03)
+        """
+        indices = data_inicio.year * 12 + (data_inicio.month - 1) + np.arange(quantidade)
+        inicio_mes = (indices - 1970 * 12).astype('datetime64[M]')
+        dias_no_mes = ((inicio_mes + 1).astype('datetime64[D]') - inicio_mes.astype('datetime64[D]')).astype(int)
+        dias = np.minimum.accumulate(np.minimum(dias_no_mes, data_inicio.day))
+
+        return (inicio_mes.astype('datetime64[D]') + (dias - 1)).astype(object).tolist()
+
+    @staticmethod
+    def _porcentagem(valor_financiado: float, saldo_final: np.ndarray) -> np.ndarray:
+        return (valor_financiado - saldo_final) / valor_financiado * 100
+
+    @staticmethod
+    def _saldos_lineares(valor_financiado: float, amortizacao: float, parcelas: int) -> np.ndarray:
+        """
+        Saldos iniciais com amortização constante
+        subtract.accumulate subtrai em sequência, igual ao loop (saldo -= amortizacao), sem divergir no último bit
+        """
+        return np.subtract.accumulate(np.concatenate(([float(valor_financiado)], np.full(parcelas - 1, amortizacao))))
+
+    @staticmethod
+    def price(valor_financiado: float, taxa_mensal: float, parcelas: int, seguro_mensal: float = 0) -> Colunas:
+        """
+        PRICE: parcela fixa; taxa_mensal em PERCENTUAL
+
+        O saldo tem forma fechada (B_k = P - a_1 * ((1+i)^k - 1) / i), mas em prazos longos
+        com taxa alta ela difere do loop original no último bit e vira 1 centavo em empates
+        de arredondamento. Para manter os valores idênticos, só a recorrência do saldo é
+        feita em floats; juros, amortização, parcelas e arredondamento são vetorizados.
+        """
+        taxa = taxa_mensal / 100
+
+        if taxa == 0:
+            parcela_principal_juros = valor_financiado / parcelas
+            saldo_inicial = AmortizacaoService._saldos_lineares(valor_financiado, parcela_principal_juros, parcelas)
+        else:
+            parcela_principal_juros = valor_financiado * (taxa * (1 + taxa)**parcelas) / ((1 + taxa)**parcelas - 1)
+            saldos = [valor_financiado] * parcelas
+            saldo = valor_financiado
+            for indice in range(1, parcelas):
+                saldo = saldo - (parcela_principal_juros - saldo * taxa)
+                saldos[indice] = saldo
+            saldo_inicial = np.array(saldos, dtype=float)
+
+        juros = saldo_inicial * taxa
+        amortizacao = parcela_principal_juros - juros
+        parcela = np.full(parcelas, parcela_principal_juros)
+
+        # Última parcela quita exatamente o saldo
+        amortizacao[-1] = saldo_inicial[-1]
+        parcela[-1] = juros[-1] + amortizacao[-1]
+        saldo_final = saldo_inicial - amortizacao
+        saldo_final[-1] = 0
+
+        return AmortizacaoService._colunas(valor_financiado, saldo_inicial, amortizacao, juros, seguro_mensal, parcela + seguro_mensal, saldo_final)
+
+    @staticmethod
+    def sac(valor_financiado: float, taxa_mensal: float, parcelas: int, seguro_mensal: float = 0) -> Colunas:
+        """SAC: amortização constante; taxa_mensal em PERCENTUAL"""
+        taxa = taxa_mensal / 100
+        amortizacao_fixa = valor_financiado / parcelas
+
+        saldo_inicial = AmortizacaoService._saldos_lineares(valor_financiado, amortizacao_fixa, parcelas)
+        amortizacao = np.full(parcelas, amortizacao_fixa)
+        amortizacao[-1] = saldo_inicial[-1]
+        juros = saldo_inicial * taxa
+        saldo_final = saldo_inicial - amortizacao
+        saldo_final[-1] = 0
+
+        return AmortizacaoService._colunas(valor_financiado, saldo_inicial, amortizacao, juros, seguro_mensal, amortizacao + juros + seguro_mensal, saldo_final)
+
+    @staticmethod
+    def sacre(valor_financiado: float, taxa_mensal: float, parcelas: int, seguro_mensal: float = 0) -> Colunas:
+        """
+        SACRE: média ponderada dos valores (já em centavos) de PRICE e SAC por terço do prazo
+        Pesos do PRICE: 70% no primeiro terço, 50% no segundo, 30% no último
+        """
+        price = AmortizacaoService.price(valor_financiado, taxa_mensal, parcelas, seguro_mensal)
+        sac = AmortizacaoService.sac(valor_financiado, taxa_mensal, parcelas, seguro_mensal)
+
+        i = np.arange(parcelas)
+        peso_price = np.where(i < parcelas // 3, 0.7, np.where(i < 2 * parcelas // 3, 0.5, 0.3))
+        peso_sac = 1 - peso_price
+
+        amortizacao = price['amortizacao'] * peso_price + sac['amortizacao'] * peso_sac
+        juros = price['juros'] * peso_price + sac['juros'] * peso_sac
+
+        # Cada saldo parte do saldo final ARREDONDADO da parcela anterior (como na tabela original);
+        # esse arredondamento encadeado não tem forma fechada, então é um loop só de floats
+        saldo_inicial = np.empty(parcelas)
+        saldo_final = np.empty(parcelas)
+        saldo = valor_financiado
+        for indice, valor_amortizado in enumerate(amortizacao.tolist()):
+            saldo_inicial[indice] = saldo
+            saldo = saldo - valor_amortizado
+            saldo_final[indice] = saldo
+            saldo = round(saldo, 2)
+
+        return AmortizacaoService._colunas(valor_financiado, saldo_inicial, amortizacao, juros, seguro_mensal, amortizacao + juros + seguro_mensal, saldo_final)
+
+    @staticmethod
+    def americano(valor_financiado: float, taxa_mensal: float, parcelas: int, seguro_mensal: float = 0) -> Colunas:
+        """AMERICANO: só juros durante o prazo e o principal na última parcela"""
+        juros_fixos = valor_financiado * (taxa_mensal / 100)
+
+        amortizacao = np.zeros(parcelas)
+        amortizacao[-1] = valor_financiado
+        saldo_final = np.full(parcelas, float(valor_financiado))
+        saldo_final[-1] = 0
+
+        colunas = AmortizacaoService._colunas(
+            valor_financiado, np.full(parcelas, float(valor_financiado)), amortizacao,
+            np.full(parcelas, juros_fixos), seguro_mensal, amortizacao + juros_fixos + seguro_mensal, saldo_final
+        )
+        # No sistema americano o saldo inicial é exibido sem arredondamento
+        colunas['saldo_inicial'] = np.full(parcelas, valor_financiado)
+        return colunas
+
+    @staticmethod
+    def _colunas(valor_financiado: float, saldo_inicial, amortizacao, juros, seguro_mensal: float, valor_parcela, saldo_final) -> Colunas:
+        """Colunas finais da tabela, já arredondadas em centavos"""
+        arredondar = AmortizacaoService.arredondar
+        return {
+            'saldo_inicial': arredondar(saldo_inicial),
+            'amortizacao': arredondar(amortizacao),
+            'juros': arredondar(juros),
+            'seguro': np.full(len(amortizacao), round(seguro_mensal, 2)),
+            'valor_parcela': arredondar(valor_parcela),
+            'saldo_final': arredondar(saldo_final),
+            'porcentagem_amortizada': arredondar(AmortizacaoService._porcentagem(valor_financiado, saldo_final)),
+        }
+
+    @staticmethod
+    def materializar(colunas: Colunas, data_inicio: date) -> List[Dict]:
+        """Converte as colunas em lista de dicts por parcela (formato da API)"""
+        datas = AmortizacaoService.datas_vencimento(data_inicio, len(colunas['amortizacao']))
+        saldo_inicial, amortizacao, juros, seguro, valor_parcela, saldo_final, porcentagem = (
+            colunas[campo].tolist() for campo in CAMPOS_PARCELA
+        )
+        return [
+            {
+                'numero': indice + 1,
+                'data_vencimento': datas[indice],
+                'saldo_inicial': saldo_inicial[indice],
+                'amortizacao': amortizacao[indice],
+                'juros': juros[indice],
+                'seguro': seguro[indice],
+                'valor_parcela': valor_parcela[indice],
+                'saldo_final': saldo_final[indice],
+                'porcentagem_amortizada': porcentagem[indice],
+            }
+            for indice in range(len(datas))
+        ]
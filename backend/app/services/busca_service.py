@@ -0,0 +1,224 @@
+"""
+Serviço de busca textual em transações (descricao + observacoes)
+
+- PostgreSQL: índice GIN em to_tsvector('portuguese', unaccent(...)) para termos
+  completos e índice GIN pg_trgm para trechos de palavras (ILIKE '%termo%')
+- SQLite: tabela sombra FTS5 `transacoes_fts` (external content) mantida por triggers
+
+Quando a estrutura de busca ainda não foi instalada no banco, cai no ILIKE original.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, func, literal_column, select, text
+from typing import Dict, List, Optional
+import logging
+import re
+import unicodedata
+
+from ..models.financial import Transacao
+
+logger = logging.getLogger(__name__)
+
+FTS_TABELA_SQLITE = "transacoes_fts"
+DICIONARIO_PG = "portuguese"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Mesma expressão usada nos índices do PostgreSQL (precisa ser idêntica para o planner usá-los)
+_DOCUMENTO_PG = (
+    "immutable_unaccent(lower(coalesce(transacoes.descricao, '') || ' ' || "
+    "coalesce(transacoes.observacoes, '')))"
+)
+
+DDL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() é STABLE; índices de expressão exigem uma função IMMUTABLE
+    """
+    CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS idx_transacoes_busca_fts ON transacoes
+    USING gin (to_tsvector('{DICIONARIO_PG}'::regconfig, {_DOCUMENTO_PG}))
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS idx_transacoes_busca_trgm ON transacoes
+    USING gin ({_DOCUMENTO_PG} gin_trgm_ops)
+    """,
+]
+
+DDL_SQLITE = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABELA_SQLITE} USING fts5(
+        descricao, observacoes,
+        content='transacoes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_fts_ai AFTER INSERT ON transacoes BEGIN
+        INSERT INTO {FTS_TABELA_SQLITE}(rowid, descricao, observacoes)
+        VALUES (new.id, new.descricao, new.observacoes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_fts_ad AFTER DELETE ON transacoes BEGIN
+        INSERT INTO {FTS_TABELA_SQLITE}({FTS_TABELA_SQLITE}, rowid, descricao, observacoes)
+        VALUES ('delete', old.id, old.descricao, old.observacoes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_fts_au AFTER UPDATE OF descricao, observacoes ON transacoes BEGIN
+        INSERT INTO {FTS_TABELA_SQLITE}({FTS_TABELA_SQLITE}, rowid, descricao, observacoes)
+        VALUES ('delete', old.id, old.descricao, old.observacoes);
+        INSERT INTO {FTS_TABELA_SQLITE}(rowid, descricao, observacoes)
+        VALUES (new.id, new.descricao, new.observacoes);
+    END
+    """,
+]
+
+# Cache por banco (URL) indicando se a estrutura de busca está instalada
+_instalada: Dict[str, bool] = {}
+
+
+class BuscaService:
+
+    @staticmethod
+    def normalizar(termo: str) -> str:
+        """Minúsculas e sem acentos ('Pão de Açúcar' -> 'pao de acucar')"""
+        decomposto = unicodedata.normalize("NFKD", termo or "")
+        return "".join(c for c in decomposto if not unicodedata.combining(c)).lower().strip()
+
+    @staticmethod
+    def tokens(termo: str) -> List[str]:
+        return _TOKEN.findall(BuscaService.normalizar(termo))
+
+    @staticmethod
+    def instalar(connection) -> List[str]:
+        """
+        Cria (idempotente) a estrutura de busca do dialeto da conexão
+        No SQLite também popula a tabela FTS com as transações existentes
+        Não faz commit - deixar para quem chama a função
+        """
+        dialeto = connection.dialect.name
+        if dialeto == "postgresql":
+            comandos = DDL_POSTGRESQL
+        elif dialeto == "sqlite":
+            comandos = DDL_SQLITE
+        else:
+            return []
+
+        for comando in comandos:
+            connection.execute(text(comando))
+
+        if dialeto == "sqlite":
+            connection.execute(text(
+                f"INSERT INTO {FTS_TABELA_SQLITE}({FTS_TABELA_SQLITE}) VALUES ('rebuild')"
+            ))
+        else:
+            connection.execute(text("ANALYZE transacoes"))
+
+        _instalada.pop(str(connection.engine.url), None)
+        return [" ".join(comando.split())[:80] for comando in comandos]
+
+    @staticmethod
+    def disponivel(db: Session) -> bool:
+        """Indica se a estrutura de busca do dialeto existe no banco (verificado uma vez por processo)"""
+        chave = str(db.bind.url)
+        if chave not in _instalada:
+            dialeto = db.bind.dialect.name
+            if dialeto == "postgresql":
+                consulta = text("SELECT 1 FROM pg_indexes WHERE indexname = 'idx_transacoes_busca_trgm'")
+            elif dialeto == "sqlite":
+                consulta = text(
+                    f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{FTS_TABELA_SQLITE}'"
+                )
+            else:
+                _instalada[chave] = False
+                return False
+
+            try:
+                _instalada[chave] = db.execute(consulta).first() is not None
+            except Exception as e:
+                logger.warning(f"⚠️ Não foi possível verificar a estrutura de busca: {e}")
+                return False
+
+            if not _instalada[chave]:
+                logger.warning("⚠️ Busca textual sem índice - usando ILIKE (aplique migrations/add_busca_transacoes.sql)")
+
+        return _instalada[chave]
+
+    @staticmethod
+    def _expressao_fts5(termo: str) -> Optional[str]:
+        """Cada palavra vira um prefixo entre aspas; todas precisam aparecer ("mercado"* "pao"*)"""
+        tokens = BuscaService.tokens(termo)
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def _documento_pg():
+        return literal_column(_DOCUMENTO_PG)
+
+    @staticmethod
+    def _tsquery_pg(termo: str):
+        return func.plainto_tsquery(literal_column(f"'{DICIONARIO_PG}'::regconfig"), BuscaService.normalizar(termo))
+
+    @staticmethod
+    def _tsvector_pg():
+        return func.to_tsvector(literal_column(f"'{DICIONARIO_PG}'::regconfig"), BuscaService._documento_pg())
+
+    @staticmethod
+    def filtro(db: Session, termo: str):
+        """Critério WHERE para a busca, usando os índices de busca quando disponíveis"""
+        dialeto = db.bind.dialect.name
+
+        if BuscaService.disponivel(db):
+            if dialeto == "postgresql":
+                # Palavras completas (com stemming) pelo tsvector; trechos de palavras pelo trigram
+                return or_(
+                    BuscaService._tsvector_pg().op("@@")(BuscaService._tsquery_pg(termo)),
+                    BuscaService._documento_pg().like(f"%{BuscaService.normalizar(termo)}%")
+                )
+
+            expressao = BuscaService._expressao_fts5(termo)
+            if expressao:
+                return Transacao.id.in_(
+                    select(literal_column("rowid"))
+                    .select_from(text(FTS_TABELA_SQLITE))
+                    .where(text(f"{FTS_TABELA_SQLITE} MATCH :busca_fts").bindparams(busca_fts=expressao))
+                )
+
+        search_pattern = f"%{termo}%"
+        return or_(
+            Transacao.descricao.ilike(search_pattern),
+            Transacao.observacoes.ilike(search_pattern)
+        )
+
+    @staticmethod
+    def relevancia(db: Session, termo: str):
+        """
+        Expressão de relevância (maior = mais relevante) para ORDER BY
+        Retorna None quando não há índice de busca para ranquear
+        """
+        if not BuscaService.disponivel(db):
+            return None
+
+        if db.bind.dialect.name == "postgresql":
+            return (
+                func.ts_rank(BuscaService._tsvector_pg(), BuscaService._tsquery_pg(termo)) +
+                func.similarity(BuscaService._documento_pg(), BuscaService.normalizar(termo))
+            )
+
+        expressao = BuscaService._expressao_fts5(termo)
+        if not expressao:
+            return None
+        # bm25() é menor para documentos mais relevantes
+        return -(
+            select(literal_column(f"bm25({FTS_TABELA_SQLITE})"))
+            .select_from(text(FTS_TABELA_SQLITE))
+            .where(text(f"{FTS_TABELA_SQLITE} MATCH :busca_rank AND rowid = transacoes.id").bindparams(busca_rank=expressao))
+            .scalar_subquery()
+        )
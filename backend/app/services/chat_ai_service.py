@@ -8,8 +8,12 @@ from sqlalchemy.orm import Session
 from ..models.financial import Categoria, Transacao, TipoTransacao, Conta, Cartao, TipoMensagem, ChatSession
 from ..schemas.financial import TransacaoCreate
 from ..services.chat_history_service import ChatHistoryService
+from ..services.entidades_cache import EntidadesCache
+from ..services import parser_financeiro as parser
+from ..services.llm_cache import LLMCache
+from ..core.config import settings
 from .vision_service import VisionService
-from openai import OpenAI
+from ..core.openai_client import ClienteOpenAI
 from ..api.parcelas import criar_compra_parcelada
 from ..schemas.financial import CompraParceladaCompleta
 
@@ -21,12 +25,13 @@ class TempUser:
         self.tenant_id = tenant_id
 
 class ChatAIService:
-    def __init__(self, db: Session, openai_api_key: str, tenant_id: str):
+    def __init__(self, db: Session, tenant_id: str):
         self.db = db
         self.tenant_id = tenant_id
         
-        # Inicialização simples e direta do OpenAI - usar apenas a chave sem parâmetros extras
-        self.client = OpenAI(api_key=openai_api_key)
+        # Cliente OpenAI síncrono compartilhado: o pipeline deste serviço é síncrono (banco + IA)
+        # e, a partir de código async, roda no pool do banco (ver processar_imagem)
+        self.client = ClienteOpenAI.sincrono()
         self.chat_history = ChatHistoryService(db, tenant_id)
         self.vision_service = VisionService()
         self.model = "gpt-4o-mini"  # Modelo disponível e funcional
@@ -34,6 +39,7 @@ class ChatAIService:
         # Estado para confirmações
         self.pending_parcelamento = None  # Dados do parcelamento aguardando confirmação
         self.awaiting_confirmation = False  # Se está aguardando confirmação 1/2
+        self.categorias_alteradas = False  # Categoria criada nesta sessão: invalidar o cache após o commit
     
     def processar_mensagem(self, prompt: str, sessao_id: Optional[int] = None) -> Dict[str, Any]:
         """Processa mensagem do usuário com histórico de conversas"""
@@ -280,48 +286,15 @@ Qual método de pagamento você usou? Responda com o número:
 
     def _parser_regex_inteligente(self, texto: str) -> Optional[Dict[str, Any]]:
         """Parser determinístico usando regex"""
-        import re
-        
         texto_lower = texto.lower().strip()
         
         # Extrair valor
-        padroes_valor = [
-            r'(\d+(?:,\d+)?(?:\.\d+)?)\s*(?:reais?|r\$|real)',
-            r'r\$\s*(\d+(?:,\d+)?(?:\.\d+)?)',
-            r'(\d+(?:,\d+)?(?:\.\d+)?)\s*(?:conto|pila|mangos?)',
-            r'(\d+(?:,\d+)?(?:\.\d+)?)' 
-        ]
-        
-        valor = None
-        for padrao in padroes_valor:
-            match = re.search(padrao, texto_lower)
-            if match:
-                valor_str = match.group(1).replace(',', '.')
-                try:
-                    valor = float(valor_str)
-                    break
-                except:
-                    continue
-        
+        valor = parser.primeiro_valor(texto_lower)
         if not valor:
             return None
         
         # Identificar tipo
-        palavras_entrada = ['recebi', 'ganhei', 'entrou', 'salario', 'salário', 'renda', 'freelance', 'freela']
-        palavras_saida = ['gastei', 'paguei', 'comprei', 'saiu', 'despesa', 'gasto']
-        
-        tipo = None
-        for palavra in palavras_entrada:
-            if palavra in texto_lower:
-                tipo = "ENTRADA"
-                break
-        
-        if not tipo:
-            for palavra in palavras_saida:
-                if palavra in texto_lower:
-                    tipo = "SAIDA"
-                    break
-        
+        tipo = parser.tipo_transacao(texto_lower)
         if not tipo:
             return None
             
@@ -335,47 +308,22 @@ Qual método de pagamento você usou? Responda com o número:
 
     def _extrair_descricao_regex(self, texto: str, valor: float) -> str:
         """Extrai descrição de forma inteligente"""
-        import re
-        
-        texto_limpo = texto
+        # Casos especiais conhecidos
+        conhecida = parser.DESCRICOES.primeiro(texto)
+        if conhecida:
+            return conhecida
         
         # Remove valores
-        texto_limpo = re.sub(r'\d+(?:,\d+)?(?:\.\d+)?\s*(?:reais?|r\$|real|conto|pila|mangos?)?', '', texto_limpo)
-        texto_limpo = re.sub(r'r\$\s*\d+(?:,\d+)?(?:\.\d+)?', '', texto_limpo)
-        
-        # Remove palavras de ação
-        palavras_acao = ['gastei', 'paguei', 'comprei', 'recebi', 'ganhei', 'saiu', 'entrou', 'de', 'no', 'na', 'com', 'para', 'em']
-        for palavra in palavras_acao:
-            texto_limpo = re.sub(rf'\b{palavra}\b', '', texto_limpo)
+        texto_limpo = parser.RE_REMOVER_VALOR.sub('', texto)
+        texto_limpo = parser.RE_REMOVER_REAIS.sub('', texto_limpo)
         
-        # Remove preposições e artigos
-        texto_limpo = re.sub(r'\b(o|a|os|as|um|uma|de|da|do|das|dos|em|na|no|nas|nos|com|para|por)\b', '', texto_limpo)
+        # Remove palavras de ação, preposições e artigos
+        texto_limpo = parser.remover_palavras(texto_limpo, parser.PALAVRAS_ACAO)
+        texto_limpo = parser.remover_palavras(texto_limpo, parser.ARTIGOS_PREPOSICOES)
         
         # Limpa espaços extras
         texto_limpo = ' '.join(texto_limpo.split())
         
-        # Casos especiais conhecidos
-        mapeamento = {
-            'ifood': 'iFood',
-            'uber': 'Uber',
-            'mercado': 'Mercado',
-            'supermercado': 'Supermercado',
-            'farmacia': 'Farmácia',
-            'gasolina': 'Gasolina',
-            'salario': 'Salário',
-            'freela': 'Freelance',
-            'freelance': 'Freelance',
-            'lanchonete': 'Lanchonete',
-            'almoço': 'Almoço',
-            'almoco': 'Almoço',
-            'jantar': 'Jantar',
-            'lanche': 'Lanche'
-        }
-        
-        for chave, valor_map in mapeamento.items():
-            if chave in texto:
-                return valor_map
-        
         # Se sobrou algo útil, capitalizar
         if texto_limpo and len(texto_limpo) > 1:
             return texto_limpo.title()
@@ -384,43 +332,23 @@ Qual método de pagamento você usou? Responda com o número:
 
     def _detectar_parcelamento(self, texto: str) -> Optional[Dict[str, Any]]:
         """Detecta se a mensagem contém informações sobre parcelamento"""
-        import re
         
         texto_lower = texto.lower().strip()
         
-        # Padrões para detectar parcelamento
-        padroes_parcelamento = [
-            r'(\d+)x\s*(?:de)?\s*(\d+(?:,\d+)?(?:\.\d+)?)',  # "12x de 100"
-            r'(?:em|de)\s*(\d+)\s*(?:parcelas?|vezes?)\s*(?:de)?\s*(\d+(?:,\d+)?(?:\.\d+)?)',  # "em 6 parcelas de 200"
-            r'parcel(?:ei|ar|ado)\s*em\s*(\d+)(?:x)?\s*(?:de)?\s*(\d+(?:,\d+)?(?:\.\d+)?)',  # "parcelei em 3x de 50"
-            r'(\d+)\s*(?:parcelas?|vezes?)\s*(?:de)?\s*(\d+(?:,\d+)?(?:\.\d+)?)',  # "3 parcelas de 100"
-            r'dividi(?:r|do)?\s*em\s*(\d+)\s*(?:de)?\s*(\d+(?:,\d+)?(?:\.\d+)?)'  # "dividi em 4 de 250"
-        ]
-        
-        for padrao in padroes_parcelamento:
-            match = re.search(padrao, texto_lower)
-            if match:
-                try:
-                    total_parcelas = int(match.group(1))
-                    valor_parcela_str = match.group(2).replace(',', '.')
-                    valor_parcela = float(valor_parcela_str)
-                    valor_total = total_parcelas * valor_parcela
-                    
-                    # Verificar se os valores fazem sentido
-                    if 1 <= total_parcelas <= 48 and valor_parcela > 0:  # Máximo 48 parcelas
-                        print(f"🏷️ Parcelamento detectado: {total_parcelas}x de R$ {valor_parcela:.2f}")
-                        return {
-                            'total_parcelas': total_parcelas,
-                            'valor_parcela': valor_parcela,
-                            'valor_total': valor_total,
-                            'detectado': True
-                        }
-                except (ValueError, IndexError):
-                    continue
+        # Máximo 48 parcelas
+        parcelas = parser.parcelamento(texto_lower, maximo_parcelas=48)
+        if parcelas:
+            total_parcelas, valor_parcela = parcelas
+            print(f"🏷️ Parcelamento detectado: {total_parcelas}x de R$ {valor_parcela:.2f}")
+            return {
+                'total_parcelas': total_parcelas,
+                'valor_parcela': valor_parcela,
+                'valor_total': total_parcelas * valor_parcela,
+                'detectado': True
+            }
         
         # Verificar se há menção a parcelamento sem valores específicos
-        palavras_parcelamento = ['parcel', 'divid', 'parcela', 'vezes', 'prestação', 'prestacao']
-        if any(palavra in texto_lower for palavra in palavras_parcelamento):
+        if parser.INDICIOS_PARCELAMENTO.contem(texto_lower):
             print(f"📝 Indício de parcelamento detectado, mas sem valores específicos")
             return {
                 'detectado': True,
@@ -505,23 +433,18 @@ Em qual cartão você quer parcelar?
 
     def _extrair_descricao_parcelamento(self, texto: str) -> Optional[str]:
         """Extrai descrição específica para parcelamentos"""
-        import re
         
         texto_lower = texto.lower().strip()
         
         # Remover padrões de parcelamento
-        texto_limpo = re.sub(r'\d+x\s*(?:de)?\s*\d+(?:,\d+)?(?:\.\d+)?', '', texto_lower)
-        texto_limpo = re.sub(r'(?:em|de)\s*\d+\s*(?:parcelas?|vezes?)\s*(?:de)?\s*\d+(?:,\d+)?(?:\.\d+)?', '', texto_limpo)
-        texto_limpo = re.sub(r'parcel(?:ei|ar|ado)\s*em\s*\d+(?:x)?\s*(?:de)?\s*\d+(?:,\d+)?(?:\.\d+)?', '', texto_limpo)
+        texto_limpo = parser.remover_padroes(texto_lower, parser.RE_REMOVER_PARCELAMENTO)
         
         # Remover valores e palavras de ação
-        texto_limpo = re.sub(r'\d+(?:,\d+)?(?:\.\d+)?\s*(?:reais?|r\$|real|conto|pila|mangos?)?', '', texto_limpo)
-        texto_limpo = re.sub(r'r\$\s*\d+(?:,\d+)?(?:\.\d+)?', '', texto_limpo)
+        texto_limpo = parser.RE_REMOVER_VALOR.sub('', texto_limpo)
+        texto_limpo = parser.RE_REMOVER_REAIS.sub('', texto_limpo)
         
         # Remover palavras de ação e preposições
-        palavras_remover = ['comprei', 'comprar', 'parcelei', 'parcelar', 'dividi', 'dividir', 'gastei', 'paguei', 'de', 'no', 'na', 'com', 'para', 'em', 'um', 'uma', 'o', 'a']
-        for palavra in palavras_remover:
-            texto_limpo = re.sub(rf'\b{palavra}\b', '', texto_limpo)
+        texto_limpo = parser.remover_palavras(texto_limpo, parser.PALAVRAS_PARCELAMENTO_REMOVER)
         
         # Limpar espaços e capitalizar
         texto_limpo = ' '.join(texto_limpo.split())
@@ -654,17 +577,18 @@ Exemplos:
 "recebi 1000 salario" → {"valor": 1000.0, "tipo": "ENTRADA", "descricao": "Salário", "status": "sucesso_completo"}
 "gastei 50" → {"valor": 50.0, "tipo": "SAIDA", "status": "requer_descricao"}"""
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            # Prompt não depende do tenant: a mesma frase é extraída uma vez para todos
+            content = LLMCache.completar(
+                self.client,
+                self.model,
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
+                ttl=settings.LLM_CACHE_TTL_EXTRACAO_SEGUNDOS,
                 temperature=0.0,
                 max_tokens=150
-            )
-            
-            content = response.choices[0].message.content.strip()
+            ).strip()
             
             if not content or content.lower() == "null":
                 return None 
@@ -686,8 +610,7 @@ Exemplos:
         print(f"📋 Contas disponíveis: {[c['nome'] for c in contas]}")
 
         # NOVA FUNCIONALIDADE: Verificar se é um número (seleção numerada)
-        import re
-        numero_match = re.search(r'\b(\d+)\b', texto_lower)
+        numero_match = parser.RE_NUMERO_ISOLADO.search(texto_lower)
         if numero_match:
             numero = int(numero_match.group(1))
             print(f"🔢 Número detectado: {numero}")
@@ -715,33 +638,32 @@ Exemplos:
             else:
                 print(f"❌ Número {numero} fora do range válido (1-{len(todos_metodos)})")
 
-        # Verificar cartões - busca exata primeiro
-        for cartao in sorted(cartoes, key=lambda c: len(c['nome']), reverse=True):
-            if cartao['nome'].lower() in texto_lower:
-                print(f"✅ Cartão encontrado (exato): {cartao['nome']}")
-                return cartao['id'], None
+        nomes_cartoes = tuple(c['nome'] for c in cartoes)
+        nomes_contas = tuple(c['nome'] for c in contas)
+
+        # Verificar cartões - busca exata primeiro (nome mais longo mencionado)
+        indice = parser.nome_mais_longo(nomes_cartoes, texto_lower)
+        if indice is not None:
+            print(f"✅ Cartão encontrado (exato): {cartoes[indice]['nome']}")
+            return cartoes[indice]['id'], None
         
         # Verificar contas - busca exata primeiro
-        for conta in sorted(contas, key=lambda c: len(c['nome']), reverse=True):
-            if conta['nome'].lower() in texto_lower:
-                print(f"✅ Conta encontrada (exata): {conta['nome']}")
-                return None, conta['id']
-        
-        # Busca por fragmentos de nome - CARTÕES
-        for cartao in cartoes:
-            nome_palavras = cartao['nome'].lower().split()
-            for palavra in nome_palavras:
-                if len(palavra) >= 3 and palavra in texto_lower:  # Mínimo 3 caracteres
-                    print(f"✅ Cartão encontrado (fragmento '{palavra}'): {cartao['nome']}")
-                    return cartao['id'], None
+        indice = parser.nome_mais_longo(nomes_contas, texto_lower)
+        if indice is not None:
+            print(f"✅ Conta encontrada (exata): {contas[indice]['nome']}")
+            return None, contas[indice]['id']
+        
+        # Busca por fragmentos de nome (mínimo 3 caracteres) - CARTÕES
+        indice = parser.indice_por_nome(nomes_cartoes, texto_lower, nome_completo=False, palavra_minima=3)
+        if indice is not None:
+            print(f"✅ Cartão encontrado (fragmento): {cartoes[indice]['nome']}")
+            return cartoes[indice]['id'], None
         
         # Busca por fragmentos de nome - CONTAS  
-        for conta in contas:
-            nome_palavras = conta['nome'].lower().split()
-            for palavra in nome_palavras:
-                if len(palavra) >= 3 and palavra in texto_lower:  # Mínimo 3 caracteres
-                    print(f"✅ Conta encontrada (fragmento '{palavra}'): {conta['nome']}")
-                    return None, conta['id']
+        indice = parser.indice_por_nome(nomes_contas, texto_lower, nome_completo=False, palavra_minima=3)
+        if indice is not None:
+            print(f"✅ Conta encontrada (fragmento): {contas[indice]['nome']}")
+            return None, contas[indice]['id']
         
         # Busca fuzzy - verificar se alguma palavra do usuário está contida no nome
         palavras_usuario = texto_lower.split()
@@ -773,19 +695,26 @@ Exemplos:
         return None, None
 
     def _obter_categorias_existentes(self) -> List[Dict[str, Any]]:
-        """Obtém categorias existentes do usuário"""
-        categorias = self.db.query(Categoria).filter(Categoria.tenant_id == self.tenant_id).all()
+        """Obtém categorias existentes do usuário (cache por tenant)"""
+        if self.categorias_alteradas:
+            # Categoria criada nesta sessão ainda não está no cache (invalidado só após o commit)
+            categorias = self.db.query(Categoria).filter(Categoria.tenant_id == self.tenant_id).all()
+        else:
+            categorias = EntidadesCache.obter(self.tenant_id).categorias
         return [{'id': c.id, 'nome': c.nome} for c in categorias]
     
     def _obter_contas_existentes(self) -> List[Dict[str, Any]]:
-        """Obtém contas existentes do usuário"""
-        contas = self.db.query(Conta).filter(Conta.tenant_id == self.tenant_id).all()
-        return [{'id': c.id, 'nome': c.nome} for c in contas]
+        """Obtém contas existentes do usuário (cache por tenant)"""
+        return [{'id': c.id, 'nome': c.nome} for c in EntidadesCache.obter(self.tenant_id).contas]
     
     def _obter_cartoes_existentes(self) -> List[Dict[str, Any]]:
-        """Obtém cartões existentes do usuário"""
-        cartoes = self.db.query(Cartao).filter(Cartao.tenant_id == self.tenant_id).all()
-        return [{'id': c.id, 'nome': c.nome} for c in cartoes]
+        """Obtém cartões existentes do usuário (cache por tenant)"""
+        return [{'id': c.id, 'nome': c.nome} for c in EntidadesCache.obter(self.tenant_id).cartoes]
+    
+    def _buscar_categoria_por_nome(self, nome: str) -> Optional[Dict[str, Any]]:
+        """Primeira categoria do usuário cujo nome contém `nome` (sem diferenciar maiúsculas)"""
+        nome = nome.lower()
+        return next((c for c in self._obter_categorias_existentes() if nome in c['nome'].lower()), None)
     
     def _criar_transacao(self, dados: Dict[str, Any]) -> Transacao:
         """Cria uma nova transação"""
@@ -816,6 +745,9 @@ Exemplos:
             self.db.add(transacao)
             self.db.commit()
             self.db.refresh(transacao)
+            if self.categorias_alteradas:
+                EntidadesCache.invalidar(self.tenant_id)
+                self.categorias_alteradas = False
             
             metodo = ""
             if cartao_id:
@@ -848,13 +780,10 @@ Exemplos:
             categoria_sugerida = response.choices[0].message.content.strip()
             
             # Verificar se categoria já existe
-            categoria_existente = self.db.query(Categoria).filter(
-                Categoria.tenant_id == self.tenant_id,
-                Categoria.nome.ilike(f"%{categoria_sugerida}%")
-            ).first()
+            categoria_existente = self._buscar_categoria_por_nome(categoria_sugerida)
             
             if categoria_existente:
-                return categoria_existente.nome
+                return categoria_existente['nome']
                 
             return categoria_sugerida
             
@@ -879,14 +808,11 @@ Exemplos:
         
         try:
             # Verificar se já existe
-            categoria_existente = self.db.query(Categoria).filter(
-                Categoria.tenant_id == self.tenant_id,
-                Categoria.nome.ilike(f"%{nome_categoria}%")
-            ).first()
+            categoria_existente = self._buscar_categoria_por_nome(nome_categoria)
             
             if categoria_existente:
-                print(f"🔧 DEBUG: Categoria existente encontrada: {categoria_existente.id} - {categoria_existente.nome}")
-                return categoria_existente.id
+                print(f"🔧 DEBUG: Categoria existente encontrada: {categoria_existente['id']} - {categoria_existente['nome']}")
+                return categoria_existente['id']
             
             # Mapear ícones e cores
             icones = {
@@ -913,6 +839,7 @@ Exemplos:
             
             self.db.add(nova_categoria)
             self.db.flush()
+            self.categorias_alteradas = True
             print(f"🔧 DEBUG: Nova categoria criada: {nova_categoria.id} - {nova_categoria.nome}")
             return nova_categoria.id
             
@@ -938,6 +865,7 @@ Exemplos:
                     )
                     self.db.add(categoria_basica)
                     self.db.flush()
+                    self.categorias_alteradas = True
                     print(f"🔧 FALLBACK: Categoria 'Outros' criada: {categoria_basica.id}")
                     return categoria_basica.id
                     
@@ -1025,7 +953,6 @@ Exemplos:
         print("✅ Detectada pergunta sobre método de pagamento!")
         
         # Extrair dados da pergunta anterior (valor e descrição)
-        import re
         valor_match = re.search(r'r\$\s*(\d+(?:,\d+)?(?:\.\d+)?)', conteudo_bot)
         descricao_match = re.search(r'\*\*([^*]+)\*\*.*de.*\*\*r\$', conteudo_bot)
         
@@ -1088,7 +1015,6 @@ Exemplos:
 
     def _processar_resposta_cartao_parcelamento(self, prompt: str, conteudo_bot: str) -> Dict[str, Any]:
         """Processa resposta de seleção de cartão para parcelamento"""
-        import re
         
         print("🛒 Processando resposta de cartão para parcelamento")
         
@@ -1209,132 +1135,137 @@ Escolha um número:
                     'detalhes': {'extracted_data': extracted_data}
                 }
 
-            # Obter ou criar sessão ativa
-            sessao = self.chat_history.obter_sessao_ativa()
-
-            # Criar mensagem simulando que o usuário disse sobre a transação
-            descricao = extracted_data.get("descricao", "transação")
-            valor = extracted_data.get("valor", 0)
-            estabelecimento = extracted_data.get("estabelecimento", "")
+            # Registro (sessão, extração e categorização síncronas com OpenAI, transação) no pool do
+            # OpenAI, fora do event loop e sem ocupar as threads do banco
+            return await ClienteOpenAI.em_thread(self._registrar_transacao_da_imagem, extracted_data)
 
-            # Montar mensagem baseada nos dados extraídos
-            if estabelecimento:
-                mensagem_usuario = f"Gastei R$ {valor:.2f} em {descricao} no {estabelecimento}"
-            else:
-                mensagem_usuario = f"Gastei R$ {valor:.2f} em {descricao}"
+        except Exception as e:
+            print(f"❌ Erro inesperado ao processar imagem: {str(e)}")
+            return {
+                'resposta': f"❌ Erro interno ao processar imagem: {str(e)}",
+                'sucesso': False,
+                'transacao_criada': False,
+                'transacao': None,
+                'detalhes': {'error': str(e)}
+            }
 
-            # Adicionar mensagem do usuário (simulada)
-            msg_usuario = self.chat_history.adicionar_mensagem(
-                sessao_id=sessao.id,
-                tipo=TipoMensagem.USUARIO,
-                conteudo=f"📷 {mensagem_usuario} (via imagem)",
-                via_voz=False
-            )
+    def _registrar_transacao_da_imagem(self, extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra a transação extraída da imagem (síncrono: banco e chamadas ao OpenAI)"""
+        # Obter ou criar sessão ativa
+        sessao = self.chat_history.obter_sessao_ativa()
 
-            print(f"📝 Processando como mensagem: {mensagem_usuario}")
+        # Criar mensagem simulando que o usuário disse sobre a transação
+        descricao = extracted_data.get("descricao", "transação")
+        valor = extracted_data.get("valor", 0)
+        estabelecimento = extracted_data.get("estabelecimento", "")
 
-            # Processar como se fosse uma mensagem de chat normal
-            resposta_processamento = self._processar_com_sistema_hibrido(mensagem_usuario, [])
+        # Montar mensagem baseada nos dados extraídos
+        if estabelecimento:
+            mensagem_usuario = f"Gastei R$ {valor:.2f} em {descricao} no {estabelecimento}"
+        else:
+            mensagem_usuario = f"Gastei R$ {valor:.2f} em {descricao}"
 
-            # Criar transação se possível
-            transacao_criada = False
-            transacao = None
+        # Adicionar mensagem do usuário (simulada)
+        msg_usuario = self.chat_history.adicionar_mensagem(
+            sessao_id=sessao.id,
+            tipo=TipoMensagem.USUARIO,
+            conteudo=f"📷 {mensagem_usuario} (via imagem)",
+            via_voz=False
+        )
 
-            if resposta_processamento.get('criar_transacao'):
-                try:
-                    # Ajustar dados da transação com informações da imagem
-                    dados_transacao = resposta_processamento['dados_transacao']
-                    
-                    # Usar descrição limpa da imagem
-                    dados_transacao['descricao'] = descricao
-                    
-                    # Usar categoria da imagem se disponível
-                    if extracted_data.get("categoria"):
-                        categoria_nome = extracted_data["categoria"]
-                        categoria_id = self._criar_categoria_automatica(categoria_nome)
-                        dados_transacao['categoria_id'] = categoria_id
-
-                    # Usar data da imagem se disponível
-                    if extracted_data.get("data"):
-                        try:
-                            data_transacao = datetime.strptime(extracted_data["data"], "%Y-%m-%d").date()
-                            dados_transacao['data'] = data_transacao
-                        except:
-                            pass  # Usar data atual se houver erro
-
-                    transacao = self._criar_transacao(dados_transacao)
-                    transacao_criada = True
+        print(f"📝 Processando como mensagem: {mensagem_usuario}")
 
-                    # Atualizar título da sessão se for a primeira transação
-                    if sessao.transacoes_criadas == 0:
-                        titulo_inteligente = f"Transação via imagem - {descricao}"
-                        sessao.titulo = titulo_inteligente
-                        self.db.commit()
+        # Processar como se fosse uma mensagem de chat normal
+        resposta_processamento = self._processar_com_sistema_hibrido(mensagem_usuario, [])
 
-                except Exception as e:
-                    resposta_processamento['resposta'] += f"\n\n⚠️ Houve um erro ao salvar a transação: {str(e)}"
+        # Criar transação se possível
+        transacao_criada = False
+        transacao = None
 
-            # Personalizar resposta com informações da imagem
-            confianca = extracted_data.get("confianca", "media")
-            emoji_confianca = "🟢" if confianca == "alta" else "🟡" if confianca == "media" else "🔴"
-            
-            resposta_personalizada = f"📷 **Imagem processada** {emoji_confianca}\n\n"
-            
-            if transacao_criada:
-                # Obter nome do método de pagamento
-                metodo_pagamento = ""
-                if dados_transacao.get('cartao_id'):
-                    nome_cartao = next((c['nome'] for c in self._obter_cartoes_existentes() if c['id'] == dados_transacao['cartao_id']), f"Cartão ID {dados_transacao['cartao_id']}")
-                    metodo_pagamento = f" no **{nome_cartao}**"
-                elif dados_transacao.get('conta_id'):
-                    nome_conta = next((c['nome'] for c in self._obter_contas_existentes() if c['id'] == dados_transacao['conta_id']), f"Conta ID {dados_transacao['conta_id']}")
-                    metodo_pagamento = f" na **{nome_conta}**"
+        if resposta_processamento.get('criar_transacao'):
+            try:
+                # Ajustar dados da transação com informações da imagem
+                dados_transacao = resposta_processamento['dados_transacao']
                 
-                resposta_personalizada += f"✅ Registrado gasto de **R$ {valor:.2f}** para '{descricao}'"
-                if estabelecimento:
-                    resposta_personalizada += f" no **{estabelecimento}**"
-                resposta_personalizada += f"{metodo_pagamento}!"
-            else:
-                resposta_personalizada += resposta_processamento['resposta']
-
-            if extracted_data.get("observacoes"):
-                resposta_personalizada += f"\n\n📝 *{extracted_data['observacoes']}*"
+                # Usar descrição limpa da imagem
+                dados_transacao['descricao'] = descricao
+                
+                # Usar categoria da imagem se disponível
+                if extracted_data.get("categoria"):
+                    categoria_nome = extracted_data["categoria"]
+                    categoria_id = self._criar_categoria_automatica(categoria_nome)
+                    dados_transacao['categoria_id'] = categoria_id
+
+                # Usar data da imagem se disponível
+                if extracted_data.get("data"):
+                    try:
+                        data_transacao = datetime.strptime(extracted_data["data"], "%Y-%m-%d").date()
+                        dados_transacao['data'] = data_transacao
+                    except:
+                        pass  # Usar data atual se houver erro
+
+                transacao = self._criar_transacao(dados_transacao)
+                transacao_criada = True
+
+                # Atualizar título da sessão se for a primeira transação
+                if sessao.transacoes_criadas == 0:
+                    titulo_inteligente = f"Transação via imagem - {descricao}"
+                    sessao.titulo = titulo_inteligente
+                    self.db.commit()
+
+            except Exception as e:
+                resposta_processamento['resposta'] += f"\n\n⚠️ Houve um erro ao salvar a transação: {str(e)}"
+
+        # Personalizar resposta com informações da imagem
+        confianca = extracted_data.get("confianca", "media")
+        emoji_confianca = "🟢" if confianca == "alta" else "🟡" if confianca == "media" else "🔴"
+        
+        resposta_personalizada = f"📷 **Imagem processada** {emoji_confianca}\n\n"
+        
+        if transacao_criada:
+            # Obter nome do método de pagamento
+            metodo_pagamento = ""
+            if dados_transacao.get('cartao_id'):
+                nome_cartao = next((c['nome'] for c in self._obter_cartoes_existentes() if c['id'] == dados_transacao['cartao_id']), f"Cartão ID {dados_transacao['cartao_id']}")
+                metodo_pagamento = f" no **{nome_cartao}**"
+            elif dados_transacao.get('conta_id'):
+                nome_conta = next((c['nome'] for c in self._obter_contas_existentes() if c['id'] == dados_transacao['conta_id']), f"Conta ID {dados_transacao['conta_id']}")
+                metodo_pagamento = f" na **{nome_conta}**"
+            
+            resposta_personalizada += f"✅ Registrado gasto de **R$ {valor:.2f}** para '{descricao}'"
+            if estabelecimento:
+                resposta_personalizada += f" no **{estabelecimento}**"
+            resposta_personalizada += f"{metodo_pagamento}!"
+        else:
+            resposta_personalizada += resposta_processamento['resposta']
 
-            # Salvar resposta do bot
-            msg_bot = self.chat_history.adicionar_mensagem(
-                sessao_id=sessao.id,
-                tipo=TipoMensagem.BOT,
-                conteudo=resposta_personalizada,
-                transacao_criada=transacao_criada,
-                transacao_id=transacao.id if transacao else None
-            )
+        if extracted_data.get("observacoes"):
+            resposta_personalizada += f"\n\n📝 *{extracted_data['observacoes']}*"
 
-            return {
-                'resposta': resposta_personalizada,
-                'sucesso': True,
-                'transacao_criada': transacao_criada,
-                'transacao': self._transacao_para_dict(transacao) if transacao else None,
-                'detalhes': {
-                    'extracted_data': extracted_data,
-                    'confidence': confianca,
-                    'message_processed': mensagem_usuario,
-                    'sessao_id': sessao.id
-                }
-            }
+        # Salvar resposta do bot
+        msg_bot = self.chat_history.adicionar_mensagem(
+            sessao_id=sessao.id,
+            tipo=TipoMensagem.BOT,
+            conteudo=resposta_personalizada,
+            transacao_criada=transacao_criada,
+            transacao_id=transacao.id if transacao else None
+        )
 
-        except Exception as e:
-            print(f"❌ Erro inesperado ao processar imagem: {str(e)}")
-            return {
-                'resposta': f"❌ Erro interno ao processar imagem: {str(e)}",
-                'sucesso': False,
-                'transacao_criada': False,
-                'transacao': None,
-                'detalhes': {'error': str(e)}
+        return {
+            'resposta': resposta_personalizada,
+            'sucesso': True,
+            'transacao_criada': transacao_criada,
+            'transacao': self._transacao_para_dict(transacao) if transacao else None,
+            'detalhes': {
+                'extracted_data': extracted_data,
+                'confidence': confianca,
+                'message_processed': mensagem_usuario,
+                'sessao_id': sessao.id
             }
+        }
 
     def _limpar_descricao_para_exibicao(self, descricao: str) -> str:
         """Limpa descrição para exibição mais amigável, removendo códigos técnicos"""
-        import re
         
         descricao_limpa = descricao
         
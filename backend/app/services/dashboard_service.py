@@ -0,0 +1,279 @@
+"""
+Serviço de agregação do dashboard
+
+Calcula todas as séries de /api/dashboard/charts/overview a partir de poucas
+consultas GROUP BY agrupadas por mês/dia, em vez de uma consulta por período.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
+from datetime import datetime, date, timedelta
+from dateutil.relativedelta import relativedelta
+from typing import Dict, Any, List, Tuple
+
+from ..models.financial import Transacao, Categoria, Conta, TipoTransacao
+from .rollup_service import RollupService
+
+DIAS_SEMANA = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb']
+DIAS_SEMANA_COMPLETO = ['Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado']
+
+
+class DashboardService:
+
+    @staticmethod
+    def _bucket(db: Session, granularidade: str):
+        """
+        Expressão SQL que agrupa Transacao.data em chaves texto 'YYYY-MM' ou 'YYYY-MM-DD'
+        Usa to_char no PostgreSQL e strftime no SQLite para que as chaves sejam idênticas
+        """
+        if db.bind.dialect.name == "postgresql":
+            formato = "YYYY-MM" if granularidade == "mes" else "YYYY-MM-DD"
+            return func.to_char(Transacao.data, formato)
+        formato = "%Y-%m" if granularidade == "mes" else "%Y-%m-%d"
+        return func.strftime(formato, Transacao.data)
+
+    @staticmethod
+    def agregar_por_mes(db: Session, tenant_id: int, inicio: date) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """
+        Uma única consulta: soma e contagem por (mês, tipo) a partir de `inicio`
+        Retorna {("YYYY-MM", "ENTRADA"|"SAIDA"): {"total": x, "quantidade": n}}
+        Usa o rollup mensal quando o tenant já foi reconstruído
+        """
+        if RollupService.disponivel(db, tenant_id):
+            return RollupService.totais_por_mes(db, tenant_id, inicio)
+
+        bucket = DashboardService._bucket(db, "mes").label("bucket")
+        linhas = db.query(
+            bucket,
+            Transacao.tipo,
+            func.sum(Transacao.valor).label("total"),
+            func.count(Transacao.id).label("quantidade")
+        ).filter(
+            and_(
+                Transacao.tenant_id == tenant_id,
+                Transacao.data >= inicio
+            )
+        ).group_by(bucket, Transacao.tipo).all()
+
+        return {
+            (linha.bucket, DashboardService._tipo_str(linha.tipo)): {
+                "total": float(linha.total or 0),
+                "quantidade": linha.quantidade or 0
+            }
+            for linha in linhas
+        }
+
+    @staticmethod
+    def agregar_por_dia(db: Session, tenant_id: int, inicio: date) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """
+        Uma única consulta: soma, soma absoluta e contagem por (dia, tipo) a partir de `inicio`
+        Alimenta tanto a tendência diária de saldo quanto os gastos por dia da semana
+        """
+        bucket = DashboardService._bucket(db, "dia").label("bucket")
+        linhas = db.query(
+            bucket,
+            Transacao.tipo,
+            func.sum(Transacao.valor).label("total"),
+            func.sum(func.abs(Transacao.valor)).label("total_abs"),
+            func.count(Transacao.id).label("quantidade")
+        ).filter(
+            and_(
+                Transacao.tenant_id == tenant_id,
+                Transacao.data >= inicio
+            )
+        ).group_by(bucket, Transacao.tipo).all()
+
+        return {
+            (linha.bucket, DashboardService._tipo_str(linha.tipo)): {
+                "total": float(linha.total or 0),
+                "total_abs": float(linha.total_abs or 0),
+                "quantidade": linha.quantidade or 0
+            }
+            for linha in linhas
+        }
+
+    @staticmethod
+    def _tipo_str(tipo) -> str:
+        return tipo.value if isinstance(tipo, TipoTransacao) else str(tipo)
+
+    @staticmethod
+    def _somar(buckets: Dict[Tuple[str, str], Dict[str, float]], chave: str, tipo: str = None, campo: str = "total") -> float:
+        """Soma um campo dos buckets com a chave informada (opcionalmente filtrando o tipo)"""
+        return sum(
+            valores[campo]
+            for (bucket, bucket_tipo), valores in buckets.items()
+            if bucket == chave and (tipo is None or bucket_tipo == tipo)
+        )
+
+    @staticmethod
+    def calcular_overview(db: Session, tenant_id: int, hoje: date = None) -> Dict[str, Any]:
+        """Monta a resposta completa de /charts/overview"""
+        hoje = hoje or datetime.now().date()
+        inicio_mes_atual = hoje.replace(day=1)
+        inicio_mes_anterior = inicio_mes_atual - relativedelta(months=1)
+        inicio_12_meses = inicio_mes_atual - relativedelta(months=11)
+        inicio_90_dias = hoje - timedelta(days=90)
+
+        por_mes = DashboardService.agregar_por_mes(db, tenant_id, inicio_12_meses)
+        por_dia = DashboardService.agregar_por_dia(db, tenant_id, inicio_90_dias)
+
+        # 1. Transações por mês (últimos 12 meses) e 3. Receita vs Despesa (últimos 6 meses)
+        meses: List[date] = [inicio_12_meses + relativedelta(months=i) for i in range(12)]
+        transacoes_por_mes = []
+        for inicio_mes in meses:
+            chave = inicio_mes.strftime("%Y-%m")
+            receitas = DashboardService._somar(por_mes, chave, TipoTransacao.ENTRADA.value)
+            despesas = abs(DashboardService._somar(por_mes, chave, TipoTransacao.SAIDA.value))
+            transacoes_por_mes.append({
+                "mes": inicio_mes.strftime("%b/%Y"),
+                "mes_completo": inicio_mes.strftime("%B de %Y"),
+                "receitas": receitas,
+                "despesas": despesas,
+                "saldo": receitas - despesas,
+                "total_transacoes": int(DashboardService._somar(por_mes, chave, campo="quantidade"))
+            })
+
+        receita_despesa = [
+            {
+                "mes": inicio_mes.strftime("%b"),
+                "receitas": item["receitas"],
+                "despesas": item["despesas"],
+                "economia": item["saldo"]
+            }
+            for inicio_mes, item in zip(meses[-6:], transacoes_por_mes[-6:])
+        ]
+
+        # 2. Gastos por categoria (mês atual)
+        gastos_categoria = db.query(
+            Categoria.nome,
+            Categoria.cor,
+            Categoria.icone,
+            func.sum(func.abs(Transacao.valor)).label('total'),
+            func.count(Transacao.id).label('quantidade')
+        ).join(
+            Transacao, Transacao.categoria_id == Categoria.id
+        ).filter(
+            and_(
+                Transacao.tenant_id == tenant_id,
+                Transacao.tipo == TipoTransacao.SAIDA,
+                Transacao.data >= inicio_mes_atual
+            )
+        ).group_by(
+            Categoria.id, Categoria.nome, Categoria.cor, Categoria.icone
+        ).order_by(func.sum(func.abs(Transacao.valor)).desc()).all()
+
+        total_gastos = sum(item.total for item in gastos_categoria)
+        gastos_categoria_chart = [
+            {
+                "categoria": item.nome,
+                "valor": float(item.total),
+                "cor": item.cor,
+                "icone": item.icone,
+                "percentual": round((item.total / total_gastos * 100) if total_gastos > 0 else 0, 1),
+                "quantidade": item.quantidade
+            }
+            for item in gastos_categoria
+        ]
+
+        # 4. Tendência de saldo (últimos 30 dias)
+        saldo_atual = float(db.query(func.sum(Conta.saldo_inicial)).filter(
+            Conta.tenant_id == tenant_id
+        ).scalar() or 0)
+
+        tendencia_saldo = []
+        for i in range(30):
+            data_dia = hoje - timedelta(days=29 - i)
+            movimentacao_dia = DashboardService._somar(por_dia, data_dia.strftime("%Y-%m-%d"))
+            saldo_atual += movimentacao_dia
+            tendencia_saldo.append({
+                "data": data_dia.strftime("%d/%m"),
+                "data_completa": data_dia.strftime("%d/%m/%Y"),
+                "saldo": saldo_atual,
+                "movimentacao": movimentacao_dia
+            })
+
+        # 5. Top 5 maiores gastos do mês
+        maiores_gastos = db.query(
+            Transacao.descricao,
+            func.abs(Transacao.valor).label('valor_abs'),
+            Categoria.nome.label('categoria'),
+            Transacao.data
+        ).join(
+            Categoria, Transacao.categoria_id == Categoria.id
+        ).filter(
+            and_(
+                Transacao.tenant_id == tenant_id,
+                Transacao.tipo == TipoTransacao.SAIDA,
+                Transacao.data >= inicio_mes_atual
+            )
+        ).order_by(func.abs(Transacao.valor).desc()).limit(5).all()
+
+        top_gastos = [
+            {
+                "descricao": gasto.descricao,
+                "valor": float(gasto.valor_abs),
+                "categoria": gasto.categoria,
+                "data": gasto.data.strftime("%d/%m")
+            }
+            for gasto in maiores_gastos
+        ]
+
+        # Gastos totais por dia da semana (últimos 3 meses), derivados dos buckets diários
+        totais_semana = [0.0] * 7
+        quantidades_semana = [0] * 7
+        for (bucket, tipo), valores in por_dia.items():
+            if tipo != TipoTransacao.SAIDA.value:
+                continue
+            dia_semana = (datetime.strptime(bucket, "%Y-%m-%d").weekday() + 1) % 7  # 0=domingo
+            totais_semana[dia_semana] += valores["total_abs"]
+            quantidades_semana[dia_semana] += valores["quantidade"]
+
+        gastos_por_dia = [
+            {
+                "dia": DIAS_SEMANA[dia],
+                "dia_completo": DIAS_SEMANA_COMPLETO[dia],
+                "total": totais_semana[dia],
+                "media": round(totais_semana[dia] / quantidades_semana[dia] if quantidades_semana[dia] > 0 else 0, 2),
+                "quantidade": quantidades_semana[dia]
+            }
+            for dia in range(7)
+        ]
+
+        # Comparativo com mês anterior (mês atual inclui lançamentos futuros, como antes)
+        chave_anterior = inicio_mes_anterior.strftime("%Y-%m")
+        chave_atual = inicio_mes_atual.strftime("%Y-%m")
+        receitas_mes_atual = sum(
+            v["total"] for (b, t), v in por_mes.items() if b >= chave_atual and t == TipoTransacao.ENTRADA.value
+        )
+        despesas_mes_atual = abs(sum(
+            v["total"] for (b, t), v in por_mes.items() if b >= chave_atual and t == TipoTransacao.SAIDA.value
+        ))
+        receitas_mes_anterior = DashboardService._somar(por_mes, chave_anterior, TipoTransacao.ENTRADA.value)
+        despesas_mes_anterior = abs(DashboardService._somar(por_mes, chave_anterior, TipoTransacao.SAIDA.value))
+
+        return {
+            "transacoes_por_mes": transacoes_por_mes,
+            "gastos_por_categoria": gastos_categoria_chart,
+            "receita_vs_despesa": receita_despesa,
+            "tendencia_saldo": tendencia_saldo,
+            "estatisticas": {
+                "maiores_gastos_mes": top_gastos,
+                "gastos_semana": gastos_por_dia,
+                "comparativo_mes_anterior": {
+                    "receitas": {
+                        "atual": receitas_mes_atual,
+                        "anterior": receitas_mes_anterior,
+                        "variacao": round(((receitas_mes_atual - receitas_mes_anterior) / receitas_mes_anterior * 100) if receitas_mes_anterior > 0 else 0, 1)
+                    },
+                    "despesas": {
+                        "atual": despesas_mes_atual,
+                        "anterior": despesas_mes_anterior,
+                        "variacao": round(((despesas_mes_atual - despesas_mes_anterior) / despesas_mes_anterior * 100) if despesas_mes_anterior > 0 else 0, 1)
+                    }
+                }
+            },
+            "periodo": {
+                "mes_atual": inicio_mes_atual.strftime("%B de %Y"),
+                "ultimo_update": datetime.now().isoformat()
+            }
+        }
@@ -5,7 +5,7 @@ Evolui o chat atual para usar dados reais via MCP Server
 import json
 import re
 from typing import Dict, List, Any
-from openai import AsyncOpenAI
+from ..core.openai_client import ClienteOpenAI
 from ..core.config import settings
 from .smart_mcp_service import smart_mcp_service
 
@@ -13,7 +13,6 @@ class EnhancedChatAIService:
     """Chat AI com integração MCP"""
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.smart_mcp = smart_mcp_service
         
         # Mapeamento de intenções para tools MCP
@@ -33,6 +32,11 @@ class EnhancedChatAIService:
             "criar_categoria": "create_category"
         }
     
+    @property
+    def client(self):
+        """AsyncOpenAI compartilhado do event loop atual"""
+        return ClienteOpenAI.obter()
+    
     async def process_message(self, message: str, user_id: int, chat_history: List[Dict] = None, telegram_user_name: str = None) -> Dict[str, Any]:
         """Processa mensagem com Smart MCP (lógica avançada)"""
         try:
@@ -0,0 +1,155 @@
+"""
+Cache por tenant de cartões, contas e categorias usados pelos chats (SmartMCPService / ChatAIService)
+
+Os pipelines de chat consultam esses conjuntos pequenos várias vezes por mensagem; aqui eles
+são carregados uma vez (em uma sessão própria, só dados commitados) e guardados como snapshots
+imutáveis, sem objetos ORM presos a sessões.
+- Versão por tenant: invalidar() incrementa a versão; um carregamento que começou antes da
+  invalidação não é guardado, então um snapshot antigo nunca volta para o cache
+- TTL como rede de segurança para escritas que não passam pelos routers
+- LRU entre tenants (limite de tenants em memória)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from ..core.config import settings
+from ..database import SessionLocal, em_thread_db
+from ..models.financial import Cartao, Categoria, Conta
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CartaoRef:
+    id: int
+    nome: str
+    bandeira: Optional[str]
+    numero_final: Optional[str]
+    ativo: bool
+
+
+@dataclass(frozen=True)
+class ContaRef:
+    id: int
+    nome: str
+    banco: Optional[str]
+    tipo: Optional[str]
+    ativo: bool
+
+
+@dataclass(frozen=True)
+class CategoriaRef:
+    id: int
+    nome: str
+    cor: Optional[str]
+    icone: Optional[str]
+
+
+@dataclass(frozen=True)
+class EntidadesTenant:
+    tenant_id: int
+    versao: int
+    cartoes: Tuple[CartaoRef, ...]
+    contas: Tuple[ContaRef, ...]
+    categorias: Tuple[CategoriaRef, ...]
+
+    @property
+    def cartoes_ativos(self) -> Tuple[CartaoRef, ...]:
+        return tuple(cartao for cartao in self.cartoes if cartao.ativo)
+
+    def categoria_por_id(self, categoria_id: Optional[int]) -> Optional[CategoriaRef]:
+        return next((categoria for categoria in self.categorias if categoria.id == categoria_id), None)
+
+    def categoria_por_nome(self, nome: str) -> Optional[CategoriaRef]:
+        return next((categoria for categoria in self.categorias if categoria.nome == nome), None)
+
+
+class EntidadesCache:
+
+    _lock = threading.Lock()
+    _entradas: "OrderedDict[int, Tuple[EntidadesTenant, float]]" = OrderedDict()
+    _versoes: Dict[int, int] = {}
+    _metricas = {"hits": 0, "misses": 0, "invalidacoes": 0}
+
+    @staticmethod
+    def obter(tenant_id: int) -> EntidadesTenant:
+        """Cartões, contas e categorias do tenant (carrega do banco só se não houver snapshot válido)"""
+        tenant_id = int(tenant_id)
+        entidades = EntidadesCache._em_memoria(tenant_id)
+        if entidades:
+            return entidades
+        with EntidadesCache._lock:
+            versao = EntidadesCache._versoes.get(tenant_id, 0)
+            EntidadesCache._metricas["misses"] += 1
+
+        entidades = EntidadesCache._carregar(tenant_id, versao)
+
+        with EntidadesCache._lock:
+            # Invalidado durante o carregamento: devolve o que foi lido, mas não guarda
+            if EntidadesCache._versoes.get(tenant_id, 0) == versao:
+                EntidadesCache._entradas[tenant_id] = (entidades, time.monotonic() + settings.CACHE_ENTIDADES_TTL_SEGUNDOS)
+                EntidadesCache._entradas.move_to_end(tenant_id)
+                while len(EntidadesCache._entradas) > settings.CACHE_ENTIDADES_MAX_TENANTS:
+                    EntidadesCache._entradas.popitem(last=False)
+        return entidades
+
+    @staticmethod
+    async def obter_async(tenant_id: int) -> EntidadesTenant:
+        """obter() para código async: só o carregamento (quando há miss) vai para o pool do banco"""
+        return EntidadesCache._em_memoria(int(tenant_id)) or await em_thread_db(EntidadesCache.obter, tenant_id)
+
+    @staticmethod
+    def invalidar(tenant_id: int) -> None:
+        """Descarta o snapshot do tenant; chamar depois do commit de qualquer escrita em cartões/contas/categorias"""
+        tenant_id = int(tenant_id)
+        with EntidadesCache._lock:
+            EntidadesCache._versoes[tenant_id] = EntidadesCache._versoes.get(tenant_id, 0) + 1
+            EntidadesCache._entradas.pop(tenant_id, None)
+            EntidadesCache._metricas["invalidacoes"] += 1
+
+    @staticmethod
+    def metricas() -> Dict[str, int]:
+        with EntidadesCache._lock:
+            return {**EntidadesCache._metricas, "tenants": len(EntidadesCache._entradas)}
+
+    @staticmethod
+    def _em_memoria(tenant_id: int) -> Optional[EntidadesTenant]:
+        with EntidadesCache._lock:
+            entrada = EntidadesCache._entradas.get(tenant_id)
+            if not entrada:
+                return None
+            entidades, expira_em = entrada
+            if entidades.versao != EntidadesCache._versoes.get(tenant_id, 0) or expira_em <= time.monotonic():
+                del EntidadesCache._entradas[tenant_id]
+                return None
+            EntidadesCache._entradas.move_to_end(tenant_id)
+            EntidadesCache._metricas["hits"] += 1
+            return entidades
+
+    @staticmethod
+    def _carregar(tenant_id: int, versao: int) -> EntidadesTenant:
+        db = SessionLocal()
+        try:
+            cartoes = db.query(Cartao).filter(Cartao.tenant_id == tenant_id).order_by(Cartao.id).all()
+            contas = db.query(Conta).filter(Conta.tenant_id == tenant_id).order_by(Conta.id).all()
+            categorias = db.query(Categoria).filter(Categoria.tenant_id == tenant_id).order_by(Categoria.id).all()
+            return EntidadesTenant(
+                tenant_id=tenant_id,
+                versao=versao,
+                cartoes=tuple(
+                    CartaoRef(c.id, c.nome, c.bandeira, c.numero_final, bool(c.ativo)) for c in cartoes
+                ),
+                contas=tuple(
+                    ContaRef(c.id, c.nome, c.banco, c.tipo, bool(c.ativo)) for c in contas
+                ),
+                categorias=tuple(
+                    CategoriaRef(c.id, c.nome, c.cor, c.icone) for c in categorias
+                )
+            )
+        finally:
+            db.close()
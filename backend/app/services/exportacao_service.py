@@ -0,0 +1,154 @@
+"""
+Serviço de exportação de transações (CSV, XLSX e Parquet)
+
+Cada formato é um gerador de bytes que consome as linhas aos poucos (vindas de um
+cursor do servidor), então a memória usada não cresce com o tamanho da exportação:
+- CSV: escrito e enviado lote a lote
+- Parquet (pyarrow): um row group por lote, enviado assim que escrito
+- XLSX: openpyxl em modo write-only (linhas vão para disco) e o arquivo é enviado em blocos
+"""
+
+from datetime import datetime
+from typing import Iterable, Iterator, Tuple, Any, List
+import csv
+import io
+import tempfile
+
+from ..models.financial import TipoTransacao
+
+LOTE_EXPORTACAO = 1000
+BLOCO_ARQUIVO = 64 * 1024
+
+COLUNAS = ["ID", "Data", "Descrição", "Valor", "Tipo", "Categoria", "Conta", "Cartão", "Observações", "Criado por"]
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _normalizar(linha: Tuple[Any, ...]) -> List[Any]:
+    """Converte a linha da consulta em valores simples (enum -> texto)"""
+    return [valor.value if isinstance(valor, TipoTransacao) else valor for valor in linha]
+
+
+def _lotes(linhas: Iterable[Tuple[Any, ...]], tamanho: int = LOTE_EXPORTACAO) -> Iterator[List[List[Any]]]:
+    lote = []
+    for linha in linhas:
+        lote.append(_normalizar(linha))
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class _SaidaEmFila(io.RawIOBase):
+    """Arquivo somente-escrita cujo conteúdo é drenado pelo gerador após cada lote"""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+class ExportacaoService:
+
+    @staticmethod
+    def nome_arquivo(formato: str) -> str:
+        return f"transacoes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{FORMATOS[formato][1]}"
+
+    @staticmethod
+    def gerar(formato: str, linhas: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+        if formato == "csv":
+            return ExportacaoService.gerar_csv(linhas)
+        if formato == "xlsx":
+            return ExportacaoService.gerar_xlsx(linhas)
+        if formato == "parquet":
+            return ExportacaoService.gerar_parquet(linhas)
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    @staticmethod
+    def gerar_csv(linhas: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+        """CSV separado por ';' com BOM UTF-8 (abre direto no Excel em português)"""
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, delimiter=";")
+        escritor.writerow(COLUNAS)
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+        for lote in _lotes(linhas):
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerows(
+                [linha[0], linha[1].strftime("%Y-%m-%d %H:%M:%S") if linha[1] else ""] + linha[2:]
+                for linha in lote
+            )
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def gerar_xlsx(linhas: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+        """XLSX em modo write-only: as linhas vão para arquivos temporários, não para a memória"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        planilha = workbook.create_sheet("Transações")
+        planilha.append(COLUNAS)
+        for lote in _lotes(linhas):
+            for linha in lote:
+                planilha.append(linha)
+
+        with tempfile.TemporaryFile() as arquivo:
+            workbook.save(arquivo)
+            arquivo.seek(0)
+            while True:
+                bloco = arquivo.read(BLOCO_ARQUIVO)
+                if not bloco:
+                    break
+                yield bloco
+
+    @staticmethod
+    def gerar_parquet(linhas: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+        """Parquet com um row group por lote, enviado assim que cada lote é escrito"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("data", pa.timestamp("us")),
+            ("descricao", pa.string()),
+            ("valor", pa.float64()),
+            ("tipo", pa.string()),
+            ("categoria", pa.string()),
+            ("conta", pa.string()),
+            ("cartao", pa.string()),
+            ("observacoes", pa.string()),
+            ("criado_por", pa.string()),
+        ])
+
+        saida = _SaidaEmFila()
+        with pq.ParquetWriter(saida, schema, compression="snappy") as escritor:
+            for lote in _lotes(linhas):
+                colunas = list(zip(*lote))
+                escritor.write_table(pa.Table.from_arrays(
+                    [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+                    schema=schema
+                ))
+                yield saida.drenar()
+        yield saida.drenar()
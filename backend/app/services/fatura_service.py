@@ -5,10 +5,11 @@ Serviço para gerenciar faturas de cartão de crédito
 from sqlalchemy.orm import Session
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 from ..models.financial import Fatura, Cartao, Transacao, TipoTransacao, StatusFatura, Categoria
 from ..database import get_db
+from .entidades_cache import EntidadesCache
 
 class FaturaService:
     @staticmethod
@@ -121,15 +122,29 @@ class FaturaService:
         )
         
         # Vincular transação à fatura
+        # O valor total da fatura é atualizado por delta no flush (ver app/models/rollup.py)
         transacao.fatura_id = fatura.id
+
+    @staticmethod
+    def revincular_transacao_fatura(db: Session, transacao: Transacao):
+        """
+        Ajusta a fatura da transação após mudança de cartão, data ou tipo
+        O flush move o valor da fatura antiga para a nova (deltas), sem recalcular as duas
+        """
+        if not transacao.cartao_id or transacao.tipo != TipoTransacao.SAIDA:
+            transacao.fatura_id = None
+            return
         
-        # Atualizar valor total da fatura
-        FaturaService.recalcular_valor_fatura(db, fatura.id)
+        fatura = FaturaService.obter_ou_criar_fatura(
+            db, transacao.cartao_id, transacao.data, transacao.tenant_id
+        )
+        transacao.fatura_id = fatura.id
 
     @staticmethod
     def recalcular_valor_fatura(db: Session, fatura_id: int):
         """
-        Recalcula o valor total da fatura baseado nas transações vinculadas
+        Recalcula do zero o valor total da fatura baseado nas transações vinculadas
+        O caminho normal é incremental; use para correções pontuais
         """
         fatura = db.query(Fatura).filter(Fatura.id == fatura_id).first()
         if not fatura:
@@ -179,6 +194,7 @@ class FaturaService:
                 conta_pagamento_id = conta_padrao.id
         
         # Buscar ou criar categoria de pagamento se não fornecida
+        categoria_criada = False
         if not categoria_pagamento_id:
             categoria_cartao = db.query(Categoria).filter(
                 Categoria.tenant_id == fatura.tenant_id,
@@ -195,6 +211,7 @@ class FaturaService:
                 )
                 db.add(categoria_cartao)
                 db.flush()
+                categoria_criada = True
             categoria_pagamento_id = categoria_cartao.id
         
         # Criar transação de pagamento
@@ -232,6 +249,9 @@ class FaturaService:
             # Não falha o pagamento se houver erro na criação da nova fatura
             db.commit()
         
+        if categoria_criada:
+            EntidadesCache.invalidar(fatura.tenant_id)
+        
         return transacao_pagamento
 
     @staticmethod
@@ -361,4 +381,59 @@ class FaturaService:
             FaturaService.criar_nova_fatura_pos_pagamento(db, fatura.cartao_id, tenant_id)
         
         db.commit()
-        return len(faturas_antigas) 
\ No newline at end of file
+        return len(faturas_antigas) 
+
+    @staticmethod
+    def verificar_consistencia_faturas(db: Session, tenant_id: Optional[int] = None, corrigir: bool = True, tolerancia: float = 0.01) -> Dict[str, Any]:
+        """
+        Recalcula em lote (uma consulta agrupada) o valor de todas as faturas e compara com valor_total
+        Reporta as faturas com divergência e, se `corrigir`, grava o valor recalculado
+        Não faz commit - deixar para quem chama a função
+        """
+        from sqlalchemy import func
+        
+        somas = db.query(
+            Transacao.fatura_id.label("fatura_id"),
+            func.sum(Transacao.valor).label("total")
+        ).filter(
+            Transacao.fatura_id.isnot(None),
+            Transacao.tipo == TipoTransacao.SAIDA
+        ).group_by(Transacao.fatura_id).subquery()
+        
+        query = db.query(
+            Fatura.id,
+            Fatura.tenant_id,
+            Fatura.cartao_id,
+            Fatura.valor_total,
+            func.coalesce(somas.c.total, 0.0).label("recalculado")
+        ).outerjoin(somas, somas.c.fatura_id == Fatura.id)
+        
+        if tenant_id is not None:
+            query = query.filter(Fatura.tenant_id == tenant_id)
+        
+        faturas = query.all()
+        divergencias = [
+            {
+                "fatura_id": fatura.id,
+                "tenant_id": fatura.tenant_id,
+                "cartao_id": fatura.cartao_id,
+                "valor_total": float(fatura.valor_total or 0),
+                "recalculado": float(fatura.recalculado or 0),
+                "diferenca": round(float(fatura.valor_total or 0) - float(fatura.recalculado or 0), 2)
+            }
+            for fatura in faturas
+            if abs(float(fatura.valor_total or 0) - float(fatura.recalculado or 0)) > tolerancia
+        ]
+        
+        if corrigir and divergencias:
+            db.bulk_update_mappings(Fatura, [
+                {"id": item["fatura_id"], "valor_total": item["recalculado"]}
+                for item in divergencias
+            ])
+        
+        return {
+            "faturas_verificadas": len(faturas),
+            "faturas_divergentes": len(divergencias),
+            "corrigidas": len(divergencias) if corrigir else 0,
+            "divergencias": divergencias
+        }
@@ -16,6 +16,7 @@ from ..models.financiamento import (
     StatusParcela
 )
 from ..models.financial import Transacao, Categoria, Conta, TipoTransacao
+from .amortizacao_service import AmortizacaoService
 
 class FinanciamentoService:
     """
@@ -32,51 +33,8 @@ class FinanciamentoService:
         ENTRADA: taxa_mensal em PERCENTUAL (ex: 1.0 para 1%)
         ENTRADA: seguro_mensal em VALOR ABSOLUTO (ex: 50.00 para R$ 50)
         """
-        # CORREÇÃO: Converter percentual para decimal
-        taxa = taxa_mensal / 100  
-        
-        # PMT - Cálculo da parcela fixa (só principal + juros)
-        if taxa == 0:
-            parcela_principal_juros = valor_financiado / parcelas
-        else:
-            parcela_principal_juros = valor_financiado * (taxa * (1 + taxa)**parcelas) / ((1 + taxa)**parcelas - 1)
-        
-        tabela = []
-        saldo = valor_financiado
-        data_atual = data_inicio
-        
-        for i in range(1, parcelas + 1):
-            juros = saldo * taxa
-            amortizacao = parcela_principal_juros - juros
-            
-            # Garantir que última parcela quite exatamente
-            if i == parcelas:
-                amortizacao = saldo
-                saldo_final = 0
-                parcela_principal_juros_ajustada = juros + amortizacao
-            else:
-                saldo_final = saldo - amortizacao
-                parcela_principal_juros_ajustada = parcela_principal_juros
-            
-            # CORREÇÃO: Valor total da parcela = principal + juros + seguro
-            valor_parcela_total = parcela_principal_juros_ajustada + seguro_mensal
-            
-            tabela.append({
-                'numero': i,
-                'data_vencimento': data_atual,
-                'saldo_inicial': round(saldo, 2),
-                'amortizacao': round(amortizacao, 2),
-                'juros': round(juros, 2),
-                'seguro': round(seguro_mensal, 2),
-                'valor_parcela': round(valor_parcela_total, 2),
-                'saldo_final': round(saldo_final, 2),
-                'porcentagem_amortizada': round(((valor_financiado - saldo_final) / valor_financiado) * 100, 2)
-            })
-            
-            saldo = saldo_final
-            data_atual = FinanciamentoService._adicionar_mes(data_atual)
-        
-        return tabela
+        colunas = AmortizacaoService.price(valor_financiado, taxa_mensal, parcelas, seguro_mensal)
+        return AmortizacaoService.materializar(colunas, data_inicio)
     
     @staticmethod
     def calcular_sac(valor_financiado: float, taxa_mensal: float, parcelas: int, 
@@ -87,44 +45,8 @@ class FinanciamentoService:
         ENTRADA: taxa_mensal em PERCENTUAL (ex: 1.0 para 1%)
         ENTRADA: seguro_mensal em VALOR ABSOLUTO (ex: 50.00 para R$ 50)
         """
-        # CORREÇÃO: Converter percentual para decimal
-        taxa = taxa_mensal / 100
-        amortizacao_fixa = valor_financiado / parcelas
-        
-        tabela = []
-        saldo = valor_financiado
-        data_atual = data_inicio
-        
-        for i in range(1, parcelas + 1):
-            juros = saldo * taxa
-            
-            # Garantir que última parcela quite exatamente
-            if i == parcelas:
-                amortizacao = saldo
-                saldo_final = 0
-            else:
-                amortizacao = amortizacao_fixa
-                saldo_final = saldo - amortizacao
-            
-            # CORREÇÃO: Valor total da parcela = amortização + juros + seguro
-            valor_parcela_total = amortizacao + juros + seguro_mensal
-            
-            tabela.append({
-                'numero': i,
-                'data_vencimento': data_atual,
-                'saldo_inicial': round(saldo, 2),
-                'amortizacao': round(amortizacao, 2),
-                'juros': round(juros, 2),
-                'seguro': round(seguro_mensal, 2),
-                'valor_parcela': round(valor_parcela_total, 2),
-                'saldo_final': round(saldo_final, 2),
-                'porcentagem_amortizada': round(((valor_financiado - saldo_final) / valor_financiado) * 100, 2)
-            })
-            
-            saldo = saldo_final
-            data_atual = FinanciamentoService._adicionar_mes(data_atual)
-        
-        return tabela
+        colunas = AmortizacaoService.sac(valor_financiado, taxa_mensal, parcelas, seguro_mensal)
+        return AmortizacaoService.materializar(colunas, data_inicio)
     
     @staticmethod
     def calcular_sacre(valor_financiado: float, taxa_mensal: float, parcelas: int, 
@@ -133,52 +55,8 @@ class FinanciamentoService:
         Calcula tabela de amortização pelo sistema SACRE (Misto)
         Combina características do PRICE e SAC
         """
-        # Para SACRE, fazemos uma média ponderada entre PRICE e SAC
-        # Primeiro terço: mais parecido com PRICE
-        # Segundo terço: transição
-        # Último terço: mais parecido com SAC
-        
-        tabela_price = FinanciamentoService.calcular_price(valor_financiado, taxa_mensal, parcelas, data_inicio, seguro_mensal)
-        tabela_sac = FinanciamentoService.calcular_sac(valor_financiado, taxa_mensal, parcelas, data_inicio, seguro_mensal)
-        
-        tabela = []
-        for i in range(parcelas):
-            if i < parcelas // 3:  # Primeiro terço - 70% PRICE, 30% SAC
-                peso_price = 0.7
-            elif i < 2 * parcelas // 3:  # Segundo terço - 50% cada
-                peso_price = 0.5
-            else:  # Último terço - 30% PRICE, 70% SAC
-                peso_price = 0.3
-            
-            peso_sac = 1 - peso_price
-            
-            amortizacao = (tabela_price[i]['amortizacao'] * peso_price + 
-                          tabela_sac[i]['amortizacao'] * peso_sac)
-            juros = (tabela_price[i]['juros'] * peso_price + 
-                    tabela_sac[i]['juros'] * peso_sac)
-            valor_parcela = amortizacao + juros + seguro_mensal
-            
-            # Recalcular saldo baseado na amortização
-            if i == 0:
-                saldo_inicial = valor_financiado
-            else:
-                saldo_inicial = tabela[i-1]['saldo_final']
-            
-            saldo_final = saldo_inicial - amortizacao
-            
-            tabela.append({
-                'numero': i + 1,
-                'data_vencimento': tabela_price[i]['data_vencimento'],
-                'saldo_inicial': round(saldo_inicial, 2),
-                'amortizacao': round(amortizacao, 2),
-                'juros': round(juros, 2),
-                'seguro': round(seguro_mensal, 2),
-                'valor_parcela': round(valor_parcela, 2),
-                'saldo_final': round(saldo_final, 2),
-                'porcentagem_amortizada': round(((valor_financiado - saldo_final) / valor_financiado) * 100, 2)
-            })
-        
-        return tabela
+        colunas = AmortizacaoService.sacre(valor_financiado, taxa_mensal, parcelas, seguro_mensal)
+        return AmortizacaoService.materializar(colunas, data_inicio)
     
     @staticmethod
     def calcular_americano(valor_financiado: float, taxa_mensal: float, parcelas: int, 
@@ -187,37 +65,8 @@ class FinanciamentoService:
         Calcula tabela de amortização pelo sistema AMERICANO
         Só juros durante o período + principal no final
         """
-        taxa = taxa_mensal / 100
-        juros_fixos = valor_financiado * taxa
-        
-        tabela = []
-        data_atual = data_inicio
-        
-        for i in range(1, parcelas + 1):
-            if i == parcelas:  # Última parcela - principal + juros
-                amortizacao = valor_financiado
-                saldo_final = 0
-                valor_parcela = amortizacao + juros_fixos + seguro_mensal
-            else:  # Parcelas intermediárias - só juros
-                amortizacao = 0
-                saldo_final = valor_financiado
-                valor_parcela = juros_fixos + seguro_mensal
-            
-            tabela.append({
-                'numero': i,
-                'data_vencimento': data_atual,
-                'saldo_inicial': valor_financiado,
-                'amortizacao': round(amortizacao, 2),
-                'juros': round(juros_fixos, 2),
-                'seguro': round(seguro_mensal, 2),
-                'valor_parcela': round(valor_parcela, 2),
-                'saldo_final': round(saldo_final, 2),
-                'porcentagem_amortizada': round(((valor_financiado - saldo_final) / valor_financiado) * 100, 2)
-            })
-            
-            data_atual = FinanciamentoService._adicionar_mes(data_atual)
-        
-        return tabela
+        colunas = AmortizacaoService.americano(valor_financiado, taxa_mensal, parcelas, seguro_mensal)
+        return AmortizacaoService.materializar(colunas, data_inicio)
     
     @staticmethod
     def simular_financiamento(
@@ -552,11 +401,13 @@ class FinanciamentoService:
         conta_id: int = None,
         cartao_id: int = None,
         observacoes: str = None,
-        comprovante_path: str = None
+        comprovante_path: str = None,
+        commit: bool = True
     ) -> Tuple[ParcelaFinanciamento, Transacao]:
         """
         Registra o pagamento de uma parcela de financiamento
         Cria transação automática e atualiza status
+        commit=False só faz flush (o chamador controla a transação, ex.: lotes do agendador)
         """
         # Buscar a parcela
         parcela = db.query(ParcelaFinanciamento).filter(
@@ -687,7 +538,10 @@ class FinanciamentoService:
         elif financiamento.parcelas_pagas >= financiamento.numero_parcelas:
             financiamento.status = StatusFinanciamento.QUITADO
         
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         
         return parcela, transacao
     
@@ -876,11 +730,8 @@ class FinanciamentoService:
     
     @staticmethod
     def _adicionar_meses(data: date, meses: int) -> date:
-        """Adiciona múltiplos meses à data"""
-        result = data
-        for _ in range(meses):
-            result = FinanciamentoService._adicionar_mes(result)
-        return result
+        """Adiciona múltiplos meses à data (mesmo resultado de aplicar _adicionar_mes repetidamente)"""
+        return AmortizacaoService.datas_vencimento(data, meses + 1)[-1]
     
     @staticmethod
     def _calcular_valor_parcela_inicial(
@@ -0,0 +1,307 @@
+"""
+Serviço de importação em lote de transações (Excel, CSV e OFX)
+
+Valida e normaliza as colunas com operações vetorizadas do pandas, resolve
+cartão/conta/categoria contra mapas pré-carregados (uma vez por importação) e
+insere em lotes com INSERT em lote (ORM bulk insert). Os erros são reportados por linha.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from datetime import datetime
+from typing import Dict, Any, List, Tuple, Optional
+import io
+import json
+import logging
+import re
+
+import pandas as pd
+
+from ..models.financial import Transacao, Categoria, Conta, Cartao, TipoTransacao
+from ..models.rollup import registrar_insercoes_rollup
+
+logger = logging.getLogger(__name__)
+
+LOTE_INSERCAO = 1000
+LOTE_CATEGORIZACAO = 100
+COLUNAS_OBRIGATORIAS = ['Data', 'Valor', 'Tipo']
+EXTENSOES_ACEITAS = ('.xlsx', '.xls', '.csv', '.ofx')
+
+_OFX_TRANSACAO = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+_OFX_CAMPO = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+class ImportacaoService:
+
+    @staticmethod
+    def ler_arquivo(nome_arquivo: str, conteudo: bytes) -> pd.DataFrame:
+        """Lê o arquivo enviado para um DataFrame com as colunas do template (Data, Descrição, Valor, ...)"""
+        nome = (nome_arquivo or "").lower()
+
+        if nome.endswith(('.xlsx', '.xls')):
+            return pd.read_excel(io.BytesIO(conteudo), sheet_name='Transações')
+
+        if nome.endswith('.csv'):
+            texto = ImportacaoService._decodificar(conteudo)
+            # sep=None detecta ',' ou ';' (extratos brasileiros costumam usar ';')
+            return pd.read_csv(io.StringIO(texto), sep=None, engine='python', dtype=str)
+
+        if nome.endswith('.ofx'):
+            return ImportacaoService._ler_ofx(ImportacaoService._decodificar(conteudo))
+
+        raise ValueError(f"Formato não suportado. Use {', '.join(EXTENSOES_ACEITAS)}")
+
+    @staticmethod
+    def _decodificar(conteudo: bytes) -> str:
+        try:
+            return conteudo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return conteudo.decode('latin-1')
+
+    @staticmethod
+    def _ler_ofx(texto: str) -> pd.DataFrame:
+        """Extrai as transações (STMTTRN) de um extrato OFX (SGML ou XML)"""
+        linhas = []
+        for bloco in _OFX_TRANSACAO.findall(texto):
+            campos = {chave.upper(): valor.strip() for chave, valor in _OFX_CAMPO.findall(bloco)}
+            linhas.append({
+                'Data': campos.get('DTPOSTED', '')[:8],
+                'Descrição': campos.get('MEMO') or campos.get('NAME') or '',
+                'Valor': campos.get('TRNAMT'),
+            })
+
+        df = pd.DataFrame(linhas, columns=['Data', 'Descrição', 'Valor'])
+        valores = pd.to_numeric(df['Valor'].str.replace(',', '.', regex=False), errors='coerce')
+        # No OFX o sinal do valor define o tipo
+        df['Tipo'] = valores.lt(0).map({True: 'SAIDA', False: 'ENTRADA'}).where(valores.notna())
+        df['Valor'] = valores.abs()
+        df['Data'] = pd.to_datetime(df['Data'], format='%Y%m%d', errors='coerce')
+        return df
+
+    @staticmethod
+    def _coluna_texto(df: pd.DataFrame, coluna: str) -> pd.Series:
+        if coluna not in df.columns:
+            return pd.Series('', index=df.index, dtype=object)
+        return df[coluna].astype(object).where(df[coluna].notna(), '').astype(str).str.strip()
+
+    @staticmethod
+    def _converter_valores(serie: pd.Series) -> pd.Series:
+        """Converte valores numéricos ou texto ('R$ 1.234,56', '45.50') para float"""
+        if pd.api.types.is_numeric_dtype(serie):
+            return serie.astype(float)
+
+        texto = serie.astype(object).where(serie.notna(), '').astype(str).str.strip()
+        texto = texto.str.replace(r'[R$\s]', '', regex=True)
+        formato_brasileiro = texto.str.contains(',', regex=False)
+        texto = texto.where(
+            ~formato_brasileiro,
+            texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        )
+        return pd.to_numeric(texto.mask(texto.eq('')), errors='coerce')
+
+    @staticmethod
+    def normalizar(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """
+        Valida e normaliza todas as linhas de uma vez
+        Retorna (linhas válidas, erros por linha); a coluna 'linha' é a linha da planilha
+        """
+        df = df.copy()
+        df['linha'] = df.index + 2
+        erros: List[Dict[str, Any]] = []
+
+        def rejeitar(mascara: pd.Series, mensagem) -> None:
+            nonlocal df
+            if mascara.any():
+                for linha, texto in zip(df.loc[mascara, 'linha'], mensagem(df[mascara])):
+                    erros.append({'linha': int(linha), 'erro': texto})
+                df = df[~mascara]
+
+        df['Valor'] = ImportacaoService._converter_valores(df['Valor'])
+        tipo_informado = ImportacaoService._coluna_texto(df, 'Tipo').str.upper()
+        rejeitar(
+            df['Valor'].isna() | tipo_informado.eq(''),
+            lambda parte: ['Valor ou Tipo não informado'] * len(parte)
+        )
+
+        df['Tipo'] = ImportacaoService._coluna_texto(df, 'Tipo').str.upper()
+        df.loc[~df['Tipo'].isin(['ENTRADA', 'SAIDA']), 'Tipo'] = 'SAIDA'
+
+        # Data ausente ou inválida: hoje (como na importação original)
+        hoje = pd.Timestamp(datetime.now().date())
+        datas = df['Data']
+        if not pd.api.types.is_datetime64_any_dtype(datas):
+            # Texto (CSV): ISO (2024-01-15) primeiro; dayfirst só para o que não for ISO
+            # (15/01/2024), senão '2024-01-05' seria lido como 1º de maio
+            texto = datas
+            datas = pd.to_datetime(texto, errors='coerce', format='%Y-%m-%d')
+            restantes = datas.isna()
+            if restantes.any():
+                datas = datas.where(~restantes, pd.to_datetime(
+                    texto[restantes], errors='coerce', dayfirst=True, format='mixed'
+                ))
+        df['Data'] = datas.dt.normalize().fillna(hoje)
+        rejeitar(
+            df['Data'] > hoje,
+            lambda parte: [
+                f'Data futura não permitida: {data.date()}. Use data de hoje ou anterior.'
+                for data in parte['Data']
+            ]
+        )
+
+        df['Descrição'] = ImportacaoService._coluna_texto(df, 'Descrição')
+        sem_descricao = df['Descrição'].eq('')
+        df.loc[sem_descricao, 'Descrição'] = df.loc[sem_descricao, 'Valor'].map(
+            lambda valor: f"Transação importada - R$ {valor:.2f}"
+        )
+
+        df['Categoria'] = ImportacaoService._coluna_texto(df, 'Categoria')
+        df['Cartão'] = ImportacaoService._coluna_texto(df, 'Cartão')
+
+        return df, erros
+
+    @staticmethod
+    def _inferir_categorias(chat_service, descricoes: List[str]) -> Dict[str, str]:
+        """
+        Sugere categorias para descrições distintas, em lotes (um prompt por lote)
+        Se o lote falhar, usa a inferência individual do ChatAIService
+        """
+        sugestoes: Dict[str, str] = {}
+        for inicio in range(0, len(descricoes), LOTE_CATEGORIZACAO):
+            lote = descricoes[inicio:inicio + LOTE_CATEGORIZACAO]
+            try:
+                prompt = (
+                    "Para cada descrição de transação abaixo, sugira UMA categoria simples "
+                    "(ex: Alimentação, Transporte, Saúde, etc). Responda apenas um array JSON "
+                    "de strings, na mesma ordem e com o mesmo tamanho.\n" +
+                    json.dumps(lote, ensure_ascii=False)
+                )
+                response = chat_service.client.chat.completions.create(
+                    model=chat_service.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1,
+                    max_tokens=20 * len(lote)
+                )
+                conteudo = response.choices[0].message.content.strip()
+                categorias = json.loads(conteudo[conteudo.find('['):conteudo.rfind(']') + 1])
+                if len(categorias) != len(lote):
+                    raise ValueError("Quantidade de categorias diferente do lote")
+                sugestoes.update({descricao: str(nome).strip() for descricao, nome in zip(lote, categorias)})
+            except Exception as e:
+                logger.warning(f"⚠️ Categorização em lote falhou ({e}); usando inferência individual")
+                for descricao in lote:
+                    sugestoes[descricao] = chat_service._determinar_categoria_automatica(descricao)
+        return sugestoes
+
+    @staticmethod
+    def resolver_vinculos(db: Session, tenant_id: int, df: pd.DataFrame) -> pd.DataFrame:
+        """Preenche categoria_id, cartao_id e conta_id a partir dos nomes, com mapas pré-carregados"""
+        categorias = pd.DataFrame(
+            db.query(Categoria.nome, Categoria.id).filter(Categoria.tenant_id == tenant_id).all(),
+            columns=['Categoria', 'categoria_id']
+        ).drop_duplicates('Categoria')
+        cartoes = pd.DataFrame(
+            db.query(Cartao.nome, Cartao.id).filter(Cartao.tenant_id == tenant_id).all(),
+            columns=['Cartão', 'cartao_id']
+        ).drop_duplicates('Cartão')
+        primeira_conta = db.query(Conta.id).filter(Conta.tenant_id == tenant_id).order_by(Conta.id).first()
+
+        from .chat_ai_service import ChatAIService
+        chat_service = ChatAIService(db=db, tenant_id=tenant_id)
+
+        # Sem categoria: uma sugestão por descrição distinta
+        sem_categoria = df['Categoria'].eq('')
+        if sem_categoria.any():
+            descricoes = df.loc[sem_categoria, 'Descrição'].drop_duplicates().tolist()
+            sugestoes = ImportacaoService._inferir_categorias(chat_service, descricoes)
+            df.loc[sem_categoria, 'Categoria'] = df.loc[sem_categoria, 'Descrição'].map(sugestoes)
+
+        df = df.merge(categorias, on='Categoria', how='left')
+
+        # Categorias ainda não cadastradas: criadas uma vez por nome distinto
+        faltando = df['categoria_id'].isna()
+        if faltando.any():
+            criadas = {
+                nome: chat_service._criar_categoria_automatica(nome)
+                for nome in df.loc[faltando, 'Categoria'].drop_duplicates()
+            }
+            df.loc[faltando, 'categoria_id'] = df.loc[faltando, 'Categoria'].map(criadas)
+
+        df = df.merge(cartoes, on='Cartão', how='left')
+
+        # Sem cartão: primeira conta disponível (como na importação original)
+        df['conta_id'] = None
+        if primeira_conta:
+            df.loc[df['cartao_id'].isna(), 'conta_id'] = primeira_conta.id
+
+        return df
+
+    @staticmethod
+    def _inteiro_ou_none(valor) -> Optional[int]:
+        return None if pd.isna(valor) else int(valor)
+
+    @staticmethod
+    def importar(
+        db: Session,
+        tenant_id: int,
+        df: pd.DataFrame,
+        origem: str,
+        created_by_name: str
+    ) -> Dict[str, Any]:
+        """
+        Pipeline completo: normaliza, resolve vínculos e insere em lotes
+        Não faz commit - deixar para quem chama a função
+        """
+        faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in df.columns]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias faltando: {', '.join(faltando)}")
+
+        df, erros = ImportacaoService.normalizar(df)
+        sucessos: List[Dict[str, Any]] = []
+        if df.empty:
+            return {"sucessos": sucessos, "erros": erros}
+
+        df = ImportacaoService.resolver_vinculos(db, tenant_id, df)
+
+        mapeamentos = [
+            {
+                "descricao": descricao,
+                "valor": float(valor),
+                "tipo": TipoTransacao(tipo),
+                "data": data.to_pydatetime(),
+                "categoria_id": ImportacaoService._inteiro_ou_none(categoria_id),
+                "cartao_id": ImportacaoService._inteiro_ou_none(cartao_id),
+                "conta_id": ImportacaoService._inteiro_ou_none(conta_id),
+                "tenant_id": tenant_id,
+                "processado_por_ia": True,
+                "prompt_original": f"Importação {origem} - linha {linha}",
+                "created_by_name": created_by_name,
+            }
+            for descricao, valor, tipo, data, categoria_id, cartao_id, conta_id, linha in zip(
+                df['Descrição'], df['Valor'], df['Tipo'], df['Data'],
+                df['categoria_id'], df['cartao_id'], df['conta_id'], df['linha']
+            )
+        ]
+
+        # INSERT em lote (executemany/insertmanyvalues) com RETURNING dos ids na ordem dos parâmetros
+        stmt = insert(Transacao).returning(Transacao.id, sort_by_parameter_order=True)
+        for inicio in range(0, len(mapeamentos), LOTE_INSERCAO):
+            lote = mapeamentos[inicio:inicio + LOTE_INSERCAO]
+            for mapeamento, transacao_id in zip(lote, db.scalars(stmt, lote)):
+                mapeamento["id"] = transacao_id
+
+        # O INSERT em lote não passa pelos eventos de flush que mantêm o rollup
+        registrar_insercoes_rollup(db.connection(), mapeamentos)
+
+        sucessos = [
+            {
+                'linha': int(linha),
+                'descricao': mapeamento["descricao"],
+                'valor': mapeamento["valor"],
+                'categoria': categoria,
+                'id': mapeamento.get("id")
+            }
+            for mapeamento, linha, categoria in zip(mapeamentos, df['linha'], df['Categoria'])
+        ]
+
+        logger.info(f"📥 Importação {origem}: {len(sucessos)} transações inseridas, {len(erros)} erros")
+        return {"sucessos": sucessos, "erros": sorted(erros, key=lambda erro: erro['linha'])}
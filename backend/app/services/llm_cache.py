@@ -0,0 +1,216 @@
+"""
+Cache de respostas do OpenAI para os fallbacks dos chats (extração por IA e chat genérico)
+
+Chave = sha256(modelo + mensagens normalizadas + parâmetros + hash do contexto do tenant)
+- Normalização: minúsculas, Unicode NFC e espaços colapsados ("Gastei  30 no Mercado" e
+  "gastei 30 no mercado" são a mesma chamada)
+- contexto=None para prompts que não dependem do tenant (a extração é compartilhada entre todos);
+  qualquer dado do tenant que influencie a resposta deve entrar no contexto
+- Camada em memória (LRU com TTL) sempre ativa; camada no banco (tabela llm_respostas_cache)
+  opcional via LLM_CACHE_PERSISTENTE, compartilhada entre processos e reinícios
+- Só respostas bem-sucedidas são guardadas; erro da API nunca vai para o cache
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models.llm_cache import LLMRespostaCache
+
+logger = logging.getLogger(__name__)
+
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+class LLMCache:
+
+    _lock = threading.Lock()
+    _entradas: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+    _metricas = {"hits_memoria": 0, "hits_banco": 0, "misses": 0, "gravacoes": 0, "tokens_economizados": 0}
+    _tokens: Dict[str, int] = {}
+
+    @staticmethod
+    def normalizar(texto: Optional[str]) -> str:
+        return _RE_ESPACOS.sub(" ", unicodedata.normalize("NFC", texto or "")).strip().casefold()
+
+    @staticmethod
+    def chave(modelo: str, mensagens: List[Dict[str, str]], contexto: Any = None, **parametros) -> str:
+        """Chave do cache para a chamada (contexto pode ser qualquer valor serializável em JSON)"""
+        conteudo = {
+            "modelo": modelo,
+            "mensagens": [[m.get("role"), LLMCache.normalizar(m.get("content"))] for m in mensagens],
+            "parametros": parametros,
+            "contexto": hashlib.sha256(
+                json.dumps(contexto, sort_keys=True, default=str, ensure_ascii=False).encode()
+            ).hexdigest() if contexto is not None else None
+        }
+        return hashlib.sha256(json.dumps(conteudo, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    @staticmethod
+    def obter_memoria(chave: str) -> Optional[str]:
+        with LLMCache._lock:
+            entrada = LLMCache._entradas.get(chave)
+            if not entrada:
+                return None
+            resposta, expira_em = entrada
+            if expira_em < time.monotonic():
+                del LLMCache._entradas[chave]
+                LLMCache._tokens.pop(chave, None)
+                return None
+            LLMCache._entradas.move_to_end(chave)
+            LLMCache._metricas["hits_memoria"] += 1
+            LLMCache._metricas["tokens_economizados"] += LLMCache._tokens.get(chave, 0)
+            return resposta
+
+    @staticmethod
+    def _salvar_memoria(chave: str, resposta: str, ttl: float, tokens: int) -> None:
+        with LLMCache._lock:
+            LLMCache._entradas[chave] = (resposta, time.monotonic() + ttl)
+            LLMCache._entradas.move_to_end(chave)
+            LLMCache._tokens[chave] = tokens
+            while len(LLMCache._entradas) > settings.LLM_CACHE_MAX_ITENS:
+                antiga, _ = LLMCache._entradas.popitem(last=False)
+                LLMCache._tokens.pop(antiga, None)
+
+    @staticmethod
+    def obter_banco(chave: str, ttl: float) -> Optional[str]:
+        """Busca na camada persistente (se habilitada) e promove para a memória"""
+        if not settings.LLM_CACHE_PERSISTENTE:
+            return None
+        db = SessionLocal()
+        try:
+            agora = datetime.utcnow()
+            registro = db.query(LLMRespostaCache).filter(
+                LLMRespostaCache.chave == chave,
+                LLMRespostaCache.expira_em > agora
+            ).first()
+            if not registro:
+                return None
+            registro.hits = (registro.hits or 0) + 1
+            resposta, tokens = registro.resposta, registro.tokens or 0
+            restante = (registro.expira_em - agora).total_seconds()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Cache LLM no banco indisponível: {e}")
+            return None
+        finally:
+            db.close()
+
+        LLMCache._salvar_memoria(chave, resposta, min(ttl, restante), tokens)
+        with LLMCache._lock:
+            LLMCache._metricas["hits_banco"] += 1
+            LLMCache._metricas["tokens_economizados"] += tokens
+        return resposta
+
+    @staticmethod
+    def salvar(chave: str, modelo: str, resposta: str, ttl: float, tokens: int = 0) -> None:
+        LLMCache._salvar_memoria(chave, resposta, ttl, tokens)
+        with LLMCache._lock:
+            LLMCache._metricas["gravacoes"] += 1
+        if not settings.LLM_CACHE_PERSISTENTE:
+            return
+        db = SessionLocal()
+        try:
+            db.merge(LLMRespostaCache(
+                chave=chave,
+                modelo=modelo,
+                resposta=resposta,
+                tokens=tokens,
+                hits=0,
+                criado_em=datetime.utcnow(),
+                expira_em=datetime.utcnow() + timedelta(seconds=ttl)
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Resposta do LLM não salva no banco: {e}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def completar(client, modelo: str, mensagens: List[Dict[str, str]], ttl: float,
+                  contexto: Any = None, **parametros) -> str:
+        """chat.completions.create com cache (client síncrono); retorna o conteúdo da resposta"""
+        chave = LLMCache.chave(modelo, mensagens, contexto, **parametros)
+        resposta = LLMCache.obter_memoria(chave)
+        if resposta is None:
+            resposta = LLMCache.obter_banco(chave, ttl)
+        if resposta is not None:
+            return resposta
+
+        with LLMCache._lock:
+            LLMCache._metricas["misses"] += 1
+        response = client.chat.completions.create(model=modelo, messages=mensagens, **parametros)
+        resposta = response.choices[0].message.content or ""
+        LLMCache.salvar(chave, modelo, resposta, ttl, LLMCache._tokens_usados(response))
+        return resposta
+
+    @staticmethod
+    async def completar_async(client, modelo: str, mensagens: List[Dict[str, str]], ttl: float,
+                              contexto: Any = None, **parametros) -> str:
+        """Mesmo que completar() para AsyncOpenAI (a camada no banco roda fora do event loop)"""
+        chave = LLMCache.chave(modelo, mensagens, contexto, **parametros)
+        resposta = LLMCache.obter_memoria(chave)
+        if resposta is None and settings.LLM_CACHE_PERSISTENTE:
+            resposta = await asyncio.to_thread(LLMCache.obter_banco, chave, ttl)
+        if resposta is not None:
+            return resposta
+
+        with LLMCache._lock:
+            LLMCache._metricas["misses"] += 1
+        response = await client.chat.completions.create(model=modelo, messages=mensagens, **parametros)
+        resposta = response.choices[0].message.content or ""
+        tokens = LLMCache._tokens_usados(response)
+        if settings.LLM_CACHE_PERSISTENTE:
+            await asyncio.to_thread(LLMCache.salvar, chave, modelo, resposta, ttl, tokens)
+        else:
+            LLMCache.salvar(chave, modelo, resposta, ttl, tokens)
+        return resposta
+
+    @staticmethod
+    def limpar_expirados() -> int:
+        """Remove entradas expiradas (memória e banco); retorna quantas saíram do banco"""
+        agora = time.monotonic()
+        with LLMCache._lock:
+            for chave in [c for c, (_, expira_em) in LLMCache._entradas.items() if expira_em < agora]:
+                del LLMCache._entradas[chave]
+                LLMCache._tokens.pop(chave, None)
+        if not settings.LLM_CACHE_PERSISTENTE:
+            return 0
+        db = SessionLocal()
+        try:
+            removidos = db.query(LLMRespostaCache).filter(
+                LLMRespostaCache.expira_em <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removidos
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erro ao limpar cache LLM: {e}")
+            return 0
+        finally:
+            db.close()
+
+    @staticmethod
+    def metricas() -> Dict[str, Any]:
+        with LLMCache._lock:
+            metricas = {**LLMCache._metricas, "itens_memoria": len(LLMCache._entradas)}
+        consultas = metricas["hits_memoria"] + metricas["hits_banco"] + metricas["misses"]
+        metricas["taxa_acerto"] = round((metricas["hits_memoria"] + metricas["hits_banco"]) / consultas, 4) if consultas else 0.0
+        return metricas
+
+    @staticmethod
+    def _tokens_usados(response) -> int:
+        usage = getattr(response, "usage", None)
+        return int(getattr(usage, "total_tokens", 0) or 0)
@@ -7,12 +7,19 @@ import asyncio
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy import func
+from ..database import executar_db
 from ..models.financial import Transacao, Cartao, Conta, Categoria
 from ..models.user import User
+from .rollup_service import RollupService
+from .entidades_cache import EntidadesCache
 
 class FinancialMCPServer:
-    """MCP Server para dados financeiros"""
+    """
+    MCP Server para dados financeiros
+    Cada tool async delega para um método síncrono _tool(db, ...), executado no pool de threads
+    do banco com sessão própria (executar_db) para não bloquear o event loop
+    """
     
     def __init__(self):
         self.tools = {
@@ -46,336 +53,350 @@ class FinancialMCPServer:
     
     async def get_transactions(self, user_id: int, limit: int = 10, categoria: str = None, periodo: str = "30d") -> List[Dict]:
         """Busca transações do usuário"""
-        db = next(get_db())
-        try:
-            query = db.query(Transacao).filter(Transacao.tenant_id == user_id)
-            
-            # Filtro por categoria
-            if categoria:
-                cat = db.query(Categoria).filter(
-                    Categoria.tenant_id == user_id,
-                    Categoria.nome.ilike(f"%{categoria}%")
-                ).first()
-                if cat:
-                    query = query.filter(Transacao.categoria_id == cat.id)
-            
-            # Filtro por período
-            if periodo:
-                days = int(periodo.replace('d', ''))
-                start_date = datetime.now() - timedelta(days=days)
-                query = query.filter(Transacao.data >= start_date)
-            
-            transactions = query.order_by(Transacao.data.desc()).limit(limit).all()
-            
-            return [
-                {
-                    "id": t.id,
-                    "descricao": t.descricao,
-                    "valor": float(t.valor),
-                    "tipo": t.tipo,
-                    "data": t.data.isoformat(),
-                    "categoria": t.categoria.nome if t.categoria else None,
-                    "conta": t.conta.nome if t.conta else None,
-                    "cartao": t.cartao.nome if t.cartao else None
-                }
-                for t in transactions
-            ]
-        finally:
-            db.close()
+        return await executar_db(self._get_transactions, user_id, limit=limit, categoria=categoria, periodo=periodo)
+    
+    def _get_transactions(self, db: Session, user_id: int, limit: int = 10, categoria: str = None, periodo: str = "30d") -> List[Dict]:
+        query = db.query(Transacao).filter(Transacao.tenant_id == user_id)
+        
+        # Filtro por categoria
+        if categoria:
+            cat = db.query(Categoria).filter(
+                Categoria.tenant_id == user_id,
+                Categoria.nome.ilike(f"%{categoria}%")
+            ).first()
+            if cat:
+                query = query.filter(Transacao.categoria_id == cat.id)
+        
+        # Filtro por período
+        if periodo:
+            days = int(periodo.replace('d', ''))
+            start_date = datetime.now() - timedelta(days=days)
+            query = query.filter(Transacao.data >= start_date)
+        
+        transactions = query.order_by(Transacao.data.desc()).limit(limit).all()
+        
+        return [
+            {
+                "id": t.id,
+                "descricao": t.descricao,
+                "valor": float(t.valor),
+                "tipo": t.tipo,
+                "data": t.data.isoformat(),
+                "categoria": t.categoria.nome if t.categoria else None,
+                "conta": t.conta.nome if t.conta else None,
+                "cartao": t.cartao.nome if t.cartao else None
+            }
+            for t in transactions
+        ]
     
     async def create_transaction(self, user_id: int, descricao: str, valor: float, 
                                tipo: str, categoria: str = None, conta: str = None, 
                                cartao_id: int = None, conta_id: int = None, 
                                created_by_name: str = "API MCP") -> Dict:
         """Cria nova transação"""
-        db = next(get_db())
-        try:
-            # Buscar categoria inteligente
-            categoria_id_final = self._find_or_create_smart_category(db, user_id, descricao, categoria)
-            
-            # Usar conta_id se fornecido, senão buscar por nome
-            conta_id_final = conta_id
-            if not conta_id_final and conta:
-                acc = db.query(Conta).filter(
-                    Conta.tenant_id == user_id,
-                    Conta.nome.ilike(f"%{conta}%")
-                ).first()
-                if acc:
-                    conta_id_final = acc.id
-            
-            # Criar transação
-            transaction = Transacao(
-                descricao=descricao,
-                valor=valor,
-                tipo=tipo.upper(),
-                data=datetime.now(),
-                categoria_id=categoria_id_final,
-                cartao_id=cartao_id,
-                conta_id=conta_id_final,
-                tenant_id=user_id,
-                created_by_name=created_by_name
-            )
-            
-            db.add(transaction)
-            db.commit()
-            db.refresh(transaction)
-            
-            # Buscar categoria para retornar
-            categoria_nome = "Sem categoria"
-            if transaction.categoria:
-                categoria_nome = transaction.categoria.nome
-            
-            return {
-                "id": transaction.id,
-                "descricao": transaction.descricao,
-                "valor": float(transaction.valor),
-                "tipo": transaction.tipo,
-                "categoria": categoria_nome,
-                "mensagem": "Transação criada com sucesso!"
-            }
-        finally:
-            db.close()
+        return await executar_db(
+            self._create_transaction, user_id, descricao=descricao, valor=valor, tipo=tipo,
+            categoria=categoria, conta=conta, cartao_id=cartao_id, conta_id=conta_id,
+            created_by_name=created_by_name
+        )
+    
+    def _create_transaction(self, db: Session, user_id: int, descricao: str, valor: float, 
+                            tipo: str, categoria: str = None, conta: str = None, 
+                            cartao_id: int = None, conta_id: int = None, 
+                            created_by_name: str = "API MCP") -> Dict:
+        # Buscar categoria inteligente
+        categoria_id_final = self._find_or_create_smart_category(db, user_id, descricao, categoria)
+        
+        # Usar conta_id se fornecido, senão buscar por nome
+        conta_id_final = conta_id
+        if not conta_id_final and conta:
+            acc = db.query(Conta).filter(
+                Conta.tenant_id == user_id,
+                Conta.nome.ilike(f"%{conta}%")
+            ).first()
+            if acc:
+                conta_id_final = acc.id
+        
+        # Criar transação
+        transaction = Transacao(
+            descricao=descricao,
+            valor=valor,
+            tipo=tipo.upper(),
+            data=datetime.now(),
+            categoria_id=categoria_id_final,
+            cartao_id=cartao_id,
+            conta_id=conta_id_final,
+            tenant_id=user_id,
+            created_by_name=created_by_name
+        )
+        
+        db.add(transaction)
+        db.commit()
+        db.refresh(transaction)
+        
+        # Buscar categoria para retornar
+        categoria_nome = "Sem categoria"
+        if transaction.categoria:
+            categoria_nome = transaction.categoria.nome
+        
+        return {
+            "id": transaction.id,
+            "descricao": transaction.descricao,
+            "valor": float(transaction.valor),
+            "tipo": transaction.tipo,
+            "categoria": categoria_nome,
+            "mensagem": "Transação criada com sucesso!"
+        }
     
     async def get_balance(self, user_id: int) -> Dict:
         """Calcula saldo atual"""
-        db = next(get_db())
-        try:
-            entradas = db.query(Transacao).filter(
-                Transacao.tenant_id == user_id,
-                Transacao.tipo == "ENTRADA"
-            ).all()
-            
-            saidas = db.query(Transacao).filter(
-                Transacao.tenant_id == user_id,
-                Transacao.tipo == "SAIDA"
-            ).all()
-            
-            total_entradas = sum(float(t.valor) for t in entradas)
-            total_saidas = sum(float(t.valor) for t in saidas)
-            saldo = total_entradas - total_saidas
-            
-            return {
-                "saldo_atual": saldo,
-                "total_entradas": total_entradas,
-                "total_saidas": total_saidas,
-                "total_transacoes": len(entradas) + len(saidas)
-            }
-        finally:
-            db.close()
+        return await executar_db(self._get_balance, user_id)
+    
+    def _get_balance(self, db: Session, user_id: int) -> Dict:
+        entradas = db.query(Transacao).filter(
+            Transacao.tenant_id == user_id,
+            Transacao.tipo == "ENTRADA"
+        ).all()
+        
+        saidas = db.query(Transacao).filter(
+            Transacao.tenant_id == user_id,
+            Transacao.tipo == "SAIDA"
+        ).all()
+        
+        total_entradas = sum(float(t.valor) for t in entradas)
+        total_saidas = sum(float(t.valor) for t in saidas)
+        saldo = total_entradas - total_saidas
+        
+        return {
+            "saldo_atual": saldo,
+            "total_entradas": total_entradas,
+            "total_saidas": total_saidas,
+            "total_transacoes": len(entradas) + len(saidas)
+        }
     
     async def get_monthly_summary(self, user_id: int, mes: int = None, ano: int = None) -> Dict:
         """Resumo mensal"""
-        db = next(get_db())
-        try:
-            if not mes:
-                mes = datetime.now().month
-            if not ano:
-                ano = datetime.now().year
-            
-            start_date = datetime(ano, mes, 1)
-            if mes == 12:
-                end_date = datetime(ano + 1, 1, 1)
-            else:
-                end_date = datetime(ano, mes + 1, 1)
-            
-            transactions = db.query(Transacao).filter(
+        return await executar_db(self._get_monthly_summary, user_id, mes=mes, ano=ano)
+    
+    def _get_monthly_summary(self, db: Session, user_id: int, mes: int = None, ano: int = None) -> Dict:
+        if not mes:
+            mes = datetime.now().month
+        if not ano:
+            ano = datetime.now().year
+        
+        start_date = datetime(ano, mes, 1)
+        if mes == 12:
+            end_date = datetime(ano + 1, 1, 1)
+        else:
+            end_date = datetime(ano, mes + 1, 1)
+        
+        # Totais por (categoria, tipo) do mês - rollup mensal quando disponível
+        if RollupService.disponivel(db, user_id):
+            linhas = RollupService.totais_por_categoria(db, user_id, ano, mes)
+        else:
+            linhas = db.query(
+                Transacao.categoria_id,
+                Transacao.tipo,
+                func.sum(Transacao.valor).label("total"),
+                func.count(Transacao.id).label("quantidade")
+            ).filter(
                 Transacao.tenant_id == user_id,
                 Transacao.data >= start_date,
                 Transacao.data < end_date
-            ).all()
-            
-            por_categoria = {}
-            total_entradas = 0
-            total_saidas = 0
-            
-            for t in transactions:
-                if t.tipo == "ENTRADA":
-                    total_entradas += float(t.valor)
-                else:
-                    total_saidas += float(t.valor)
-                
-                categoria = t.categoria.nome if t.categoria else "Sem categoria"
-                if categoria not in por_categoria:
-                    por_categoria[categoria] = 0
-                por_categoria[categoria] += float(t.valor)
+            ).group_by(Transacao.categoria_id, Transacao.tipo).all()
+        
+        nomes_categorias = dict(db.query(Categoria.id, Categoria.nome).filter(
+            Categoria.id.in_({linha.categoria_id for linha in linhas})
+        ).all()) if linhas else {}
+        
+        por_categoria = {}
+        total_entradas = 0
+        total_saidas = 0
+        total_transacoes = 0
+        
+        for linha in linhas:
+            valor = float(linha.total or 0)
+            if linha.tipo == "ENTRADA":
+                total_entradas += valor
+            else:
+                total_saidas += valor
+            total_transacoes += int(linha.quantidade or 0)
             
-            return {
-                "mes": mes,
-                "ano": ano,
-                "total_entradas": total_entradas,
-                "total_saidas": total_saidas,
-                "saldo_mes": total_entradas - total_saidas,
-                "por_categoria": por_categoria,
-                "total_transacoes": len(transactions)
-            }
-        finally:
-            db.close()
+            categoria = nomes_categorias.get(linha.categoria_id, "Sem categoria")
+            if categoria not in por_categoria:
+                por_categoria[categoria] = 0
+            por_categoria[categoria] += valor
+        
+        return {
+            "mes": mes,
+            "ano": ano,
+            "total_entradas": total_entradas,
+            "total_saidas": total_saidas,
+            "saldo_mes": total_entradas - total_saidas,
+            "por_categoria": por_categoria,
+            "total_transacoes": total_transacoes
+        }
     
     async def get_categories(self, user_id: int) -> List[Dict]:
         """Lista categorias"""
-        db = next(get_db())
-        try:
-            categories = db.query(Categoria).filter(Categoria.tenant_id == user_id).all()
-            return [
-                {
-                    "id": c.id,
-                    "nome": c.nome,
-                    "cor": c.cor,
-                    "icone": c.icone
-                }
-                for c in categories
-            ]
-        finally:
-            db.close()
+        return await executar_db(self._get_categories, user_id)
+    
+    def _get_categories(self, db: Session, user_id: int) -> List[Dict]:
+        categories = db.query(Categoria).filter(Categoria.tenant_id == user_id).all()
+        return [
+            {
+                "id": c.id,
+                "nome": c.nome,
+                "cor": c.cor,
+                "icone": c.icone
+            }
+            for c in categories
+        ]
     
     async def get_cards(self, user_id: int) -> List[Dict]:
         """Lista cartões"""
-        db = next(get_db())
-        try:
-            cards = db.query(Cartao).filter(Cartao.tenant_id == user_id).all()
-            return [
-                {
-                    "id": c.id,
-                    "nome": c.nome,
-                    "bandeira": c.bandeira,
-                    "limite": float(c.limite),
-                    "ativo": c.ativo
-                }
-                for c in cards
-            ]
-        finally:
-            db.close()
+        return await executar_db(self._get_cards, user_id)
+    
+    def _get_cards(self, db: Session, user_id: int) -> List[Dict]:
+        cards = db.query(Cartao).filter(Cartao.tenant_id == user_id).all()
+        return [
+            {
+                "id": c.id,
+                "nome": c.nome,
+                "bandeira": c.bandeira,
+                "limite": float(c.limite),
+                "ativo": c.ativo
+            }
+            for c in cards
+        ]
     
     async def get_accounts(self, user_id: int) -> List[Dict]:
         """Lista contas"""
-        db = next(get_db())
-        try:
-            accounts = db.query(Conta).filter(Conta.tenant_id == user_id).all()
-            return [
-                {
-                    "id": a.id,
-                    "nome": a.nome,
-                    "banco": a.banco,
-                    "tipo": a.tipo,
-                    "saldo_inicial": float(a.saldo_inicial)
-                }
-                for a in accounts
-            ]
-        finally:
-            db.close()
+        return await executar_db(self._get_accounts, user_id)
+    
+    def _get_accounts(self, db: Session, user_id: int) -> List[Dict]:
+        accounts = db.query(Conta).filter(Conta.tenant_id == user_id).all()
+        return [
+            {
+                "id": a.id,
+                "nome": a.nome,
+                "banco": a.banco,
+                "tipo": a.tipo,
+                "saldo_inicial": float(a.saldo_inicial)
+            }
+            for a in accounts
+        ]
     
     async def create_category(self, user_id: int, nome: str, cor: str = "#3B82F6", icone: str = "💰") -> Dict:
         """Cria nova categoria"""
-        db = next(get_db())
-        try:
-            category = Categoria(
-                nome=nome,
-                cor=cor,
-                icone=icone,
-                tenant_id=user_id
-            )
-            
-            db.add(category)
-            db.commit()
-            db.refresh(category)
-            
-            return {
-                "id": category.id,
-                "nome": category.nome,
-                "cor": category.cor,
-                "icone": category.icone,
-                "mensagem": f"Categoria '{nome}' criada com sucesso!"
-            }
-        finally:
-            db.close()
+        return await executar_db(self._create_category, user_id, nome=nome, cor=cor, icone=icone)
+    
+    def _create_category(self, db: Session, user_id: int, nome: str, cor: str = "#3B82F6", icone: str = "💰") -> Dict:
+        category = Categoria(
+            nome=nome,
+            cor=cor,
+            icone=icone,
+            tenant_id=user_id
+        )
+        
+        db.add(category)
+        db.commit()
+        db.refresh(category)
+        EntidadesCache.invalidar(user_id)
+        
+        return {
+            "id": category.id,
+            "nome": category.nome,
+            "cor": category.cor,
+            "icone": category.icone,
+            "mensagem": f"Categoria '{nome}' criada com sucesso!"
+        }
     
     async def analyze_spending(self, user_id: int, periodo: str = "30d") -> Dict:
         """Análise de gastos"""
-        db = next(get_db())
-        try:
-            days = int(periodo.replace('d', ''))
-            start_date = datetime.now() - timedelta(days=days)
-            
-            transactions = db.query(Transacao).filter(
-                Transacao.tenant_id == user_id,
-                Transacao.data >= start_date,
-                Transacao.tipo == "SAIDA"
-            ).all()
-            
-            total_gasto = sum(float(t.valor) for t in transactions)
-            media_diaria = total_gasto / days if days > 0 else 0
-            
-            # Análise por categoria
-            por_categoria = {}
-            for t in transactions:
-                categoria = t.categoria.nome if t.categoria else "Sem categoria"
-                if categoria not in por_categoria:
-                    por_categoria[categoria] = 0
-                por_categoria[categoria] += float(t.valor)
-            
-            # Categoria com maior gasto
-            maior_gasto = max(por_categoria.items(), key=lambda x: x[1]) if por_categoria else ("Nenhuma", 0)
-            
-            return {
-                "periodo_dias": days,
-                "total_gasto": total_gasto,
-                "media_diaria": media_diaria,
-                "total_transacoes": len(transactions),
-                "por_categoria": por_categoria,
-                "maior_gasto_categoria": maior_gasto[0],
-                "maior_gasto_valor": maior_gasto[1],
-                "insights": [
-                    f"Você gastou R$ {total_gasto:.2f} nos últimos {days} dias",
-                    f"Média diária: R$ {media_diaria:.2f}",
-                    f"Maior gasto: {maior_gasto[0]} (R$ {maior_gasto[1]:.2f})"
-                ]
-            }
-        finally:
-            db.close()
+        return await executar_db(self._analyze_spending, user_id, periodo=periodo)
+    
+    def _analyze_spending(self, db: Session, user_id: int, periodo: str = "30d") -> Dict:
+        days = int(periodo.replace('d', ''))
+        start_date = datetime.now() - timedelta(days=days)
+        
+        transactions = db.query(Transacao).filter(
+            Transacao.tenant_id == user_id,
+            Transacao.data >= start_date,
+            Transacao.tipo == "SAIDA"
+        ).all()
+        
+        total_gasto = sum(float(t.valor) for t in transactions)
+        media_diaria = total_gasto / days if days > 0 else 0
+        
+        # Análise por categoria
+        por_categoria = {}
+        for t in transactions:
+            categoria = t.categoria.nome if t.categoria else "Sem categoria"
+            if categoria not in por_categoria:
+                por_categoria[categoria] = 0
+            por_categoria[categoria] += float(t.valor)
+        
+        # Categoria com maior gasto
+        maior_gasto = max(por_categoria.items(), key=lambda x: x[1]) if por_categoria else ("Nenhuma", 0)
+        
+        return {
+            "periodo_dias": days,
+            "total_gasto": total_gasto,
+            "media_diaria": media_diaria,
+            "total_transacoes": len(transactions),
+            "por_categoria": por_categoria,
+            "maior_gasto_categoria": maior_gasto[0],
+            "maior_gasto_valor": maior_gasto[1],
+            "insights": [
+                f"Você gastou R$ {total_gasto:.2f} nos últimos {days} dias",
+                f"Média diária: R$ {media_diaria:.2f}",
+                f"Maior gasto: {maior_gasto[0]} (R$ {maior_gasto[1]:.2f})"
+            ]
+        }
     
     async def predict_budget(self, user_id: int) -> Dict:
         """Previsão orçamentária"""
-        db = next(get_db())
-        try:
-            # Últimos 90 dias para análise
-            start_date = datetime.now() - timedelta(days=90)
-            
-            transactions = db.query(Transacao).filter(
-                Transacao.tenant_id == user_id,
-                Transacao.data >= start_date
-            ).all()
-            
-            if not transactions:
-                return {"erro": "Não há dados suficientes para previsão"}
-            
-            # Calcular médias
-            entradas = [t for t in transactions if t.tipo == "ENTRADA"]
-            saidas = [t for t in transactions if t.tipo == "SAIDA"]
-            
-            media_entrada_mensal = sum(float(t.valor) for t in entradas) / 3
-            media_saida_mensal = sum(float(t.valor) for t in saidas) / 3
-            
-            # Previsão próximo mês
-            previsao_saldo = media_entrada_mensal - media_saida_mensal
-            
-            # Recomendações
-            recomendacoes = []
-            if previsao_saldo < 0:
-                recomendacoes.append("⚠️ Previsão de saldo negativo! Reduza gastos.")
-            elif previsao_saldo < media_entrada_mensal * 0.1:
-                recomendacoes.append("💡 Saldo baixo previsto. Considere economizar mais.")
-            else:
-                recomendacoes.append("✅ Situação financeira estável prevista.")
-            
-            return {
-                "previsao_entrada_mensal": media_entrada_mensal,
-                "previsao_saida_mensal": media_saida_mensal,
-                "previsao_saldo": previsao_saldo,
-                "baseado_em_dias": 90,
-                "recomendacoes": recomendacoes
-            }
-        finally:
-            db.close()
+        return await executar_db(self._predict_budget, user_id)
+    
+    def _predict_budget(self, db: Session, user_id: int) -> Dict:
+        # Últimos 90 dias para análise
+        start_date = datetime.now() - timedelta(days=90)
+        
+        transactions = db.query(Transacao).filter(
+            Transacao.tenant_id == user_id,
+            Transacao.data >= start_date
+        ).all()
+        
+        if not transactions:
+            return {"erro": "Não há dados suficientes para previsão"}
+        
+        # Calcular médias
+        entradas = [t for t in transactions if t.tipo == "ENTRADA"]
+        saidas = [t for t in transactions if t.tipo == "SAIDA"]
+        
+        media_entrada_mensal = sum(float(t.valor) for t in entradas) / 3
+        media_saida_mensal = sum(float(t.valor) for t in saidas) / 3
+        
+        # Previsão próximo mês
+        previsao_saldo = media_entrada_mensal - media_saida_mensal
+        
+        # Recomendações
+        recomendacoes = []
+        if previsao_saldo < 0:
+            recomendacoes.append("⚠️ Previsão de saldo negativo! Reduza gastos.")
+        elif previsao_saldo < media_entrada_mensal * 0.1:
+            recomendacoes.append("💡 Saldo baixo previsto. Considere economizar mais.")
+        else:
+            recomendacoes.append("✅ Situação financeira estável prevista.")
+        
+        return {
+            "previsao_entrada_mensal": media_entrada_mensal,
+            "previsao_saida_mensal": media_saida_mensal,
+            "previsao_saldo": previsao_saldo,
+            "baseado_em_dias": 90,
+            "recomendacoes": recomendacoes
+        }
 
     def _find_or_create_smart_category(self, db: Session, user_id: int, descricao: str, categoria_sugerida: str = None) -> int:
         """Encontra categoria inteligente ou cria nova baseada na descrição"""
@@ -453,6 +474,7 @@ class FinancialMCPServer:
         db.add(nova_categoria)
         db.commit()
         db.refresh(nova_categoria)
+        EntidadesCache.invalidar(user_id)
         
         return nova_categoria.id
     
@@ -12,6 +12,7 @@ from ..models.user import User
 from ..models.financial import Transacao, Conta, Cartao, Categoria
 from ..services.telegram_service import TelegramService
 from ..services.smart_mcp_service import SmartMCPService
+from ..services.rollup_service import RollupService
 
 logger = logging.getLogger(__name__)
 
@@ -246,20 +247,15 @@ class NotificationService:
     async def _get_transactions_info(self, db: Session, tenant_id: int, start_date: datetime, end_date: datetime) -> str:
         """Obter informações de transações do período"""
         try:
-            transacoes = db.query(Transacao).filter(
-                and_(
-                    Transacao.tenant_id == tenant_id,
-                    Transacao.data >= start_date,
-                    Transacao.data <= end_date
-                )
-            ).order_by(Transacao.data.desc()).limit(10).all()
+            # Totais do período inteiro (meses completos vêm do rollup mensal)
+            totais = RollupService.totais_periodo(db, tenant_id, start_date, end_date)
+            total_transacoes = sum(item["quantidade"] for item in totais.values())
             
-            if not transacoes:
+            if total_transacoes == 0:
                 return "Nenhuma transação no período"
             
-            # Calcular totais
-            entradas = sum(t.valor for t in transacoes if t.tipo == 'ENTRADA')
-            saidas = sum(t.valor for t in transacoes if t.tipo == 'SAIDA')
+            entradas = totais["ENTRADA"]["total"]
+            saidas = totais["SAIDA"]["total"]
             
             info_parts = [
                 f"📈 Entradas: R$ {entradas:,.2f}",
@@ -268,14 +264,22 @@ class NotificationService:
                 ""
             ]
             
-            if len(transacoes) <= 5:
+            if total_transacoes <= 5:
+                transacoes = db.query(Transacao).filter(
+                    and_(
+                        Transacao.tenant_id == tenant_id,
+                        Transacao.data >= start_date,
+                        Transacao.data <= end_date
+                    )
+                ).order_by(Transacao.data.desc()).limit(5).all()
+                
                 info_parts.append("📋 Últimas transações:")
-                for transacao in transacoes[:5]:
+                for transacao in transacoes:
                     emoji = "📈" if transacao.tipo == 'ENTRADA' else "📉"
                     data_str = transacao.data.strftime('%d/%m')
                     info_parts.append(f"  {emoji} {data_str} - {transacao.descricao}: R$ {transacao.valor:,.2f}")
             else:
-                info_parts.append(f"📋 Total de {len(transacoes)} transações no período")
+                info_parts.append(f"📋 Total de {total_transacoes} transações no período")
             
             return "\n".join(info_parts)
             
@@ -0,0 +1,375 @@
+"""
+Parser determinístico compartilhado pelos chats (ChatAIService / SmartMCPService)
+
+Tudo é montado uma vez, na importação:
+- Regex de valor, parcelamento e limpeza de descrição já compiladas
+- Dicionários de palavras-chave (verbos de entrada/saída, intenções, categorias, descrições
+  conhecidas) em autômatos Aho-Corasick: uma única passada no texto encontra todas as
+  palavras, em vez de um `palavra in texto` por item de cada lista
+- Nomes de cartões/contas do tenant viram um autômato memorizado pela tupla de nomes
+  (muda sozinho quando o cache de entidades traz nomes novos)
+
+A prioridade de um autômato é a ordem de inserção: quando várias palavras aparecem, vence a
+que vinha primeiro na lista original, igual aos loops que ele substitui.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class AutomatoPalavras:
+    """Aho-Corasick sobre substrings (sem fronteira de palavra, como o `in` que substitui)"""
+
+    def __init__(self, palavras: Iterable[Tuple[str, Any]]):
+        self._transicoes: List[Dict[str, int]] = [{}]
+        self._falha: List[int] = [0]
+        self._saidas: List[List[Tuple[int, Any]]] = [[]]
+
+        for ordem, (palavra, rotulo) in enumerate(palavras):
+            if not palavra:
+                continue
+            estado = 0
+            for caractere in palavra:
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes[estado][caractere] = proximo
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saidas.append([])
+                estado = proximo
+            self._saidas[estado].append((ordem, rotulo))
+
+        # Links de falha em largura; cada estado herda as saídas do seu sufixo
+        fila = list(self._transicoes[0].values())
+        for estado in fila:
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falha[proximo] = destino if destino != proximo else 0
+                self._saidas[proximo] = self._saidas[proximo] + self._saidas[self._falha[proximo]]
+
+    def encontrar(self, texto: str) -> List[Tuple[int, Any]]:
+        """(ordem de inserção, rótulo) de cada palavra encontrada no texto"""
+        encontrados = []
+        estado = 0
+        transicoes, falha, saidas = self._transicoes, self._falha, self._saidas
+        for caractere in texto:
+            while estado and caractere not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            if saidas[estado]:
+                encontrados.extend(saidas[estado])
+        return encontrados
+
+    def primeiro(self, texto: str) -> Optional[Any]:
+        """Rótulo da palavra encontrada que vem primeiro na ordem de inserção"""
+        encontrados = self.encontrar(texto)
+        return min(encontrados, key=lambda item: item[0])[1] if encontrados else None
+
+    def rotulos(self, texto: str) -> Set[Any]:
+        return {rotulo for _, rotulo in self.encontrar(texto)}
+
+    def contem(self, texto: str) -> bool:
+        return bool(self.encontrar(texto))
+
+
+def _automato(grupos: Dict[Any, List[str]]) -> AutomatoPalavras:
+    """Autômato com o rótulo de cada grupo, na ordem dos grupos e das palavras"""
+    return AutomatoPalavras((palavra, rotulo) for rotulo, palavras in grupos.items() for palavra in palavras)
+
+
+# ---------------------------------------------------------------- Valores e parcelamentos
+
+_NUMERO = r'\d+(?:,\d+)?(?:\.\d+)?'
+
+# Ordem de preferência para o primeiro valor da mensagem
+PADROES_VALOR = [re.compile(padrao) for padrao in (
+    rf'({_NUMERO})\s*(?:reais?|r\$|real)',   # "50 reais", "100,50 real"
+    rf'r\$\s*({_NUMERO})',                   # "R$ 50", "R$ 100,50"
+    rf'({_NUMERO})\s*(?:conto|pila|mangos?)',  # "50 contos"
+    rf'({_NUMERO})'                          # qualquer número
+)]
+
+# Todos os candidatos a valor (o maior é o valor principal)
+PADROES_VALOR_CANDIDATOS = PADROES_VALOR[:3] + [
+    re.compile(r'(\d{1,3}(?:\.\d{3})*(?:,\d{2})?)$'),  # "230,26", "1.051,37" no final
+    PADROES_VALOR[3]
+]
+
+PADROES_PARCELAMENTO = [re.compile(padrao) for padrao in (
+    rf'(\d+)x\s*(?:de)?\s*({_NUMERO})',                                    # "12x de 100"
+    rf'(?:em|de)\s*(\d+)\s*(?:parcelas?|vezes?)\s*(?:de)?\s*({_NUMERO})',  # "em 6 parcelas de 200"
+    rf'parcel(?:ei|ar|ado)\s*em\s*(\d+)(?:x)?\s*(?:de)?\s*({_NUMERO})',    # "parcelei em 3x de 50"
+    rf'(\d+)\s*(?:parcelas?|vezes?)\s*(?:de)?\s*({_NUMERO})',              # "3 parcelas de 100"
+    rf'dividi(?:r|do)?\s*em\s*(\d+)\s*(?:de)?\s*({_NUMERO})'               # "dividi em 4 de 250"
+)]
+
+RE_REMOVER_VALOR = re.compile(rf'{_NUMERO}\s*(?:reais?|r\$|real|conto|pila|mangos?)?')
+RE_REMOVER_REAIS = re.compile(rf'r\$\s*{_NUMERO}')
+RE_REMOVER_PARCELAMENTO = [re.compile(padrao) for padrao in (
+    rf'\d+x\s*(?:de)?\s*{_NUMERO}',
+    rf'(?:em|de)\s*\d+\s*(?:parcelas?|vezes?)\s*(?:de)?\s*{_NUMERO}',
+    rf'parcel(?:ei|ar|ado)\s*em\s*\d+(?:x)?\s*(?:de)?\s*{_NUMERO}'
+)]
+RE_REMOVER_PARCELAS = [RE_REMOVER_PARCELAMENTO[0], re.compile(r'(?:em|de)\s*\d+\s*(?:parcelas?|vezes?)'), re.compile(r'parcel(?:ei|ar|ado)')]
+RE_CARACTERES_ESPECIAIS = re.compile(r'[!@#$%^&*()_+=\[\]{}|;\':"\\,.<>?/~`]')
+RE_NAO_PALAVRA = re.compile(r'[^\w\sáàâãéèêíìîóòôõúùûüç]', re.IGNORECASE)
+RE_FINAL_CARTAO = re.compile(r'\d{4}')
+
+# Menções a cartão/conta ("no Nubank", "na conta Inter"); o grupo é o nome citado
+PADROES_CARTAO = [re.compile(padrao) for padrao in (
+    r'\bno\s+(\w+)',      # "no Nubank", "no Inter"
+    r'\bcartão\s+(\w+)',  # "cartão Nubank"
+    r'\bcartao\s+(\w+)',  # "cartao Inter"
+    r'\bcard\s+(\w+)',    # "card Nubank"
+    r'\bcom\s+(\w+)'      # "com Nubank"
+)]
+PADROES_CONTA = [re.compile(padrao) for padrao in (
+    r'\bna\s+conta\s+(\w+)',  # "na conta Bradesco"
+    r'\bconta\s+(\w+)',        # "conta Inter"
+    r'\bbanco\s+(\w+)',        # "banco Bradesco"
+    r'\bpix\s+(\w+)'           # "pix Nubank"
+)]
+RE_NUMERO_ISOLADO = re.compile(r'\b(\d+)\b')
+
+ARTIGOS_PREPOSICOES = ('o', 'a', 'os', 'as', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'em', 'na', 'no', 'nas', 'nos', 'com', 'para', 'por')
+
+
+def primeiro_valor(texto: str) -> Optional[float]:
+    """Primeiro valor pela ordem de preferência dos padrões ("30 reais" antes de um número solto)"""
+    for padrao in PADROES_VALOR:
+        match = padrao.search(texto)
+        if match:
+            try:
+                return float(match.group(1).replace(',', '.'))
+            except ValueError:
+                continue
+    return None
+
+
+def maior_valor(texto: str) -> Optional[float]:
+    """Maior valor entre todos os candidatos, lendo o formato brasileiro ("1.051,37" -> 1051.37)"""
+    valores = []
+    for padrao in PADROES_VALOR_CANDIDATOS:
+        for match in padrao.findall(texto):
+            try:
+                valor = float(match.replace('.', '').replace(',', '.'))
+            except ValueError:
+                continue
+            if valor > 0:
+                valores.append(valor)
+    return max(valores) if valores else None
+
+
+def parcelamento(texto: str, minimo_parcelas: int = 1, maximo_parcelas: Optional[int] = None) -> Optional[Tuple[int, float]]:
+    """(total de parcelas, valor da parcela) do primeiro padrão de parcelamento válido encontrado"""
+    for padrao in PADROES_PARCELAMENTO:
+        match = padrao.search(texto)
+        if not match:
+            continue
+        try:
+            total_parcelas, valor_parcela = int(match.group(1)), float(match.group(2).replace(',', '.'))
+        except (ValueError, IndexError):
+            continue
+        if total_parcelas >= minimo_parcelas and (maximo_parcelas is None or total_parcelas <= maximo_parcelas) and valor_parcela > 0:
+            return total_parcelas, valor_parcela
+    return None
+
+
+def remover_padroes(texto: str, padroes: List["re.Pattern"]) -> str:
+    """Aplica cada padrão removendo o que casar, em ordem"""
+    for padrao in padroes:
+        texto = padrao.sub('', texto)
+    return texto
+
+
+@lru_cache(maxsize=64)
+def _padrao_palavras(palavras: Tuple[str, ...], ignorar_caixa: bool) -> "re.Pattern":
+    alternativas = '|'.join(re.escape(palavra) for palavra in sorted(palavras, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternativas})\b', re.IGNORECASE if ignorar_caixa else 0)
+
+
+def remover_palavras(texto: str, palavras: Tuple[str, ...], ignorar_caixa: bool = False) -> str:
+    """Remove as palavras inteiras da lista em uma única substituição"""
+    return _padrao_palavras(palavras, ignorar_caixa).sub('', texto)
+
+
+# ---------------------------------------------------------------- Dicionários de palavras-chave
+
+PALAVRAS_ENTRADA = ['recebi', 'ganhei', 'entrou', 'salario', 'salário', 'renda', 'freelance', 'freela']
+PALAVRAS_SAIDA = ['gastei', 'gaste', 'paguei', 'pague', 'comprei', 'compre', 'saiu', 'despesa', 'gasto']
+PALAVRAS_ACAO = ('gastei', 'gaste', 'paguei', 'pague', 'comprei', 'compre', 'recebi', 'ganhei', 'saiu', 'entrou', 'de', 'no', 'na', 'com', 'para', 'em')
+PALAVRAS_PARCELAMENTO_REMOVER = ('comprei', 'comprar', 'parcelei', 'parcelar', 'dividi', 'dividir', 'gastei', 'paguei', 'de', 'no', 'na', 'com', 'para', 'em', 'um', 'uma', 'o', 'a')
+PALAVRAS_PARCELAMENTO = ['parcel', 'divid', 'parcela', 'vezes', 'prestação', 'prestacao']
+
+# Entrada tem prioridade: "recebi o que gastei" é ENTRADA
+TIPOS_TRANSACAO = _automato({"ENTRADA": PALAVRAS_ENTRADA, "SAIDA": PALAVRAS_SAIDA})
+
+INDICIOS_PARCELAMENTO = _automato({True: PALAVRAS_PARCELAMENTO})
+
+# Intenções do SmartMCPService, em ordem de prioridade
+INTENCOES = _automato({
+    'correcao_transacao': ["corrig", "edit", "alter", "mude", "mudança", "fix"],
+    'consulta_transacoes': ["transaç", "gasto", "despesa", "compra", "últim"],
+    'consulta_saldo': ["saldo", "quanto tenho", "dinheiro", "sobrou"],
+    'consulta_resumo': ["resumo", "relatório", "mês", "mensal", "semana", "semanal", "diário", "diario", "hoje", "ontem", "quanto gastei"],
+    'analise_gastos': ["análise", "analise", "analisa"],
+    'previsao_orcamento': ["previsão", "previsao", "prever", "orçamento"]
+})
+
+# Descrições conhecidas (a primeira chave encontrada vira a descrição)
+DESCRICOES_CONHECIDAS = {
+    'ifood': 'iFood', 'uber': 'Uber', 'mercado': 'Mercado',
+    'supermercado': 'Supermercado', 'farmacia': 'Farmácia',
+    'gasolina': 'Gasolina', 'salario': 'Salário', 'freela': 'Freelance',
+    'freelance': 'Freelance', 'lanchonete': 'Lanchonete',
+    'almoço': 'Almoço', 'almoco': 'Almoço', 'jantar': 'Jantar', 'lanche': 'Lanche'
+}
+DESCRICOES_PESSOAIS = {
+    'dízimo': 'Dízimo', 'dizimo': 'Dízimo', 'vó': 'Presente da Vó', 'avo': 'Presente da Avó',
+    'minha vó': 'Presente da Vó', 'minha avo': 'Presente da Avó'
+}
+DESCRICOES = AutomatoPalavras(DESCRICOES_CONHECIDAS.items())
+DESCRICOES_COMPLETO = AutomatoPalavras({**DESCRICOES_CONHECIDAS, **DESCRICOES_PESSOAIS}.items())
+
+# Categorias padrão criadas automaticamente
+CATEGORIAS_PADRAO = _automato({
+    'Alimentação': [
+        'café', 'coffee', 'restaurante', 'comida', 'lanche', 'almoço', 'almoco', 'jantar',
+        'padaria', 'ifood', 'delivery', 'pizza', 'hamburger', 'hamburguer', 'açougue',
+        'mercado', 'supermercado', 'hortifruti', 'verdura', 'fruta', 'bebida', 'cerveja'
+    ],
+    'Transporte': [
+        'uber', 'taxi', '99', 'gasolina', 'combustível', 'combustivel', 'ônibus', 'onibus',
+        'metro', 'metrô', 'passagem', 'viagem', 'estacionamento', 'carro', 'moto'
+    ],
+    'Casa': [
+        'tapetinho', 'tapete', 'decoração', 'decoracao', 'móvel', 'movel', 'limpeza',
+        'cozinha', 'banheiro', 'casa', 'eletrodoméstico', 'eletrodomestico', 'luz',
+        'água', 'agua', 'gás', 'gas', 'condomínio', 'condominio'
+    ],
+    'Pet': [
+        'cachorro', 'gato', 'ração', 'racao', 'petisco', 'brinquedo pet', 'veterinário',
+        'veterinario', 'tapetinho cachorro', 'coleira', 'casinha'
+    ],
+    'Vestuário': [
+        'roupa', 'camisa', 'calça', 'calca', 'vestido', 'sapato', 'tênis', 'tenis',
+        'shorts', 'blusa', 'casaco', 'jaqueta', 'meia', 'cueca', 'calcinha'
+    ],
+    'Lazer': [
+        'cinema', 'teatro', 'show', 'festa', 'bar', 'balada', 'game', 'jogo',
+        'streaming', 'netflix', 'spotify', 'youtube', 'diversão', 'diversao'
+    ],
+    'Saúde': [
+        'farmácia', 'farmacia', 'medicamento', 'remédio', 'remedio', 'médico', 'medico',
+        'consulta', 'exame', 'hospital', 'dentista', 'psicólogo', 'psicologo'
+    ],
+    'Educação': [
+        'curso', 'livro', 'escola', 'faculdade', 'universidade', 'material',
+        'caneta', 'caderno', 'educação', 'educacao', 'aula'
+    ],
+    'Tecnologia': [
+        'celular', 'smartphone', 'iphone', 'android', 'computador', 'notebook',
+        'tablet', 'fone', 'carregador', 'cabo', 'mouse', 'teclado'
+    ]
+})
+
+# Palavras que ligam uma descrição a uma categoria já existente do usuário (pelo nome da categoria)
+_ALIMENTACAO = ['café', 'coffee', 'restaurante', 'comida', 'lanche', 'mercado', 'supermercado', 'ifood', 'delivery', 'pizza', 'hamburger', 'açougue', 'padaria', 'hortifruti']
+_PET = ['cachorro', 'gato', 'ração', 'racao', 'petisco', 'brinquedo pet', 'veterinário', 'veterinario', 'tapetinho']
+_VESTUARIO = ['camisa', 'calça', 'calca', 'vestido', 'sapato', 'tênis', 'tenis', 'shorts', 'blusa']
+_LAZER = ['cinema', 'bar', 'festa', 'show', 'game', 'jogo', 'netflix', 'spotify']
+_SAUDE = ['farmácia', 'farmacia', 'remédio', 'remedio', 'médico', 'medico', 'consulta', 'exame']
+CATEGORIAS_EXISTENTES = _automato({
+    'alimentação': _ALIMENTACAO, 'alimentacao': _ALIMENTACAO, 'comida': _ALIMENTACAO,
+    'casa': ['tapetinho', 'tapete', 'decoração', 'decoracao', 'móvel', 'movel', 'limpeza', 'cozinha', 'banheiro'],
+    'pet': _PET, 'animals': _PET,
+    'transporte': ['uber', 'taxi', '99', 'gasolina', 'combustível', 'combustivel', 'ônibus', 'onibus', 'metro', 'metrô'],
+    'roupa': _VESTUARIO, 'vestuário': _VESTUARIO, 'vestuario': _VESTUARIO,
+    'lazer': _LAZER, 'entretenimento': _LAZER,
+    'saúde': _SAUDE, 'saude': _SAUDE
+})
+
+BANDEIRAS = _automato({
+    'visa': ['visa'],
+    'mastercard': ['master', 'mastercard'],
+    'elo': ['elo'],
+    'amex': ['amex', 'american', 'express'],
+    'nubank': ['nubank', 'roxinho'],
+    'itau': ['itau', 'itaú'],
+    'bradesco': ['bradesco'],
+    'santander': ['santander'],
+    'bb': ['banco do brasil', 'bb'],
+    'caixa': ['caixa']
+})
+
+BANCOS = _automato({
+    'nubank': ['nubank', 'nu'],
+    'itau': ['itau', 'itaú'],
+    'bradesco': ['bradesco'],
+    'santander': ['santander'],
+    'bb': ['banco do brasil', 'bb'],
+    'caixa': ['caixa'],
+    'inter': ['inter'],
+    'original': ['original'],
+    'c6': ['c6', 'c6 bank'],
+    'next': ['next'],
+    'picpay': ['picpay', 'pic pay']
+})
+
+
+def tipo_transacao(texto: str) -> Optional[str]:
+    """ENTRADA / SAIDA pelos verbos da mensagem (entrada tem prioridade)"""
+    tipos = TIPOS_TRANSACAO.rotulos(texto)
+    if "ENTRADA" in tipos:
+        return "ENTRADA"
+    return "SAIDA" if "SAIDA" in tipos else None
+
+
+# ---------------------------------------------------------------- Nomes do tenant
+
+@lru_cache(maxsize=2048)
+def automato_nomes(nomes: Tuple[str, ...], nome_completo: bool = True, palavra_minima: Optional[int] = None) -> AutomatoPalavras:
+    """
+    Autômato dos nomes de cartões/contas de um tenant; o rótulo é o índice do nome em `nomes`
+    nome_completo: casa o nome inteiro; palavra_minima: casa também cada palavra do nome com esse tamanho mínimo
+    """
+    padroes = []
+    for indice, nome in enumerate(nomes):
+        nome = nome.lower()
+        if nome_completo:
+            padroes.append((nome, indice))
+        if palavra_minima:
+            padroes.extend((palavra, indice) for palavra in nome.split() if len(palavra) >= palavra_minima)
+    return AutomatoPalavras(padroes)
+
+
+def indice_por_nome(nomes: Tuple[str, ...], texto: str, nome_completo: bool = True, palavra_minima: Optional[int] = None) -> Optional[int]:
+    """Índice do primeiro nome (na ordem de `nomes`) mencionado no texto"""
+    if not nomes:
+        return None
+    return automato_nomes(nomes, nome_completo, palavra_minima).primeiro(texto)
+
+
+def nome_mais_longo(nomes: Tuple[str, ...], texto: str) -> Optional[int]:
+    """Índice do nome mais longo mencionado por inteiro no texto (empate: o primeiro)"""
+    if not nomes:
+        return None
+    indices = automato_nomes(nomes).rotulos(texto)
+    return max(indices, key=lambda indice: (len(nomes[indice]), -indice)) if indices else None
+
+
+def indice_por_marca(nomes: Tuple[str, ...], texto: str, marcas: AutomatoPalavras) -> Optional[int]:
+    """Índice do primeiro nome que contém uma marca (bandeira/banco) também citada no texto"""
+    citadas = marcas.rotulos(texto)
+    if not citadas:
+        return None
+    for indice, nome in enumerate(nomes):
+        if marcas.rotulos(nome.lower()) & citadas:
+            return indice
+    return None
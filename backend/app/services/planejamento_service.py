@@ -12,6 +12,7 @@ from ..schemas.financial import (
     PlanejamentoMensalCreate, PlanejamentoMensalUpdate,
     PlanoCategoriaCreate, PlanoCategoriaUpdate
 )
+from .rollup_service import RollupService
 
 class PlanejamentoService:
     
@@ -19,20 +20,34 @@ class PlanejamentoService:
     def calcular_valores_gasto_real(db: Session, planejamento: PlanejamentoMensal) -> None:
         """Atualiza os valores gastos reais baseado nas transações do mês"""
         
-        # Calcular gastos por categoria no período do planejamento
-        for plano_categoria in planejamento.planos_categoria:
-            # Buscar transações de saída da categoria no mês/ano do planejamento
-            valor_gasto = db.query(func.sum(Transacao.valor)).filter(
+        # Calcular gastos de todas as categorias do mês/ano do planejamento em uma única consulta
+        if RollupService.disponivel(db, planejamento.tenant_id):
+            gastos = {
+                linha.categoria_id: linha.total
+                for linha in RollupService.totais_por_categoria(
+                    db, planejamento.tenant_id, planejamento.ano, planejamento.mes, TipoTransacao.SAIDA
+                )
+            }
+        else:
+            # Intervalo de datas (e não extract) para usar idx_transacoes_tenant_categoria_data
+            inicio_mes = datetime(planejamento.ano, planejamento.mes, 1)
+            inicio_proximo_mes = datetime(planejamento.ano + planejamento.mes // 12, planejamento.mes % 12 + 1, 1)
+            categoria_ids = [p.categoria_id for p in planejamento.planos_categoria]
+            gastos = dict(db.query(
+                Transacao.categoria_id,
+                func.sum(Transacao.valor)
+            ).filter(
                 and_(
-                    Transacao.categoria_id == plano_categoria.categoria_id,
-                    Transacao.tipo == TipoTransacao.SAIDA,
                     Transacao.tenant_id == planejamento.tenant_id,
-                    extract('month', Transacao.data) == planejamento.mes,
-                    extract('year', Transacao.data) == planejamento.ano
+                    Transacao.categoria_id.in_(categoria_ids),
+                    Transacao.data >= inicio_mes,
+                    Transacao.data < inicio_proximo_mes,
+                    Transacao.tipo == TipoTransacao.SAIDA
                 )
-            ).scalar() or 0.0
-            
-            plano_categoria.valor_gasto = valor_gasto
+            ).group_by(Transacao.categoria_id).all()) if categoria_ids else {}
+        
+        for plano_categoria in planejamento.planos_categoria:
+            plano_categoria.valor_gasto = gastos.get(plano_categoria.categoria_id) or 0.0
         
         # Calcular totais do planejamento
         planejamento.total_planejado = sum(p.valor_planejado for p in planejamento.planos_categoria)
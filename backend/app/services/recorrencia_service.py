@@ -0,0 +1,128 @@
+"""
+Motor de recorrência das transações recorrentes
+
+A k-ésima ocorrência é calculada direto a partir da data_inicio (sem avançar período
+a período), então uma recorrência DIARIA criada há anos custa o mesmo que uma nova.
+- Frequências em dias (DIARIA, SEMANAL, QUINZENAL): data_inicio + k * passo
+- Frequências em meses (MENSAL ... ANUAL): mês de data_inicio + k * passo, mantendo o dia
+  da data_inicio e limitando ao último dia do mês (31/01 -> 28/02 -> 31/03)
+"""
+
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+# frequência -> (unidade, passo)
+PASSOS = {
+    "DIARIA": ("dias", 1),
+    "SEMANAL": ("dias", 7),
+    "QUINZENAL": ("dias", 14),
+    "MENSAL": ("meses", 1),
+    "BIMESTRAL": ("meses", 2),
+    "TRIMESTRAL": ("meses", 3),
+    "SEMESTRAL": ("meses", 6),
+    "ANUAL": ("meses", 12),
+}
+
+# Frequência desconhecida: mesmo fallback do cálculo antigo (a cada 30 dias)
+PASSO_PADRAO = ("dias", 30)
+
+
+class RecorrenciaService:
+
+    @staticmethod
+    def _passo(frequencia) -> tuple:
+        return PASSOS.get(getattr(frequencia, "value", frequencia), PASSO_PADRAO)
+
+    @staticmethod
+    def ocorrencia(data_inicio: date, frequencia, k: int) -> date:
+        """k-ésima ocorrência (k = 0 é a própria data_inicio)"""
+        unidade, passo = RecorrenciaService._passo(frequencia)
+        if unidade == "dias":
+            return data_inicio + timedelta(days=k * passo)
+
+        ano, mes = divmod(data_inicio.year * 12 + data_inicio.month - 1 + k * passo, 12)
+        mes += 1
+        return date(ano, mes, min(data_inicio.day, monthrange(ano, mes)[1]))
+
+    @staticmethod
+    def indice(data_inicio: date, frequencia, data: date) -> int:
+        """Índice da primeira ocorrência em ou após `data`"""
+        if data <= data_inicio:
+            return 0
+
+        unidade, passo = RecorrenciaService._passo(frequencia)
+        if unidade == "dias":
+            return -(-(data - data_inicio).days // passo)
+
+        meses = (data.year - data_inicio.year) * 12 + data.month - data_inicio.month
+        k = -(-meses // passo)
+        if RecorrenciaService.ocorrencia(data_inicio, frequencia, k) < data:
+            k += 1
+        return k
+
+    @staticmethod
+    def proxima_ocorrencia(
+        data_inicio: date,
+        frequencia,
+        a_partir_de: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Optional[date]:
+        """
+        Primeira ocorrência em ou após `a_partir_de` (padrão: hoje)
+        Retorna None se ela cair depois de data_fim
+        """
+        a_partir_de = a_partir_de or date.today()
+        proxima = RecorrenciaService.ocorrencia(
+            data_inicio, frequencia, RecorrenciaService.indice(data_inicio, frequencia, a_partir_de)
+        )
+        if data_fim and proxima > data_fim:
+            return None
+        return proxima
+
+    @staticmethod
+    def ocorrencias(
+        data_inicio: date,
+        frequencia,
+        inicio: date,
+        fim: date,
+        data_fim: Optional[date] = None
+    ) -> Iterator[date]:
+        """Gera (sob demanda) as ocorrências dentro de [inicio, fim], respeitando data_fim"""
+        limite = min(fim, data_fim) if data_fim else fim
+        k = RecorrenciaService.indice(data_inicio, frequencia, inicio)
+        while True:
+            data_ocorrencia = RecorrenciaService.ocorrencia(data_inicio, frequencia, k)
+            if data_ocorrencia > limite:
+                return
+            yield data_ocorrencia
+            k += 1
+
+    @staticmethod
+    def contar_ocorrencias(
+        data_inicio: date,
+        frequencia,
+        inicio: date,
+        fim: date,
+        data_fim: Optional[date] = None
+    ) -> int:
+        """Quantidade de ocorrências em [inicio, fim] sem gerar as datas"""
+        limite = min(fim, data_fim) if data_fim else fim
+        if limite < inicio:
+            return 0
+        return max(
+            RecorrenciaService.indice(data_inicio, frequencia, limite + timedelta(days=1)) -
+            RecorrenciaService.indice(data_inicio, frequencia, inicio),
+            0
+        )
+
+    @staticmethod
+    def recalcular_proxima(transacao, a_partir_de: Optional[date] = None) -> Optional[date]:
+        """
+        Atualiza transacao.proxima_ocorrencia (usada pelo agendador para achar as que vencem no dia)
+        Chamar ao criar/editar uma TransacaoRecorrente; não faz commit
+        """
+        transacao.proxima_ocorrencia = RecorrenciaService.proxima_ocorrencia(
+            transacao.data_inicio, transacao.frequencia, a_partir_de, transacao.data_fim
+        )
+        return transacao.proxima_ocorrencia
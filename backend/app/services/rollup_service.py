@@ -0,0 +1,219 @@
+"""
+Serviço do rollup mensal de transações
+
+Reconstrução (backfill) do rollup por tenant e consultas de leitura que custam
+O(meses) em vez de O(transações). As leituras só usam o rollup quando o tenant
+já foi reconstruído; caso contrário os chamadores seguem consultando `transacoes`.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_, cast, extract, Integer, insert, select
+from datetime import datetime, date, timedelta
+from dateutil.relativedelta import relativedelta
+from typing import Dict, Any, List, Optional
+
+from ..models.financial import Transacao, TipoTransacao
+from ..models.rollup import TransacaoRollupMensal, RollupMensalTenant, SEM_VINCULO
+
+
+class RollupService:
+
+    @staticmethod
+    def disponivel(db: Session, tenant_id: int) -> bool:
+        """Indica se o rollup do tenant já foi reconstruído"""
+        return db.query(RollupMensalTenant.tenant_id).filter(
+            RollupMensalTenant.tenant_id == tenant_id
+        ).first() is not None
+
+    @staticmethod
+    def reconstruir_tenant(db: Session, tenant_id: int) -> int:
+        """
+        Reconstrói todo o rollup do tenant a partir de `transacoes` com um único INSERT ... SELECT
+        Não faz commit - deixar para quem chama a função
+        """
+        db.flush()
+
+        db.query(TransacaoRollupMensal).filter(
+            TransacaoRollupMensal.tenant_id == tenant_id
+        ).delete(synchronize_session=False)
+
+        ano = cast(extract('year', Transacao.data), Integer)
+        mes = cast(extract('month', Transacao.data), Integer)
+        conta_id = func.coalesce(Transacao.conta_id, SEM_VINCULO)
+        cartao_id = func.coalesce(Transacao.cartao_id, SEM_VINCULO)
+
+        agregados = select(
+            Transacao.tenant_id,
+            ano,
+            mes,
+            Transacao.categoria_id,
+            conta_id,
+            cartao_id,
+            Transacao.tipo,
+            func.coalesce(func.sum(Transacao.valor), 0.0),
+            func.count(Transacao.id),
+            func.now()
+        ).where(
+            Transacao.tenant_id == tenant_id
+        ).group_by(
+            Transacao.tenant_id, ano, mes, Transacao.categoria_id, conta_id, cartao_id, Transacao.tipo
+        )
+
+        resultado = db.execute(
+            insert(TransacaoRollupMensal).from_select(
+                ["tenant_id", "ano", "mes", "categoria_id", "conta_id", "cartao_id", "tipo",
+                 "total", "quantidade", "atualizado_em"],
+                agregados
+            )
+        )
+
+        db.merge(RollupMensalTenant(tenant_id=tenant_id, reconstruido_em=datetime.utcnow()))
+        db.flush()
+        return resultado.rowcount or 0
+
+    @staticmethod
+    def reconstruir_todos(db: Session, tenant_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        """
+        Reconstrói o rollup de vários tenants, com commit por tenant
+        Sem `tenant_ids`, inclui todos os tenants com transações ou com rollup já reconstruído
+        """
+        if tenant_ids is None:
+            tenant_ids = sorted(
+                {linha[0] for linha in db.query(Transacao.tenant_id).distinct().all()} |
+                {linha[0] for linha in db.query(RollupMensalTenant.tenant_id).all()}
+            )
+
+        resultado = {}
+        for tenant_id in tenant_ids:
+            resultado[tenant_id] = RollupService.reconstruir_tenant(db, tenant_id)
+            db.commit()
+        return resultado
+
+    @staticmethod
+    def remover_tenant(db: Session, tenant_id: int) -> None:
+        """Remove rollup e marcador do tenant (ex: exclusão de todos os dados do tenant)"""
+        db.query(TransacaoRollupMensal).filter(
+            TransacaoRollupMensal.tenant_id == tenant_id
+        ).delete(synchronize_session=False)
+        db.query(RollupMensalTenant).filter(
+            RollupMensalTenant.tenant_id == tenant_id
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def _a_partir_de(ano: int, mes: int):
+        return or_(
+            TransacaoRollupMensal.ano > ano,
+            and_(TransacaoRollupMensal.ano == ano, TransacaoRollupMensal.mes >= mes)
+        )
+
+    @staticmethod
+    def _antes_de(ano: int, mes: int):
+        return or_(
+            TransacaoRollupMensal.ano < ano,
+            and_(TransacaoRollupMensal.ano == ano, TransacaoRollupMensal.mes < mes)
+        )
+
+    @staticmethod
+    def _tipo_str(tipo) -> str:
+        return tipo.value if isinstance(tipo, TipoTransacao) else str(tipo)
+
+    @staticmethod
+    def totais_por_mes(db: Session, tenant_id: int, inicio: date) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Soma e contagem por (mês, tipo) a partir do mês de `inicio`
+        Retorna {("YYYY-MM", "ENTRADA"|"SAIDA"): {"total": x, "quantidade": n}}
+        """
+        linhas = db.query(
+            TransacaoRollupMensal.ano,
+            TransacaoRollupMensal.mes,
+            TransacaoRollupMensal.tipo,
+            func.sum(TransacaoRollupMensal.total).label("total"),
+            func.sum(TransacaoRollupMensal.quantidade).label("quantidade")
+        ).filter(
+            TransacaoRollupMensal.tenant_id == tenant_id,
+            RollupService._a_partir_de(inicio.year, inicio.month)
+        ).group_by(
+            TransacaoRollupMensal.ano, TransacaoRollupMensal.mes, TransacaoRollupMensal.tipo
+        ).all()
+
+        return {
+            (f"{linha.ano:04d}-{linha.mes:02d}", RollupService._tipo_str(linha.tipo)): {
+                "total": float(linha.total or 0),
+                "quantidade": int(linha.quantidade or 0)
+            }
+            for linha in linhas
+        }
+
+    @staticmethod
+    def totais_por_categoria(db: Session, tenant_id: int, ano: int, mes: int, tipo: Optional[TipoTransacao] = None) -> List[Any]:
+        """Linhas (categoria_id, tipo, total, quantidade) do mês, opcionalmente filtradas por tipo"""
+        query = db.query(
+            TransacaoRollupMensal.categoria_id,
+            TransacaoRollupMensal.tipo,
+            func.sum(TransacaoRollupMensal.total).label("total"),
+            func.sum(TransacaoRollupMensal.quantidade).label("quantidade")
+        ).filter(
+            TransacaoRollupMensal.tenant_id == tenant_id,
+            TransacaoRollupMensal.ano == ano,
+            TransacaoRollupMensal.mes == mes
+        )
+        if tipo is not None:
+            query = query.filter(TransacaoRollupMensal.tipo == tipo)
+
+        return query.group_by(
+            TransacaoRollupMensal.categoria_id, TransacaoRollupMensal.tipo
+        ).all()
+
+    @staticmethod
+    def totais_periodo(db: Session, tenant_id: int, inicio: datetime, fim: datetime) -> Dict[str, Dict[str, Any]]:
+        """
+        Soma e contagem por tipo no período [inicio, fim] (fim inclusivo)
+        Os meses completos vêm do rollup; só as pontas parciais consultam `transacoes`
+        """
+        fim_exclusivo = fim + timedelta(microseconds=1)
+        primeiro_mes = datetime(inicio.year, inicio.month, 1)
+        if primeiro_mes < inicio:
+            primeiro_mes += relativedelta(months=1)
+        ultimo_mes = datetime(fim_exclusivo.year, fim_exclusivo.month, 1)
+
+        totais = {tipo.value: {"total": 0.0, "quantidade": 0} for tipo in TipoTransacao}
+
+        def somar_transacoes(de: datetime, ate: datetime):
+            linhas = db.query(
+                Transacao.tipo,
+                func.sum(Transacao.valor).label("total"),
+                func.count(Transacao.id).label("quantidade")
+            ).filter(
+                Transacao.tenant_id == tenant_id,
+                Transacao.data >= de,
+                Transacao.data < ate
+            ).group_by(Transacao.tipo).all()
+            for linha in linhas:
+                item = totais[RollupService._tipo_str(linha.tipo)]
+                item["total"] += float(linha.total or 0)
+                item["quantidade"] += int(linha.quantidade or 0)
+
+        if primeiro_mes >= ultimo_mes or not RollupService.disponivel(db, tenant_id):
+            somar_transacoes(inicio, fim_exclusivo)
+            return totais
+
+        linhas = db.query(
+            TransacaoRollupMensal.tipo,
+            func.sum(TransacaoRollupMensal.total).label("total"),
+            func.sum(TransacaoRollupMensal.quantidade).label("quantidade")
+        ).filter(
+            TransacaoRollupMensal.tenant_id == tenant_id,
+            RollupService._a_partir_de(primeiro_mes.year, primeiro_mes.month),
+            RollupService._antes_de(ultimo_mes.year, ultimo_mes.month)
+        ).group_by(TransacaoRollupMensal.tipo).all()
+        for linha in linhas:
+            item = totais[RollupService._tipo_str(linha.tipo)]
+            item["total"] += float(linha.total or 0)
+            item["quantidade"] += int(linha.quantidade or 0)
+
+        if inicio < primeiro_mes:
+            somar_transacoes(inicio, primeiro_mes)
+        if ultimo_mes < fim_exclusivo:
+            somar_transacoes(ultimo_mes, fim_exclusivo)
+
+        return totais
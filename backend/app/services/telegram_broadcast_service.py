@@ -0,0 +1,100 @@
+"""
+Broadcast do admin pelo Telegram
+
+A requisição só grava o broadcast e enfileira o público no outbox (insert em lote);
+o envio fica com o despachante do outbox, que respeita os limites do Telegram e o
+retry_after. O progresso é contado a partir das linhas do outbox do broadcast.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from ..models.telegram_outbox import TelegramBroadcast, TelegramOutbox
+
+logger = logging.getLogger(__name__)
+
+# Linhas por INSERT ao enfileirar o público
+LOTE_INSERCAO = 1000
+
+
+class TelegramBroadcastService:
+
+    @staticmethod
+    def criar(
+        db: Session,
+        mensagem: str,
+        texto: str,
+        chat_ids: List[str],
+        target_type: str = "all",
+        criado_por: Optional[str] = None,
+        texto_fallback: Optional[str] = None
+    ) -> TelegramBroadcast:
+        """Cria o broadcast e enfileira uma mensagem por chat no outbox (faz commit)"""
+        broadcast = TelegramBroadcast(
+            mensagem=mensagem,
+            target_type=target_type,
+            total_destinatarios=len(chat_ids),
+            status="EM_ANDAMENTO",
+            criado_por=criado_por
+        )
+        db.add(broadcast)
+        db.flush()
+
+        agora = datetime.utcnow()
+        linhas = [
+            {
+                "chat_id": str(chat_id),
+                "texto": texto,
+                "parse_mode": "Markdown",
+                "texto_fallback": texto_fallback,
+                "status": "PENDENTE",
+                "tentativas": 0,
+                "proxima_tentativa_em": agora,
+                "broadcast_id": broadcast.id,
+                "criada_em": agora
+            }
+            for chat_id in dict.fromkeys(chat_ids)
+        ]
+        for inicio in range(0, len(linhas), LOTE_INSERCAO):
+            db.execute(insert(TelegramOutbox), linhas[inicio:inicio + LOTE_INSERCAO])
+
+        broadcast.total_destinatarios = len(linhas)
+        db.commit()
+        logger.info(f"📣 Broadcast {broadcast.id} enfileirado para {len(linhas)} chat(s)")
+        return broadcast
+
+    @staticmethod
+    def progresso(db: Session, broadcast: TelegramBroadcast) -> Dict[str, Any]:
+        """Contagem de enviadas/falhas/pendentes; marca o broadcast como CONCLUIDO quando não resta nada a enviar"""
+        contagem = dict(
+            db.query(TelegramOutbox.status, func.count(TelegramOutbox.id))
+            .filter(TelegramOutbox.broadcast_id == broadcast.id)
+            .group_by(TelegramOutbox.status)
+            .all()
+        )
+        enviadas = contagem.get("ENVIADA", 0)
+        falharam = contagem.get("FALHA", 0)
+        pendentes = contagem.get("PENDENTE", 0) + contagem.get("ENVIANDO", 0)
+
+        if pendentes == 0 and broadcast.status != "CONCLUIDO":
+            broadcast.status = "CONCLUIDO"
+            broadcast.concluido_em = db.query(func.max(TelegramOutbox.enviada_em)).filter(
+                TelegramOutbox.broadcast_id == broadcast.id
+            ).scalar() or datetime.utcnow()
+            db.commit()
+
+        return {
+            "broadcast_id": broadcast.id,
+            "status": broadcast.status,
+            "total_usuarios": broadcast.total_destinatarios,
+            "enviadas": enviadas,
+            "falharam": falharam,
+            "pendentes": pendentes,
+            "criado_por": broadcast.criado_por,
+            "criado_em": broadcast.criado_em.isoformat() if broadcast.criado_em else None,
+            "concluido_em": broadcast.concluido_em.isoformat() if broadcast.concluido_em else None
+        }
@@ -0,0 +1,313 @@
+"""
+Outbox do Telegram
+
+Quem precisa notificar (ex.: confirmações do agendador) só grava uma linha em telegram_outbox
+na própria transação - se ela sofrer rollback, a mensagem some junto. Um único despachante
+assíncrono drena a tabela com o cliente HTTP compartilhado e concorrência limitada,
+respeitando os limites do Telegram (global e por chat) e repetindo com backoff em 429
+(respeitando retry_after) e 5xx/erros de rede. Broadcasts do admin também passam por aqui.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.http_clients import ClientesHTTP
+from ..database import SessionLocal
+from ..models.telegram_outbox import TelegramOutbox
+from ..models.transacao_recorrente import ConfirmacaoTransacao
+
+logger = logging.getLogger(__name__)
+
+# Tempo que uma mensagem reservada fica com o despachante antes de poder ser reservada de novo (queda do processo)
+RESERVA_SEGUNDOS = 300
+BACKOFF_BASE_SEGUNDOS = 5
+BACKOFF_MAXIMO_SEGUNDOS = 900
+TAMANHO_LOTE = 100
+
+
+class TelegramOutboxService:
+
+    @staticmethod
+    def enfileirar(
+        db: Session,
+        chat_id: str,
+        texto: str,
+        reply_markup: Optional[Dict[str, Any]] = None,
+        texto_fallback: Optional[str] = None,
+        parse_mode: Optional[str] = "Markdown",
+        confirmacao_id: Optional[int] = None,
+        tenant_id: Optional[int] = None
+    ) -> TelegramOutbox:
+        """Grava a mensagem no outbox; não faz commit (vai junto com a transação do chamador)"""
+        mensagem = TelegramOutbox(
+            chat_id=str(chat_id),
+            texto=texto,
+            parse_mode=parse_mode,
+            reply_markup=json.dumps(reply_markup) if reply_markup else None,
+            texto_fallback=texto_fallback,
+            status="PENDENTE",
+            tentativas=0,
+            proxima_tentativa_em=datetime.utcnow(),
+            confirmacao_id=confirmacao_id,
+            tenant_id=tenant_id
+        )
+        db.add(mensagem)
+        return mensagem
+
+    @staticmethod
+    def reservar(despachante: str, limite: int = TAMANHO_LOTE) -> List[Dict[str, Any]]:
+        """
+        Reserva até `limite` mensagens vencidas para este despachante (PENDENTE, ou ENVIANDO com reserva expirada)
+        A reserva é um UPDATE condicional com um token próprio, então dois processos nunca enviam a mesma mensagem
+        """
+        token = f"{uuid.uuid4().hex[:12]}:{despachante}"[:64]
+        db = SessionLocal()
+        try:
+            agora = datetime.utcnow()
+            # Mensagens de broadcast vão depois das transacionais (confirmações não esperam o broadcast inteiro)
+            vencidas = db.query(TelegramOutbox.id).filter(
+                TelegramOutbox.status.in_(["PENDENTE", "ENVIANDO"]),
+                TelegramOutbox.proxima_tentativa_em <= agora
+            ).order_by(TelegramOutbox.broadcast_id.is_not(None), TelegramOutbox.id).limit(limite).all()
+            if not vencidas:
+                return []
+
+            db.query(TelegramOutbox).filter(
+                TelegramOutbox.id.in_([mensagem_id for (mensagem_id,) in vencidas]),
+                TelegramOutbox.status.in_(["PENDENTE", "ENVIANDO"]),
+                TelegramOutbox.proxima_tentativa_em <= agora
+            ).update({
+                "status": "ENVIANDO",
+                "despachante": token,
+                "proxima_tentativa_em": agora + timedelta(seconds=RESERVA_SEGUNDOS)
+            }, synchronize_session=False)
+            db.commit()
+
+            reservadas = db.query(TelegramOutbox).filter(
+                TelegramOutbox.status == "ENVIANDO",
+                TelegramOutbox.despachante == token
+            ).order_by(TelegramOutbox.id).all()
+            return [
+                {
+                    "id": mensagem.id,
+                    "chat_id": mensagem.chat_id,
+                    "texto": mensagem.texto,
+                    "parse_mode": mensagem.parse_mode,
+                    "reply_markup": json.loads(mensagem.reply_markup) if mensagem.reply_markup else None,
+                    "texto_fallback": mensagem.texto_fallback,
+                    "tentativas": mensagem.tentativas,
+                    "confirmacao_id": mensagem.confirmacao_id
+                }
+                for mensagem in reservadas
+            ]
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def registrar_resultado(mensagem: Dict[str, Any], resultado: Dict[str, Any]) -> None:
+        """Grava o resultado de um envio: ENVIADA, reagendada (PENDENTE) ou FALHA"""
+        db = SessionLocal()
+        try:
+            registro = db.query(TelegramOutbox).filter(TelegramOutbox.id == mensagem["id"]).first()
+            if not registro:
+                return
+
+            registro.despachante = None
+            registro.tentativas = mensagem["tentativas"] + 1
+            if resultado["status"] == "ENVIADA":
+                registro.status = "ENVIADA"
+                registro.enviada_em = datetime.utcnow()
+                registro.telegram_message_id = resultado.get("message_id")
+                registro.ultimo_erro = None
+                if registro.confirmacao_id and registro.telegram_message_id:
+                    db.query(ConfirmacaoTransacao).filter(
+                        ConfirmacaoTransacao.id == registro.confirmacao_id
+                    ).update({"telegram_message_id": registro.telegram_message_id}, synchronize_session=False)
+            elif resultado["status"] == "FALLBACK":
+                # Telegram recusou o texto formatado: a próxima tentativa vai sem botões e sem Markdown
+                registro.status = "PENDENTE"
+                registro.texto = registro.texto_fallback
+                registro.texto_fallback = None
+                registro.reply_markup = None
+                registro.parse_mode = None
+                registro.proxima_tentativa_em = datetime.utcnow()
+                registro.ultimo_erro = resultado.get("erro")
+            elif resultado["status"] == "REPETIR" and registro.tentativas < settings.TELEGRAM_OUTBOX_TENTATIVAS:
+                registro.status = "PENDENTE"
+                registro.proxima_tentativa_em = datetime.utcnow() + timedelta(seconds=resultado["espera"])
+                registro.ultimo_erro = resultado.get("erro")
+            else:
+                registro.status = "FALHA"
+                registro.ultimo_erro = resultado.get("erro")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erro ao registrar envio da mensagem {mensagem['id']} do outbox: {e}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def backoff(tentativas: int) -> float:
+        """Espera exponencial com jitter para a próxima tentativa"""
+        espera = min(BACKOFF_BASE_SEGUNDOS * 2 ** tentativas, BACKOFF_MAXIMO_SEGUNDOS)
+        return espera * (0.5 + random.random() / 2)
+
+
+class LimitadorTelegram:
+    """
+    Limites de envio do Bot API: token bucket global (mensagens/s do bot, com rajada) e
+    intervalo mínimo entre mensagens para o mesmo chat
+    Implementado como GCRA (equivalente ao token bucket): cada envio reserva seu horário sem lock,
+    já que tudo roda no mesmo event loop
+    """
+
+    def __init__(self, por_segundo: float, intervalo_chat: float, rajada: int):
+        self.intervalo = 1 / por_segundo
+        self.tolerancia = (rajada - 1) * self.intervalo
+        self.intervalo_chat = intervalo_chat
+        self._tat = 0.0  # horário teórico do próximo envio
+        self._livre_por_chat: Dict[str, float] = {}
+
+    async def aguardar(self, chat_id: str) -> None:
+        agora = asyncio.get_running_loop().time()
+        tat = max(self._tat, agora)
+        espera = max(tat - self.tolerancia - agora, 0.0)
+        espera = max(espera, self._livre_por_chat.get(chat_id, 0.0) - agora)
+        self._tat = max(tat, agora + espera) + self.intervalo
+        self._livre_por_chat[chat_id] = agora + espera + self.intervalo_chat
+
+        if len(self._livre_por_chat) > 10000:
+            self._livre_por_chat = {chat: livre for chat, livre in self._livre_por_chat.items() if livre > agora}
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+class TelegramOutboxDespachante:
+    """Worker único que drena o outbox (uma instância por processo: app ou cron)"""
+
+    def __init__(self):
+        self.bot_token = settings.TELEGRAM_BOT_TOKEN
+        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.nome = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_running = False
+        self._tarefa: Optional[asyncio.Task] = None
+        self._pausa_ate = 0.0  # 429 vale para o bot inteiro: todos os envios esperam o retry_after
+        self.limitador = LimitadorTelegram(
+            settings.TELEGRAM_LIMITE_POR_SEGUNDO,
+            settings.TELEGRAM_INTERVALO_POR_CHAT_SEGUNDOS,
+            rajada=settings.TELEGRAM_OUTBOX_CONCORRENCIA
+        )
+
+    async def _enviar(self, client: httpx.AsyncClient, mensagem: Dict[str, Any]) -> Dict[str, Any]:
+        """Envia uma mensagem e classifica o resultado (ENVIADA, FALLBACK, REPETIR, FALHA)"""
+        await self.limitador.aguardar(mensagem["chat_id"])
+        loop = asyncio.get_running_loop()
+        if self._pausa_ate > loop.time():
+            await asyncio.sleep(self._pausa_ate - loop.time())
+
+        payload = {"chat_id": mensagem["chat_id"], "text": mensagem["texto"]}
+        if mensagem["parse_mode"]:
+            payload["parse_mode"] = mensagem["parse_mode"]
+        if mensagem["reply_markup"]:
+            payload["reply_markup"] = mensagem["reply_markup"]
+
+        try:
+            response = await client.post(f"{self.base_url}/sendMessage", json=payload)
+        except httpx.HTTPError as e:
+            return {"status": "REPETIR", "espera": TelegramOutboxService.backoff(mensagem["tentativas"]), "erro": f"{type(e).__name__}: {e}"}
+
+        if response.status_code == 200:
+            return {"status": "ENVIADA", "message_id": str(response.json().get("result", {}).get("message_id", "")) or None}
+
+        erro = f"{response.status_code} - {response.text[:500]}"
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("parameters", {}).get("retry_after", 0))
+            except ValueError:
+                retry_after = 0
+            retry_after = retry_after or float(response.headers.get("Retry-After", BACKOFF_BASE_SEGUNDOS))
+            self._pausa_ate = max(self._pausa_ate, loop.time() + retry_after)
+            logger.warning(f"⏳ Telegram limitou o envio (429): aguardando {retry_after:.0f}s")
+            return {"status": "REPETIR", "espera": retry_after, "erro": erro}
+        if response.status_code >= 500:
+            return {"status": "REPETIR", "espera": TelegramOutboxService.backoff(mensagem["tentativas"]), "erro": erro}
+        if response.status_code == 400 and mensagem["texto_fallback"]:
+            return {"status": "FALLBACK", "erro": erro}
+        return {"status": "FALHA", "erro": erro}
+
+    async def despachar_pendentes(self, client: Optional[httpx.AsyncClient] = None) -> int:
+        """Drena todas as mensagens vencidas do outbox; retorna quantas foram tentadas"""
+        if not self.bot_token:
+            logger.warning("⚠️ TELEGRAM_BOT_TOKEN não está configurado - outbox não será despachado")
+            return 0
+
+        client = client or ClientesHTTP.obter("telegram")
+        semaforo = asyncio.Semaphore(settings.TELEGRAM_OUTBOX_CONCORRENCIA)
+        contadores = {"tentadas": 0, "enviadas": 0, "falhas": 0}
+
+        async def processar(mensagem: Dict[str, Any]):
+            async with semaforo:
+                resultado = await self._enviar(client, mensagem)
+            await asyncio.to_thread(TelegramOutboxService.registrar_resultado, mensagem, resultado)
+            contadores["tentadas"] += 1
+            if resultado["status"] == "ENVIADA":
+                contadores["enviadas"] += 1
+            elif resultado["status"] == "FALHA" or (
+                resultado["status"] == "REPETIR" and mensagem["tentativas"] + 1 >= settings.TELEGRAM_OUTBOX_TENTATIVAS
+            ):
+                contadores["falhas"] += 1
+                logger.error(f"❌ Mensagem {mensagem['id']} do outbox para {mensagem['chat_id']} descartada: {resultado.get('erro')}")
+
+        while True:
+            mensagens = await asyncio.to_thread(TelegramOutboxService.reservar, self.nome)
+            if not mensagens:
+                break
+            await asyncio.gather(*(processar(mensagem) for mensagem in mensagens))
+
+        if contadores["tentadas"]:
+            logger.info(f"📱 Outbox Telegram: {contadores['enviadas']} enviada(s), {contadores['falhas']} falha(s) de {contadores['tentadas']} tentativa(s)")
+        return contadores["tentadas"]
+
+    async def _executar(self):
+        logger.info("📤 Despachante do outbox Telegram iniciado")
+        while self.is_running:
+            try:
+                await self.despachar_pendentes()
+            except Exception as e:
+                logger.error(f"❌ Erro no despachante do outbox Telegram: {e}")
+            await asyncio.sleep(settings.TELEGRAM_OUTBOX_INTERVALO_SEGUNDOS)
+        logger.info("🛑 Despachante do outbox Telegram parado")
+
+    def iniciar(self):
+        """Inicia o worker no event loop atual (startup da aplicação)"""
+        if self.is_running or not self.bot_token:
+            return
+        self.is_running = True
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        self.is_running = False
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+
+telegram_outbox = TelegramOutboxDespachante()
@@ -1,105 +1,143 @@
 import asyncio
 import httpx
 import logging
-from typing import Dict, Any, List
-from sqlalchemy.orm import Session
-from ..database import get_db
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional
+from ..database import SessionLocal
 from ..core.config import settings
-from .telegram_service import TelegramService
+from ..core.http_clients import ClientesHTTP
+from ..models.telegram_polling import TelegramPollingOffset
+from .telegram_update_queue import telegram_updates
 
 logger = logging.getLogger(__name__)
 
+# getUpdates fica aberto até chegar update ou passar este tempo (long polling)
+LONG_POLL_SEGUNDOS = 30
+LIMITE_UPDATES = 100
+BACKOFF_MAXIMO_SEGUNDOS = 30
+
 class TelegramPollingService:
     def __init__(self):
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.bot_id = (self.bot_token or "").split(":")[0]
         self.last_update_id = 0
-        self.telegram_service = TelegramService()
         self.is_running = False
-        
+
     async def start_polling(self):
-        """Iniciar polling de mensagens do Telegram"""
+        """Iniciar polling de mensagens do Telegram (long polling, continuando do último offset salvo)"""
         if not self.bot_token:
             logger.error("❌ Token do Telegram não configurado!")
             return
-            
+
         logger.info("🤖 Iniciando polling do Telegram...")
         self.is_running = True
-        
+        self.last_update_id = await asyncio.to_thread(self._carregar_offset)
+        falhas = 0
+
         try:
             while self.is_running:
-                await self._poll_updates()
-                await asyncio.sleep(1)  # Verificar a cada 1 segundo
+                if await self._poll_updates():
+                    falhas = 0
+                else:
+                    falhas += 1
+                    await asyncio.sleep(min(2 ** falhas, BACKOFF_MAXIMO_SEGUNDOS))
         except Exception as e:
             logger.error(f"Erro no polling: {e}")
         finally:
+            self.is_running = False
             logger.info("🛑 Polling do Telegram parado")
-    
+
     async def stop_polling(self):
-        """Parar polling"""
+        """Parar polling (o getUpdates em andamento termina em até LONG_POLL_SEGUNDOS)"""
         self.is_running = False
-        
-    async def _poll_updates(self):
-        """Verificar por novas atualizações"""
+
+    async def _poll_updates(self) -> bool:
+        """Buscar um lote de atualizações e processar; retorna False em erro (para o backoff)"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/getUpdates",
-                    params={
-                        "offset": self.last_update_id + 1,
-                        "timeout": 30,
-                        "limit": 100
-                    },
-                    timeout=35
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    if data.get("ok"):
-                        updates = data.get("result", [])
-                        
-                        for update in updates:
-                            await self._process_update(update)
-                            self.last_update_id = update.get("update_id", 0)
-                
+            client = ClientesHTTP.obter("telegram")
+            response = await client.get(
+                f"{self.base_url}/getUpdates",
+                params={
+                    "offset": self.last_update_id + 1,
+                    "timeout": LONG_POLL_SEGUNDOS,
+                    "limit": LIMITE_UPDATES
+                },
+                timeout=LONG_POLL_SEGUNDOS + 10
+            )
+
+            if response.status_code != 200:
+                logger.error(f"Erro ao fazer polling: {response.status_code} - {response.text[:200]}")
+                return False
+
+            data = response.json()
+            if not data.get("ok"):
+                logger.error(f"Erro ao fazer polling: {data}")
+                return False
+
+            updates = data.get("result", [])
+            if updates:
+                await self._processar_lote(updates)
+            return True
+
+        except httpx.HTTPError as e:
+            logger.error(f"Erro ao fazer polling: {type(e).__name__}: {e}")
+            return False
         except Exception as e:
             logger.error(f"Erro ao fazer polling: {e}")
-    
-    async def _process_update(self, update: Dict[str, Any]):
-        """Processar uma atualização recebida"""
+            return False
+
+    async def _processar_lote(self, updates: List[Dict[str, Any]]):
+        """
+        Processar o lote na fila de updates (chats em paralelo, cada chat em ordem) e avançar o offset
+        O offset só é salvo depois do lote inteiro: uma queda no meio reprocessa o lote, nunca perde updates
+        """
+        pendentes = []
+        recusado: Optional[int] = None
+        for update in updates:
+            concluido = Future()
+            if telegram_updates.enfileirar(update, concluido) == "fila_cheia":
+                recusado = update["update_id"]
+                break
+            pendentes.append(asyncio.wrap_future(concluido))
+
+        await asyncio.gather(*pendentes)
+
+        # Com a fila cheia, o próximo getUpdates recomeça do update recusado (os já enfileirados são deduplicados)
+        ultimo = recusado - 1 if recusado is not None else max(update["update_id"] for update in updates)
+        if ultimo > self.last_update_id:
+            self.last_update_id = ultimo
+            await asyncio.to_thread(self._salvar_offset, ultimo)
+        if recusado is not None:
+            logger.warning("⚠️ Fila de updates do Telegram cheia - aguardando para continuar o polling")
+            await asyncio.sleep(1)
+
+    def _carregar_offset(self) -> int:
+        """Último update_id processado, salvo no banco"""
+        db = SessionLocal()
         try:
-            # Simular estrutura de webhook
-            telegram_data = update
-            
-            # Obter sessão do banco
-            db = next(get_db())
-            
-            try:
-                # Verificar se é uma mensagem
-                if "message" in telegram_data:
-                    message = telegram_data["message"]
-                    
-                    # Verificar se é uma foto
-                    if "photo" in message:
-                        result = await self.telegram_service.process_photo(db, telegram_data)
-                        logger.info(f"📸 Foto processada via polling: {result}")
-                    
-                    # Verificar se é áudio/voice
-                    elif "voice" in message or "audio" in message:
-                        result = await self.telegram_service.process_audio(db, telegram_data)
-                        logger.info(f"🎤 Áudio processado via polling: {result}")
-                    
-                    # Verificar se é texto
-                    elif "text" in message:
-                        result = await self.telegram_service.process_message(db, telegram_data)
-                        logger.info(f"💬 Mensagem processada via polling: {result}")
-                        
-            finally:
-                db.close()
-                
+            registro = db.query(TelegramPollingOffset).filter(TelegramPollingOffset.bot_id == self.bot_id).first()
+            return registro.last_update_id if registro else 0
         except Exception as e:
-            logger.error(f"Erro ao processar update: {e}")
+            logger.warning(f"⚠️ Offset do polling não carregado (começando do zero): {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _salvar_offset(self, last_update_id: int):
+        db = SessionLocal()
+        try:
+            registro = db.query(TelegramPollingOffset).filter(TelegramPollingOffset.bot_id == self.bot_id).first()
+            if registro:
+                registro.last_update_id = last_update_id
+            else:
+                db.add(TelegramPollingOffset(bot_id=self.bot_id, last_update_id=last_update_id))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erro ao salvar offset do polling: {e}")
+        finally:
+            db.close()
 
 # Instância global para controlar o polling
-telegram_polling = TelegramPollingService() 
\ No newline at end of file
+telegram_polling = TelegramPollingService()
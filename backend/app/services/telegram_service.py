@@ -2,21 +2,22 @@ import httpx
 import random
 import string
 import io
-import tempfile
 import os
 import asyncio
-import concurrent.futures
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from ..core.config import settings
+from ..core.http_clients import ClientesHTTP
+from ..core.openai_client import ClienteOpenAI
+from ..database import em_thread_db
 from ..models.user import User
 from ..models.telegram_user import TelegramUser
 from ..services.enhanced_chat_ai_service import enhanced_chat_service
 from ..services.chat_ai_service import ChatAIService
+from ..services.transcricao_service import TranscricaoService, TranscricaoOcupadaError, TAMANHO_MAXIMO_BYTES
 from ..models.user import User
 import logging
-from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
@@ -26,26 +27,25 @@ class TelegramService:
         if not self.bot_token:
             logger.warning("⚠️ TELEGRAM_BOT_TOKEN não está configurado!")
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-        
-        # Cliente OpenAI com timeout configurado
-        self.openai_client = OpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            timeout=60.0  # 60 segundos de timeout
-        )
+    
+    @property
+    def openai_client(self):
+        """AsyncOpenAI compartilhado do event loop atual (cada worker do Telegram tem o seu loop)"""
+        return ClienteOpenAI.obter()
         
     async def send_message(self, chat_id: str, text: str, parse_mode: str = "Markdown") -> bool:
         """Enviar mensagem para o usuário no Telegram"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": chat_id,
-                        "text": text,
-                        "parse_mode": parse_mode
-                    }
-                )
-                return response.status_code == 200
+            client = ClientesHTTP.obter("telegram")
+            response = await client.post(
+                f"{self.base_url}/sendMessage",
+                json={
+                    "chat_id": chat_id,
+                    "text": text,
+                    "parse_mode": parse_mode
+                }
+            )
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"Erro ao enviar mensagem: {e}")
             return False
@@ -53,23 +53,23 @@ class TelegramService:
     async def send_message_with_buttons(self, chat_id: str, text: str, reply_markup: dict, parse_mode: str = "Markdown") -> bool:
         """Enviar mensagem com botões inline para o usuário no Telegram"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": chat_id,
-                        "text": text,
-                        "parse_mode": parse_mode,
-                        "reply_markup": reply_markup
-                    }
-                )
+            client = ClientesHTTP.obter("telegram")
+            response = await client.post(
+                f"{self.base_url}/sendMessage",
+                json={
+                    "chat_id": chat_id,
+                    "text": text,
+                    "parse_mode": parse_mode,
+                    "reply_markup": reply_markup
+                }
+            )
                 
-                if response.status_code == 200:
-                    logger.info(f"✅ Mensagem com botões enviada para {chat_id}")
-                    return True
-                else:
-                    logger.error(f"❌ Erro ao enviar mensagem com botões: {response.status_code} - {response.text}")
-                    return False
+            if response.status_code == 200:
+                logger.info(f"✅ Mensagem com botões enviada para {chat_id}")
+                return True
+            else:
+                logger.error(f"❌ Erro ao enviar mensagem com botões: {response.status_code} - {response.text}")
+                return False
                     
         except Exception as e:
             logger.error(f"❌ Erro ao enviar mensagem com botões: {e}")
@@ -78,17 +78,17 @@ class TelegramService:
     async def send_photo(self, chat_id: str, photo_url: str, caption: str = "") -> bool:
         """Enviar foto para o usuário no Telegram"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sendPhoto",
-                    json={
-                        "chat_id": chat_id,
-                        "photo": photo_url,
-                        "caption": caption,
-                        "parse_mode": "Markdown"
-                    }
-                )
-                return response.status_code == 200
+            client = ClientesHTTP.obter("telegram")
+            response = await client.post(
+                f"{self.base_url}/sendPhoto",
+                json={
+                    "chat_id": chat_id,
+                    "photo": photo_url,
+                    "caption": caption,
+                    "parse_mode": "Markdown"
+                }
+            )
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"Erro ao enviar foto: {e}")
             return False
@@ -123,6 +123,7 @@ class TelegramService:
             telegram_user.telegram_last_name = telegram_data.get("last_name")
             telegram_user.last_interaction = datetime.utcnow()
             db.commit()
+            db.refresh(telegram_user)
             
         return telegram_user
 
@@ -185,7 +186,7 @@ Após vincular sua conta, você poderá:
         chat = message.get("chat", {})
         text = message.get("text", "")
         
-        telegram_user = self.get_or_create_telegram_user(db, user_data)
+        telegram_user = await em_thread_db(self.get_or_create_telegram_user, db, user_data)
         
         # Se usuário não está autenticado
         if not telegram_user.is_authenticated:
@@ -218,13 +219,14 @@ Após vincular sua conta, você poderá:
             from ..models.transacao_recorrente import ConfirmacaoTransacao
             from datetime import datetime
             
-            confirmacoes = db.query(ConfirmacaoTransacao).filter(
-                ConfirmacaoTransacao.tenant_id == telegram_user.user.tenant_id,
-                ConfirmacaoTransacao.status == 'pendente',
-                ConfirmacaoTransacao.expira_em > datetime.now()
-            ).order_by(ConfirmacaoTransacao.criada_em.asc()).all()
+            def buscar_confirmacoes():
+                return db.query(ConfirmacaoTransacao).filter(
+                    ConfirmacaoTransacao.tenant_id == telegram_user.user.tenant_id,
+                    ConfirmacaoTransacao.status == 'pendente',
+                    ConfirmacaoTransacao.expira_em > datetime.now()
+                ).order_by(ConfirmacaoTransacao.criada_em.asc()).all()
             
-            return confirmacoes
+            return await em_thread_db(buscar_confirmacoes)
             
         except Exception as e:
             logger.error(f"❌ Erro ao verificar confirmações pendentes: {e}")
@@ -328,7 +330,8 @@ Após vincular sua conta, você poderá:
                     tenant_id=confirmacao.tenant_id,
                     created_by_name=f"{telegram_user.telegram_first_name} (Telegram)",
                     observacoes=f"Aprovada via Telegram. Confirmação ID: {confirmacao.id}",
-                    processado_por_ia=False
+                    processado_por_ia=False,
+                    transacao_recorrente_id=confirmacao.transacao_recorrente_id
                 )
                 
                 db.add(nova_transacao)
@@ -598,8 +601,9 @@ Tente usar /start para vincular sua conta novamente.
             if message.strip() in ["1", "2"]:
                 return await self.process_confirmation_response(db, telegram_user, message.strip())
             
-            # Se não for confirmação, processar como chat normal
-            if not telegram_user.user:
+            # Se não for confirmação, processar como chat normal (consultas no pool do banco)
+            vinculado, user = await em_thread_db(self._carregar_usuario_vinculado, db, telegram_user)
+            if not vinculado:
                 await self.send_message(
                     telegram_user.telegram_id,
                     "❌ Erro: Conta não está corretamente vinculada. Digite /start para reconfigurar."
@@ -607,7 +611,6 @@ Tente usar /start para vincular sua conta novamente.
                 return "user_not_linked"
             
             # Obter o usuário associado
-            user = db.query(User).filter(User.id == telegram_user.user_id).first()
             if not user:
                 await self.send_message(
                     telegram_user.telegram_id,
@@ -663,6 +666,12 @@ Tente usar /start para vincular sua conta novamente.
             )
             return "error"
 
+    def _carregar_usuario_vinculado(self, db: Session, telegram_user: TelegramUser) -> Tuple[bool, Optional[User]]:
+        """(conta vinculada?, usuário associado)"""
+        if not telegram_user.user:
+            return False, None
+        return True, db.query(User).filter(User.id == telegram_user.user_id).first()
+
     async def process_audio(self, db: Session, telegram_data: Dict[str, Any]) -> str:
         """Processar áudio/voice enviado pelo usuário com melhor tratamento de erros"""
         message = telegram_data.get("message", {})
@@ -694,13 +703,14 @@ Tente usar /start para vincular sua conta novamente.
             
             # Obter arquivo de áudio
             file_id = audio_data.get("file_id")
+            file_unique_id = audio_data.get("file_unique_id")
             file_size = audio_data.get("file_size", 0)
             duration = audio_data.get("duration", 0)
             
             logger.info(f"🎤 Arquivo: {file_id}, Tamanho: {file_size} bytes, Duração: {duration}s")
             
             # Verificar limite de tamanho (20MB)
-            if file_size > 20 * 1024 * 1024:
+            if file_size > TAMANHO_MAXIMO_BYTES:
                 await self.send_message(
                     telegram_user.telegram_id,
                     "❌ Arquivo muito grande. O limite é 20MB."
@@ -715,69 +725,45 @@ Tente usar /start para vincular sua conta novamente.
                 )
                 return "audio_too_long"
             
-            # Baixar arquivo com timeout
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                logger.info(f"🎤 Obtendo informações do arquivo: {file_id}")
-                
-                # Obter informações do arquivo
-                file_response = await client.get(f"{self.base_url}/getFile?file_id={file_id}")
-                file_data = file_response.json()
-                
-                logger.info(f"🎤 Resposta da API: {file_data}")
-                
-                if not file_data.get("ok"):
-                    error_msg = file_data.get("description", "Erro desconhecido")
-                    logger.error(f"❌ Erro ao obter arquivo: {error_msg}")
-                    await self.send_message(
-                        telegram_user.telegram_id,
-                        f"❌ Erro ao acessar o arquivo: {error_msg}"
-                    )
-                    return "file_access_error"
-                
-                file_path = file_data["result"]["file_path"]
-                file_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
-                
-                logger.info(f"🎤 Baixando áudio de: {file_url}")
-                
-                # Baixar conteúdo do áudio
-                audio_response = await client.get(file_url)
-                
-                if audio_response.status_code != 200:
-                    logger.error(f"❌ Erro ao baixar áudio: Status {audio_response.status_code}")
+            # Áudio reenviado/encaminhado: reaproveita a transcrição sem baixar de novo
+            text = TranscricaoService.obter_cache(file_unique_id)
+            if text:
+                logger.info(f"🎤 Transcrição reaproveitada do cache: {file_unique_id}")
+            else:
+                try:
+                    text = await self._baixar_e_transcrever(file_id, file_unique_id)
+                except TranscricaoOcupadaError:
+                    logger.warning("⚠️ Fila de transcrição cheia - áudio recusado")
                     await self.send_message(
                         telegram_user.telegram_id,
-                        "❌ Erro ao baixar o arquivo de áudio."
+                        "⏳ Muitos áudios sendo processados agora. Tente novamente em alguns instantes."
                     )
+                    return "transcription_busy"
+                except ValueError as e:
+                    await self.send_message(telegram_user.telegram_id, f"❌ {e}")
                     return "download_error"
                 
-                audio_bytes = audio_response.content
-                logger.info(f"🎤 Áudio baixado: {len(audio_bytes)} bytes")
-                
-                # Converter áudio para texto usando Whisper
-                logger.info("🎤 Iniciando transcrição com Whisper...")
-                text = await self._transcribe_audio(audio_bytes, file_path)
-                
-                if not text or text.strip() == "":
-                    logger.warning("❌ Transcrição retornou texto vazio")
-                    await self.send_message(
-                        telegram_user.telegram_id,
-                        "❌ Não consegui entender o áudio. Tente falar mais claramente ou verificar se há ruído de fundo."
-                    )
-                    return "transcription_failed"
-                
-                logger.info(f"✅ Transcrição bem-sucedida: '{text[:100]}...'")
-                
-                # Mostrar texto transcrito
+            if not text or text.strip() == "":
+                logger.warning("❌ Transcrição retornou texto vazio")
                 await self.send_message(
                     telegram_user.telegram_id,
-                    f"📝 *Entendi:* {text}\n\n⏳ Processando sua solicitação..."
+                    "❌ Não consegui entender o áudio. Tente falar mais claramente ou verificar se há ruído de fundo."
                 )
+                return "transcription_failed"
+                
+            logger.info(f"✅ Transcrição bem-sucedida: '{text[:100]}...'")
+                
+            # Mostrar texto transcrito
+            await self.send_message(
+                telegram_user.telegram_id,
+                f"📝 *Entendi:* {text}\n\n⏳ Processando sua solicitação..."
+            )
                 
-                # Processar texto transcrito como se fosse uma mensagem normal
-                logger.info("🎤 Enviando texto transcrito para processamento...")
-                result = await self.process_chat_message(db, telegram_user, text)
-                logger.info(f"✅ Processamento de áudio concluído: {result}")
-                return result
+            # Processar texto transcrito como se fosse uma mensagem normal
+            logger.info("🎤 Enviando texto transcrito para processamento...")
+            result = await self.process_chat_message(db, telegram_user, text)
+            logger.info(f"✅ Processamento de áudio concluído: {result}")
+            return result
                 
         except asyncio.TimeoutError:
             logger.error("⏰ Timeout ao processar áudio")
@@ -795,84 +781,45 @@ Tente usar /start para vincular sua conta novamente.
             )
             return "unexpected_error"
 
-    async def _transcribe_audio(self, audio_bytes: bytes, file_path: str) -> Optional[str]:
-        """Converter áudio em texto usando Whisper API com melhor tratamento de erros"""
-        temp_file_path = None
+    async def _baixar_e_transcrever(self, file_id: str, file_unique_id: Optional[str]) -> Optional[str]:
+        """
+        Baixa o áudio em streaming (arquivo temporário) e transcreve no pool de transcrição
+        Levanta ValueError com a mensagem para o usuário se o arquivo não puder ser baixado
+        """
+        client = ClientesHTTP.obter("telegram")
+        logger.info(f"🎤 Obtendo informações do arquivo: {file_id}")
+        
+        # Obter informações do arquivo
+        file_response = await client.get(f"{self.base_url}/getFile", params={"file_id": file_id}, timeout=60.0)
+        file_data = file_response.json()
+        
+        logger.info(f"🎤 Resposta da API: {file_data}")
+        
+        if not file_data.get("ok"):
+            error_msg = file_data.get("description", "Erro desconhecido")
+            logger.error(f"❌ Erro ao obter arquivo: {error_msg}")
+            raise ValueError(f"Erro ao acessar o arquivo: {error_msg}")
+        
+        file_path = file_data["result"]["file_path"]
+        file_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
+        
+        logger.info(f"🎤 Baixando áudio: {file_path}")
+        arquivo = await TranscricaoService.baixar(client, file_url)
+        if arquivo is None:
+            raise ValueError("Erro ao baixar o arquivo de áudio.")
+        
         try:
-            # Determinar extensão do arquivo
-            file_extension = os.path.splitext(file_path)[1] or '.ogg'
-            logger.info(f"🎤 Extensão do arquivo: {file_extension}")
-            
-            # Verificar tamanho mínimo
-            if len(audio_bytes) < 100:
-                logger.warning("❌ Arquivo de áudio muito pequeno")
-                return None
-            
-            # Criar arquivo temporário
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
-                temp_file.write(audio_bytes)
-                temp_file_path = temp_file.name
-            
-            logger.info(f"🎤 Arquivo temporário criado: {temp_file_path}")
-            
-            try:
-                # Usar Whisper para transcrever com timeout
-                logger.info("🎤 Enviando para Whisper API...")
-                
-                # Executar transcrição de forma assíncrona
-                def transcribe_sync():
-                    with open(temp_file_path, 'rb') as audio_file:
-                        return self.openai_client.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=audio_file,
-                            language="pt",  # Forçar português
-                            response_format="text"  # Resposta mais simples
-                        )
-                
-                # Executar em thread separada com timeout
-                loop = asyncio.get_event_loop()
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    try:
-                        transcription = await asyncio.wait_for(
-                            loop.run_in_executor(executor, transcribe_sync),
-                            timeout=45.0  # 45 segundos timeout
-                        )
-                        
-                        logger.info("✅ Transcrição recebida da API")
-                        
-                        # Para response_format="text", já retorna string diretamente
-                        if isinstance(transcription, str):
-                            result = transcription.strip()
-                        else:
-                            result = transcription.text.strip()
-                        
-                        if not result:
-                            logger.warning("❌ Transcrição retornou texto vazio")
-                            return None
-                            
-                        logger.info(f"✅ Transcrição: '{result[:50]}...'")
-                        return result
-                        
-                    except asyncio.TimeoutError:
-                        logger.error("⏰ Timeout na API do Whisper")
-                        return None
-                        
-            except Exception as whisper_error:
-                logger.error(f"❌ Erro específico do Whisper: {str(whisper_error)}")
-                return None
-                
-            finally:
-                # Remover arquivo temporário
-                try:
-                    if temp_file_path and os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
-                        logger.info("🗑️ Arquivo temporário removido")
-                except Exception as cleanup_error:
-                    logger.warning(f"⚠️ Erro ao remover arquivo temporário: {cleanup_error}")
-                
-        except Exception as e:
-            logger.error(f"❌ Erro geral na transcrição: {str(e)}", exc_info=True)
-            return None
+            # Converter áudio para texto usando Whisper
+            logger.info("🎤 Iniciando transcrição com Whisper...")
+            nome_arquivo = f"audio{os.path.splitext(file_path)[1] or '.ogg'}"
+            return await TranscricaoService.transcrever(
+                self.openai_client,
+                arquivo,
+                nome_arquivo,
+                chave_cache=file_unique_id
+            )
+        finally:
+            arquivo.close()
 
     async def process_photo(self, db: Session, telegram_data: Dict[str, Any]) -> str:
         """Processar foto enviada pelo usuário"""
@@ -904,82 +851,81 @@ Tente usar /start para vincular sua conta novamente.
             file_id = largest_photo.get("file_id")
             
             # Obter URL do arquivo
-            async with httpx.AsyncClient() as client:
-                logger.info(f"📸 Obtendo informações do arquivo: {file_id}")
-                file_response = await client.get(f"{self.base_url}/getFile?file_id={file_id}")
-                file_data = file_response.json()
+            client = ClientesHTTP.obter("telegram")
+            logger.info(f"📸 Obtendo informações do arquivo: {file_id}")
+            file_response = await client.get(f"{self.base_url}/getFile?file_id={file_id}")
+            file_data = file_response.json()
                 
-                logger.info(f"📸 Resposta da API: {file_data}")
+            logger.info(f"📸 Resposta da API: {file_data}")
                 
-                if file_data.get("ok"):
-                    file_path = file_data["result"]["file_path"]
-                    file_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
+            if file_data.get("ok"):
+                file_path = file_data["result"]["file_path"]
+                file_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
                     
-                    logger.info(f"📸 Baixando arquivo de: {file_url}")
+                logger.info(f"📸 Baixando arquivo de: {file_url}")
                     
-                    # Baixar arquivo
-                    photo_response = await client.get(file_url)
-                    photo_bytes = photo_response.content
+                # Baixar arquivo
+                photo_response = await client.get(file_url)
+                photo_bytes = photo_response.content
                     
-                    logger.info(f"📸 Arquivo baixado: {len(photo_bytes)} bytes")
+                logger.info(f"📸 Arquivo baixado: {len(photo_bytes)} bytes")
                     
-                    # Obter o usuário associado e corrigir isolamento por tenant
-                    user = db.query(User).filter(User.id == telegram_user.user_id).first()
-                    tenant_id_num = user.tenant_id if user.tenant_id else user.id
-                    tenant_id_str = str(tenant_id_num)
+                # Obter o usuário associado e corrigir isolamento por tenant
+                user = db.query(User).filter(User.id == telegram_user.user_id).first()
+                tenant_id_num = user.tenant_id if user.tenant_id else user.id
+                tenant_id_str = str(tenant_id_num)
                     
-                    logger.info(f"📸 Processando com ChatAI Service para user: {user.id}, tenant: {tenant_id_num}")
+                logger.info(f"📸 Processando com ChatAI Service para user: {user.id}, tenant: {tenant_id_num}")
                     
-                    # Processar com ChatAIService mas depois integrar com estado do enhanced_chat_service
-                    chat_service = ChatAIService(
-                        db=db,
-                        openai_api_key=settings.OPENAI_API_KEY,
-                        tenant_id=tenant_id_str
-                    )
+                # Processar com ChatAIService mas depois integrar com estado do enhanced_chat_service
+                chat_service = ChatAIService(
+                    db=db,
+                    tenant_id=tenant_id_str
+                )
                     
-                    logger.info("📸 Chamando processar_imagem...")
-                    result = await chat_service.processar_imagem(
-                        file_content=photo_bytes,
-                        filename="telegram_photo.jpg"
-                    )
+                logger.info("📸 Chamando processar_imagem...")
+                result = await chat_service.processar_imagem(
+                    file_content=photo_bytes,
+                    filename="telegram_photo.jpg"
+                )
                     
-                    # Verificar se ChatAI detectou uma transação e precisa de método de pagamento
-                    if "Qual método de pagamento você usou?" in result['resposta']:
-                        # Transferir estado para enhanced_chat_service para manter continuidade
-                        # CORREÇÃO: usar tenant_id para isolamento correto
-                        enhanced_chat_service.smart_mcp.awaiting_responses[tenant_id_num] = 'pagamento'
+                # Verificar se ChatAI detectou uma transação e precisa de método de pagamento
+                if "Qual método de pagamento você usou?" in result['resposta']:
+                    # Transferir estado para enhanced_chat_service para manter continuidade
+                    # CORREÇÃO: usar tenant_id para isolamento correto
+                    enhanced_chat_service.smart_mcp.awaiting_responses[tenant_id_num] = 'pagamento'
                         
-                        # Construir nome completo do usuário do Telegram
-                        telegram_user_name = telegram_user.telegram_first_name
-                        if telegram_user.telegram_last_name:
-                            telegram_user_name += f" {telegram_user.telegram_last_name}"
-                        if telegram_user.telegram_username:
-                            telegram_user_name += f" (@{telegram_user.telegram_username})"
+                    # Construir nome completo do usuário do Telegram
+                    telegram_user_name = telegram_user.telegram_first_name
+                    if telegram_user.telegram_last_name:
+                        telegram_user_name += f" {telegram_user.telegram_last_name}"
+                    if telegram_user.telegram_username:
+                        telegram_user_name += f" (@{telegram_user.telegram_username})"
                         
-                        # Dados da transação pending vão para pending_transactions
-                        enhanced_chat_service.smart_mcp.pending_transactions[tenant_id_num] = {
-                            'valor': result.get('detalhes', {}).get('extracted_data', {}).get('valor', 0),
-                            'descricao': result.get('detalhes', {}).get('extracted_data', {}).get('descricao', ''),
-                            'tipo': 'SAIDA',
-                            'status': 'requer_pagamento',
-                            'created_by_name': telegram_user_name  # Adicionar nome do usuário
-                        }
-                        logger.info(f"🔄 Estado transferido para enhanced_chat_service: tenant {tenant_id_num} - tipo: pagamento, usuário: {telegram_user_name}")
+                    # Dados da transação pending vão para pending_transactions
+                    enhanced_chat_service.smart_mcp.pending_transactions[tenant_id_num] = {
+                        'valor': result.get('detalhes', {}).get('extracted_data', {}).get('valor', 0),
+                        'descricao': result.get('detalhes', {}).get('extracted_data', {}).get('descricao', ''),
+                        'tipo': 'SAIDA',
+                        'status': 'requer_pagamento',
+                        'created_by_name': telegram_user_name  # Adicionar nome do usuário
+                    }
+                    logger.info(f"🔄 Estado transferido para enhanced_chat_service: tenant {tenant_id_num} - tipo: pagamento, usuário: {telegram_user_name}")
                     
-                    response_text = result['resposta']
+                response_text = result['resposta']
                     
-                    logger.info(f"📸 Resultado da IA: {result}")
+                logger.info(f"📸 Resultado da IA: {result}")
                     
-                    await self.send_message(telegram_user.telegram_id, response_text)
-                    logger.info("📸 Resposta enviada com sucesso!")
-                    return "photo_processed"
-                else:
-                    logger.error(f"📸 Erro na API do Telegram: {file_data}")
-                    await self.send_message(
-                        telegram_user.telegram_id,
-                        "❌ Erro ao baixar a foto do Telegram. Tente novamente."
-                    )
-                    return "telegram_api_error"
+                await self.send_message(telegram_user.telegram_id, response_text)
+                logger.info("📸 Resposta enviada com sucesso!")
+                return "photo_processed"
+            else:
+                logger.error(f"📸 Erro na API do Telegram: {file_data}")
+                await self.send_message(
+                    telegram_user.telegram_id,
+                    "❌ Erro ao baixar a foto do Telegram. Tente novamente."
+                )
+                return "telegram_api_error"
                 
         except Exception as e:
             logger.error(f"Erro ao processar foto: {e}")
@@ -1097,23 +1043,23 @@ Obrigado por usar o FinançasAI! 🚀
                 }
             ]
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/setMyCommands",
-                    json={"commands": commands}
-                )
+            client = ClientesHTTP.obter("telegram")
+            response = await client.post(
+                f"{self.base_url}/setMyCommands",
+                json={"commands": commands}
+            )
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get("ok"):
-                        logger.info("✅ Comandos do menu do Telegram atualizados com sucesso!")
-                        return True
-                    else:
-                        logger.error(f"❌ Erro na resposta da API: {result}")
-                        return False
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("ok"):
+                    logger.info("✅ Comandos do menu do Telegram atualizados com sucesso!")
+                    return True
                 else:
-                    logger.error(f"❌ Erro HTTP ao configurar comandos: {response.status_code}")
+                    logger.error(f"❌ Erro na resposta da API: {result}")
                     return False
+            else:
+                logger.error(f"❌ Erro HTTP ao configurar comandos: {response.status_code}")
+                return False
                     
         except Exception as e:
             logger.error(f"❌ Erro ao configurar comandos do Telegram: {e}")
@@ -1122,11 +1068,11 @@ Obrigado por usar o FinançasAI! 🚀
     async def get_bot_info(self) -> Dict[str, Any]:
         """Obter informações do bot"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/getMe")
-                if response.status_code == 200:
-                    return response.json()
-                return {}
+            client = ClientesHTTP.obter("telegram")
+            response = await client.get(f"{self.base_url}/getMe")
+            if response.status_code == 200:
+                return response.json()
+            return {}
         except Exception as e:
             logger.error(f"Erro ao obter informações do bot: {e}")
             return {}
@@ -1209,7 +1155,8 @@ Obrigado por usar o FinançasAI! 🚀
                     tenant_id=confirmacao.tenant_id,
                     created_by_name=f"{telegram_user.telegram_first_name} (Telegram)",
                     observacoes=f"Aprovada via Telegram. Confirmação ID: {confirmacao.id}",
-                    processado_por_ia=False
+                    processado_por_ia=False,
+                    transacao_recorrente_id=confirmacao.transacao_recorrente_id
                 )
                 
                 db.add(nova_transacao)
@@ -1284,16 +1231,16 @@ Obrigado por usar o FinançasAI! 🚀
     async def _answer_callback_query(self, query_id: str, text: str, show_alert: bool = False) -> bool:
         """Responder a um callback query"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/answerCallbackQuery",
-                    json={
-                        "callback_query_id": query_id,
-                        "text": text,
-                        "show_alert": show_alert
-                    }
-                )
-                return response.status_code == 200
+            client = ClientesHTTP.obter("telegram")
+            response = await client.post(
+                f"{self.base_url}/answerCallbackQuery",
+                json={
+                    "callback_query_id": query_id,
+                    "text": text,
+                    "show_alert": show_alert
+                }
+            )
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"❌ Erro ao responder callback query: {e}")
             return False
@@ -1301,17 +1248,17 @@ Obrigado por usar o FinançasAI! 🚀
     async def _edit_message_with_result(self, chat_id: str, message_id: int, new_text: str) -> bool:
         """Editar mensagem com resultado da confirmação"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/editMessageText",
-                    json={
-                        "chat_id": chat_id,
-                        "message_id": message_id,
-                        "text": new_text,
-                        "parse_mode": "Markdown"
-                    }
-                )
-                return response.status_code == 200
+            client = ClientesHTTP.obter("telegram")
+            response = await client.post(
+                f"{self.base_url}/editMessageText",
+                json={
+                    "chat_id": chat_id,
+                    "message_id": message_id,
+                    "text": new_text,
+                    "parse_mode": "Markdown"
+                }
+            )
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"❌ Erro ao editar mensagem: {e}")
             return False 
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+Fila de updates do Telegram
+
+O webhook só enfileira o update e responde; o processamento (download de áudio, Whisper,
+OpenAI, banco) roda em um pool de workers. Cada worker é uma thread com o próprio event
+loop, então chamadas bloqueantes do processamento não atrasam o ack do webhook.
+- Dedupe por update_id (Telegram reenvia webhooks que demoraram ou falharam)
+- Ordem por chat: um chat nunca tem dois updates processando ao mesmo tempo
+- Métricas de profundidade da fila e tempos de espera/processamento
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from ..core.http_clients import ClientesHTTP
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Quantos update_id recentes são lembrados para descartar reenvios
+JANELA_DEDUPE = 10000
+
+
+def chave_chat(update: Dict[str, Any]) -> str:
+    """Chat ao qual o update pertence (mensagens, callbacks etc.); updates sem chat usam o próprio update_id"""
+    for chave, conteudo in update.items():
+        if chave == "update_id" or not isinstance(conteudo, dict):
+            continue
+        chat = conteudo.get("chat") or conteudo.get("message", {}).get("chat")
+        if chat and "id" in chat:
+            return str(chat["id"])
+        if "from" in conteudo:
+            return str(conteudo["from"].get("id"))
+    return f"update:{update.get('update_id')}"
+
+
+async def processar_update(telegram_service, telegram_data: Dict[str, Any]) -> Optional[str]:
+    """Roteia um update do Telegram (webhook ou polling) para o TelegramService, com sessão própria"""
+    db = SessionLocal()
+    try:
+        # Callback query (botão inline pressionado)
+        if "callback_query" in telegram_data:
+            callback_query = telegram_data["callback_query"]
+            if callback_query.get("data", "").startswith("confirm_"):
+                result = await telegram_service.process_confirmation_callback(db, callback_query)
+                logger.info(f"🔘 Callback processado: {result}")
+                return result
+
+        # Verificar se é uma mensagem
+        elif "message" in telegram_data:
+            message = telegram_data["message"]
+            logger.info(f"🔍 Tipo de mensagem detectado: {list(message.keys())}")
+
+            # Verificar se é uma foto
+            if "photo" in message:
+                logger.info("📸 Processando foto...")
+                result = await telegram_service.process_photo(db, telegram_data)
+                logger.info(f"📸 Foto processada: {result}")
+                return result
+
+            # Verificar se é áudio/voice
+            elif "voice" in message or "audio" in message:
+                logger.info("🎤 Detectado áudio/voice - iniciando processamento...")
+                result = await telegram_service.process_audio(db, telegram_data)
+                logger.info(f"🎤 Áudio processado: {result}")
+                return result
+
+            # Verificar se é texto
+            elif "text" in message:
+                logger.info(f"💬 Processando texto: {message.get('text', '')[:50]}...")
+                result = await telegram_service.process_message(db, telegram_data)
+                logger.info(f"💬 Mensagem processada: {result}")
+                return result
+
+            else:
+                logger.warning(f"⚠️ Tipo de mensagem não reconhecido: {list(message.keys())}")
+
+        return None
+    finally:
+        db.close()
+
+
+class FilaUpdatesTelegram:
+
+    def __init__(self, workers: int, capacidade: int):
+        self.workers = workers
+        self.capacidade = capacidade
+        self.is_running = False
+        self._lock = threading.Lock()
+        self._prontos: "queue.Queue[Optional[str]]" = queue.Queue()  # chats com update esperando, um por vez
+        self._por_chat: Dict[str, deque] = {}  # chat -> updates pendentes (ordem de chegada)
+        self._chats_ativos = set()  # chats na fila de prontos ou em processamento
+        self._vistos: "OrderedDict[Any, None]" = OrderedDict()
+        self._threads = []
+        self._telegram_service = None
+        self._metricas = {
+            "recebidos": 0,
+            "duplicados": 0,
+            "rejeitados": 0,
+            "processados": 0,
+            "erros": 0,
+            "em_processamento": 0,
+            "profundidade_maxima": 0,
+            "tempo_processamento_total": 0.0,
+            "tempo_processamento_maximo": 0.0,
+        }
+
+    def _profundidade(self) -> int:
+        return sum(len(pendentes) for pendentes in self._por_chat.values())
+
+    def enfileirar(self, update: Dict[str, Any], concluido: Optional[Future] = None) -> str:
+        """
+        Enfileira o update; retorna 'enfileirado', 'duplicado' ou 'fila_cheia'
+        `concluido` (opcional) é resolvido quando o update termina de ser processado (ou já foi visto)
+        """
+        if not self.is_running:
+            self.iniciar()
+
+        update_id = update.get("update_id")
+        chat = chave_chat(update)
+        with self._lock:
+            self._metricas["recebidos"] += 1
+            if update_id is not None:
+                if update_id in self._vistos:
+                    self._metricas["duplicados"] += 1
+                    if concluido:
+                        concluido.set_result(None)
+                    return "duplicado"
+
+            profundidade = self._profundidade()
+            if profundidade >= self.capacidade:
+                self._metricas["rejeitados"] += 1
+                return "fila_cheia"
+
+            if update_id is not None:
+                self._vistos[update_id] = None
+                if len(self._vistos) > JANELA_DEDUPE:
+                    self._vistos.popitem(last=False)
+
+            self._por_chat.setdefault(chat, deque()).append((update, time.monotonic(), concluido))
+            self._metricas["profundidade_maxima"] = max(self._metricas["profundidade_maxima"], profundidade + 1)
+            if chat not in self._chats_ativos:
+                self._chats_ativos.add(chat)
+                self._prontos.put(chat)
+        return "enfileirado"
+
+    def _proximo(self, chat: str):
+        with self._lock:
+            update, enfileirado_em, concluido = self._por_chat[chat].popleft()
+            self._metricas["em_processamento"] += 1
+        return update, enfileirado_em, concluido
+
+    def _concluir(self, chat: str, duracao: float, erro: bool) -> None:
+        with self._lock:
+            self._metricas["em_processamento"] -= 1
+            self._metricas["erros" if erro else "processados"] += 1
+            self._metricas["tempo_processamento_total"] += duracao
+            self._metricas["tempo_processamento_maximo"] = max(self._metricas["tempo_processamento_maximo"], duracao)
+            if self._por_chat[chat]:
+                self._prontos.put(chat)  # Volta para o fim da fila: chats com muitos updates não monopolizam workers
+            else:
+                del self._por_chat[chat]
+                self._chats_ativos.discard(chat)
+
+    def _executar_worker(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while True:
+                chat = self._prontos.get()
+                if chat is None:
+                    break
+
+                update, enfileirado_em, concluido = self._proximo(chat)
+                inicio = time.monotonic()
+                erro = False
+                try:
+                    loop.run_until_complete(processar_update(self._telegram_service, update))
+                except Exception as e:
+                    erro = True
+                    logger.error(f"❌ Erro ao processar update {update.get('update_id')} (espera {inicio - enfileirado_em:.2f}s): {e}")
+                finally:
+                    self._concluir(chat, time.monotonic() - inicio, erro)
+                    if concluido:
+                        concluido.set_result(None)
+        finally:
+            loop.run_until_complete(ClientesHTTP.fechar())
+            loop.close()
+
+    def iniciar(self):
+        """Sobe o pool de workers (idempotente)"""
+        with self._lock:
+            if self.is_running:
+                return
+            self.is_running = True
+
+        from .telegram_service import TelegramService
+        self._telegram_service = TelegramService()
+        self._threads = [
+            threading.Thread(target=self._executar_worker, name=f"telegram-update-{numero}", daemon=True)
+            for numero in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"📥 Fila de updates do Telegram iniciada com {self.workers} worker(s)")
+
+    def parar(self, timeout: float = 10.0):
+        """Para os workers depois de esvaziar a fila (até `timeout` segundos)"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        limite = time.monotonic() + timeout
+        while self._chats_ativos and time.monotonic() < limite:
+            time.sleep(0.1)
+        for _ in self._threads:
+            self._prontos.put(None)
+        for thread in self._threads:
+            thread.join(max(limite - time.monotonic(), 0.1))
+        self._threads = []
+        logger.info("🛑 Fila de updates do Telegram parada")
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            agora = time.monotonic()
+            mais_antigo = min(
+                (pendentes[0][1] for pendentes in self._por_chat.values() if pendentes),
+                default=None
+            )
+            concluidos = self._metricas["processados"] + self._metricas["erros"]
+            return {
+                "workers": self.workers if self.is_running else 0,
+                "capacidade": self.capacidade,
+                "profundidade": self._profundidade(),
+                "profundidade_maxima": self._metricas["profundidade_maxima"],
+                "chats_na_fila": len(self._chats_ativos),
+                "em_processamento": self._metricas["em_processamento"],
+                "espera_mais_antiga_segundos": round(agora - mais_antigo, 3) if mais_antigo else 0.0,
+                "recebidos": self._metricas["recebidos"],
+                "duplicados": self._metricas["duplicados"],
+                "rejeitados": self._metricas["rejeitados"],
+                "processados": self._metricas["processados"],
+                "erros": self._metricas["erros"],
+                "tempo_medio_processamento_segundos": round(self._metricas["tempo_processamento_total"] / concluidos, 3) if concluidos else 0.0,
+                "tempo_maximo_processamento_segundos": round(self._metricas["tempo_processamento_maximo"], 3),
+            }
+
+
+# Instância global usada pelo webhook e pelo polling
+telegram_updates = FilaUpdatesTelegram(settings.TELEGRAM_WEBHOOK_WORKERS, settings.TELEGRAM_WEBHOOK_FILA_MAXIMA)
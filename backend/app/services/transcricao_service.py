@@ -0,0 +1,175 @@
+"""
+Transcrição de áudio (Whisper)
+
+- Download em streaming para um SpooledTemporaryFile (fica em memória até 1MB, depois vai para disco),
+  interrompido se passar do limite de tamanho
+- Chamada assíncrona ao Whisper (AsyncOpenAI compartilhado), no máximo TRANSCRICAO_MAX_WORKERS
+  simultâneas no processo (entre todos os event loops) e fila máxima de espera
+  (acima dela a transcrição é recusada em vez de acumular); quem está na fila espera o semáforo
+  numa thread própria, sem bloquear nem ocupar o event loop
+- Timeout que realmente encerra o trabalho: a chamada ao Whisper recebe o mesmo prazo
+  (sem retries) e é cancelada se o prazo estourar
+- Cache por file_unique_id do Telegram: áudio reenviado/encaminhado não é transcrito de novo
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Optional, Tuple
+
+import httpx
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_MAXIMO_BYTES = 20 * 1024 * 1024
+SPOOL_MEMORIA_BYTES = 1024 * 1024
+CACHE_MAXIMO = 2000
+CACHE_TTL_SEGUNDOS = 7 * 24 * 3600
+
+
+class TranscricaoOcupadaError(Exception):
+    """Fila de transcrição cheia"""
+
+
+class TranscricaoService:
+
+    _vagas = threading.BoundedSemaphore(settings.TRANSCRICAO_MAX_WORKERS + settings.TRANSCRICAO_FILA_MAXIMA)
+    _execucoes = threading.BoundedSemaphore(settings.TRANSCRICAO_MAX_WORKERS)
+    # Uma thread por vaga: quem espera _execucoes já passou por _vagas, então nunca há fila aqui
+    _espera = ThreadPoolExecutor(
+        max_workers=settings.TRANSCRICAO_MAX_WORKERS + settings.TRANSCRICAO_FILA_MAXIMA,
+        thread_name_prefix="transcricao"
+    )
+    _cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def obter_cache(chave: Optional[str]) -> Optional[str]:
+        """Transcrição já feita para este file_unique_id (None se não houver ou expirou)"""
+        if not chave:
+            return None
+        with TranscricaoService._cache_lock:
+            item = TranscricaoService._cache.get(chave)
+            if not item:
+                return None
+            texto, expira_em = item
+            if expira_em < time.monotonic():
+                del TranscricaoService._cache[chave]
+                return None
+            TranscricaoService._cache.move_to_end(chave)
+            return texto
+
+    @staticmethod
+    def _salvar_cache(chave: Optional[str], texto: str) -> None:
+        if not chave:
+            return
+        with TranscricaoService._cache_lock:
+            TranscricaoService._cache[chave] = (texto, time.monotonic() + CACHE_TTL_SEGUNDOS)
+            TranscricaoService._cache.move_to_end(chave)
+            while len(TranscricaoService._cache) > CACHE_MAXIMO:
+                TranscricaoService._cache.popitem(last=False)
+
+    @staticmethod
+    async def baixar(client: httpx.AsyncClient, url: str, limite_bytes: int = TAMANHO_MAXIMO_BYTES) -> Optional[IO[bytes]]:
+        """
+        Baixa o arquivo em streaming para um arquivo temporário (posicionado no início)
+        Retorna None se o download falhar ou passar de limite_bytes; o chamador fecha o arquivo
+        """
+        arquivo = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORIA_BYTES)
+        try:
+            async with client.stream("GET", url, timeout=60.0) as response:
+                if response.status_code != 200:
+                    logger.error(f"❌ Erro ao baixar áudio: Status {response.status_code}")
+                    arquivo.close()
+                    return None
+
+                total = 0
+                async for pedaco in response.aiter_bytes():
+                    total += len(pedaco)
+                    if total > limite_bytes:
+                        logger.warning(f"❌ Download interrompido: arquivo passou de {limite_bytes} bytes")
+                        arquivo.close()
+                        return None
+                    arquivo.write(pedaco)
+
+            arquivo.seek(0)
+            logger.info(f"🎤 Áudio baixado: {total} bytes")
+            return arquivo
+        except Exception:
+            arquivo.close()
+            raise
+
+    @staticmethod
+    async def transcrever(
+        openai_client,
+        arquivo: IO[bytes],
+        nome_arquivo: str,
+        chave_cache: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Transcreve o áudio com Whisper (openai_client: AsyncOpenAI)
+        Retorna None se o áudio for vazio/curto demais, se a API falhar ou se o prazo estourar
+        Levanta TranscricaoOcupadaError se a fila de transcrição estiver cheia
+        """
+        timeout = timeout or settings.TRANSCRICAO_TIMEOUT_SEGUNDOS
+
+        arquivo.seek(0, os.SEEK_END)
+        if arquivo.tell() < 100:
+            logger.warning("❌ Arquivo de áudio muito pequeno")
+            return None
+        arquivo.seek(0)
+
+        if not TranscricaoService._vagas.acquire(blocking=False):
+            raise TranscricaoOcupadaError("Fila de transcrição cheia")
+
+        # A chamada ao Whisper tem o mesmo prazo e nenhum retry
+        whisper = openai_client.with_options(timeout=timeout, max_retries=0)
+
+        # Semáforo entre threads (cada worker do Telegram tem o próprio loop): acquire bloqueante fora do loop
+        espera = TranscricaoService._espera.submit(TranscricaoService._execucoes.acquire)
+        try:
+            await asyncio.shield(asyncio.wrap_future(espera))
+        except BaseException:
+            # Cancelado na fila: a thread ainda obtém o semáforo, então devolvê-lo quando isso acontecer
+            espera.add_done_callback(lambda _: TranscricaoService._execucoes.release())
+            TranscricaoService._vagas.release()
+            raise
+
+        try:
+            # Margem para o timeout do próprio cliente disparar antes do cancelamento
+            transcription = await asyncio.wait_for(
+                whisper.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(nome_arquivo, arquivo),
+                    language="pt",  # Forçar português
+                    response_format="text"  # Resposta mais simples
+                ),
+                timeout=timeout + 5
+            )
+        except asyncio.TimeoutError:
+            logger.error("⏰ Timeout na API do Whisper")
+            return None
+        except Exception as whisper_error:
+            logger.error(f"❌ Erro específico do Whisper: {str(whisper_error)}")
+            return None
+        finally:
+            TranscricaoService._execucoes.release()
+            TranscricaoService._vagas.release()
+
+        # Para response_format="text", já retorna string diretamente
+        result = (transcription if isinstance(transcription, str) else transcription.text).strip()
+        if not result:
+            logger.warning("❌ Transcrição retornou texto vazio")
+            return None
+
+        TranscricaoService._salvar_cache(chave_cache, result)
+        logger.info(f"✅ Transcrição: '{result[:50]}...'")
+        return result
@@ -1,16 +1,19 @@
 import base64
 import json
 from typing import Optional, Dict, Any
-from openai import OpenAI
 from ..core.config import settings
+from ..core.openai_client import ClienteOpenAI
 
 class VisionService:
     def __init__(self):
         # Verificar se a chave da OpenAI está configurada
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY não configurada nas variáveis de ambiente")
-        
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    @property
+    def client(self):
+        """AsyncOpenAI compartilhado do event loop atual"""
+        return ClienteOpenAI.obter()
 
     def encode_image(self, image_bytes: bytes) -> str:
         """Codifica a imagem em base64"""
@@ -71,7 +74,7 @@ Se não conseguir identificar alguma informação, use valores padrão mas mante
 """
 
             # Fazer requisição para OpenAI Vision
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -10,12 +10,13 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
 from ..core.config import settings
+from ..core.http_clients import ClientesHTTP
+from ..core.openai_client import ClienteOpenAI
 from ..models.user import User
 from ..models.whatsapp_user import WhatsAppUser
 from ..services.enhanced_chat_ai_service import enhanced_chat_service
 from ..services.chat_ai_service import ChatAIService
 import logging
-from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +34,11 @@ class WhatsAppService:
         
         if self.phone_number_id:
             self.base_url = f"https://graph.facebook.com/v18.0/{self.phone_number_id}"
-        
-        # Cliente OpenAI com timeout configurado
-        self.openai_client = OpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            timeout=60.0
-        )
+    
+    @property
+    def openai_client(self):
+        """AsyncOpenAI compartilhado do event loop atual"""
+        return ClienteOpenAI.obter()
         
     async def send_message(self, phone_number: str, message: str, message_type: str = "text") -> bool:
         """Enviar mensagem de texto para o usuário no WhatsApp"""
@@ -57,19 +57,19 @@ class WhatsAppService:
                 }
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=headers,
-                    json=payload
-                )
+            client = ClientesHTTP.obter("whatsapp")
+            response = await client.post(
+                f"{self.base_url}/messages",
+                headers=headers,
+                json=payload
+            )
                 
-                if response.status_code == 200:
-                    logger.info(f"✅ Mensagem enviada para {phone_number}")
-                    return True
-                else:
-                    logger.error(f"❌ Erro ao enviar mensagem: {response.status_code} - {response.text}")
-                    return False
+            if response.status_code == 200:
+                logger.info(f"✅ Mensagem enviada para {phone_number}")
+                return True
+            else:
+                logger.error(f"❌ Erro ao enviar mensagem: {response.status_code} - {response.text}")
+                return False
                     
         except Exception as e:
             logger.error(f"❌ Erro ao enviar mensagem WhatsApp: {e}")
@@ -98,19 +98,19 @@ class WhatsAppService:
             if components:
                 payload["template"]["components"] = components
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=headers,
-                    json=payload
-                )
+            client = ClientesHTTP.obter("whatsapp")
+            response = await client.post(
+                f"{self.base_url}/messages",
+                headers=headers,
+                json=payload
+            )
                 
-                if response.status_code == 200:
-                    logger.info(f"✅ Template enviado para {phone_number}")
-                    return True
-                else:
-                    logger.error(f"❌ Erro ao enviar template: {response.status_code} - {response.text}")
-                    return False
+            if response.status_code == 200:
+                logger.info(f"✅ Template enviado para {phone_number}")
+                return True
+            else:
+                logger.error(f"❌ Erro ao enviar template: {response.status_code} - {response.text}")
+                return False
                     
         except Exception as e:
             logger.error(f"❌ Erro ao enviar template WhatsApp: {e}")
@@ -130,14 +130,14 @@ class WhatsAppService:
                 "message_id": message_id
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=headers,
-                    json=payload
-                )
+            client = ClientesHTTP.obter("whatsapp")
+            response = await client.post(
+                f"{self.base_url}/messages",
+                headers=headers,
+                json=payload
+            )
                 
-                return response.status_code == 200
+            return response.status_code == 200
                 
         except Exception as e:
             logger.error(f"❌ Erro ao marcar como lida: {e}")
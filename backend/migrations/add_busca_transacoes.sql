@@ -0,0 +1,26 @@
+-- Migração: Busca textual em transacoes (descricao + observacoes)
+-- Data: 2026-10-17
+-- Descrição: Índices GIN de full-text (português, sem acentos) e de trigramas usados por
+-- BuscaService (app/services/busca_service.py). As expressões dos índices precisam ser
+-- idênticas às usadas nas consultas.
+-- Alternativa sem DBeaver: POST /api/migration/add-busca-transacoes
+-- No Azure PostgreSQL, liberar UNACCENT e PG_TRGM em azure.extensions antes de aplicar.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() é STABLE; índices de expressão exigem uma função IMMUTABLE
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+-- Palavras completas (com stemming em português)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_busca_fts ON transacoes
+USING gin (to_tsvector('portuguese'::regconfig,
+    immutable_unaccent(lower(coalesce(transacoes.descricao, '') || ' ' || coalesce(transacoes.observacoes, '')))));
+
+-- Trechos de palavras (LIKE '%termo%')
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_busca_trgm ON transacoes
+USING gin (immutable_unaccent(lower(coalesce(transacoes.descricao, '') || ' ' || coalesce(transacoes.observacoes, ''))) gin_trgm_ops);
+
+ANALYZE transacoes;
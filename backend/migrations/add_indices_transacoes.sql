@@ -0,0 +1,25 @@
+-- Migração: Índices compostos para os caminhos quentes de transacoes
+-- Data: 2026-10-17
+-- Descrição: Mesmos índices declarados em Transacao.__table_args__ (app/models/financial.py).
+-- Alternativa sem DBeaver: POST /api/migration/add-indices-transacoes
+-- CONCURRENTLY evita bloquear escritas; rodar fora de transação (um comando por vez).
+-- Validar depois com: python scripts/verificar_indices.py
+
+-- Dashboard, listagens e resumos: tenant_id + data
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_tenant_data
+ON transacoes(tenant_id, data);
+
+-- calcular_fatura_cartao: cartao_id + data + tipo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_cartao_data_tipo
+ON transacoes(cartao_id, data, tipo);
+
+-- Planejamento: tenant_id + categoria_id + data
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_tenant_categoria_data
+ON transacoes(tenant_id, categoria_id, data);
+
+-- recalcular_valor_fatura: fatura_id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_fatura
+ON transacoes(fatura_id);
+
+-- Atualizar estatísticas para o planner considerar os novos índices
+ANALYZE transacoes;
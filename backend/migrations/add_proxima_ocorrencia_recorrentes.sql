@@ -0,0 +1,16 @@
+-- Migração: Próxima ocorrência persistida em transacoes_recorrentes
+-- Data: 2026-10-17
+-- Descrição: O agendador seleciona só as recorrências que vencem no dia (ativa + proxima_ocorrencia)
+-- em vez de carregar todas e calcular o vencimento em Python.
+-- Alternativa sem DBeaver: POST /api/migration/add-proxima-ocorrencia-recorrentes (também preenche os valores)
+-- Sem o preenchimento, a primeira execução do agendador calcula proxima_ocorrencia das linhas com NULL.
+
+ALTER TABLE transacoes_recorrentes
+ADD COLUMN IF NOT EXISTS proxima_ocorrencia DATE;
+
+COMMENT ON COLUMN transacoes_recorrentes.proxima_ocorrencia IS 'Próxima ocorrência ainda não processada pelo agendador (NULL = encerrada)';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recorrentes_ativa_proxima
+ON transacoes_recorrentes(ativa, proxima_ocorrencia);
+
+ANALYZE transacoes_recorrentes;
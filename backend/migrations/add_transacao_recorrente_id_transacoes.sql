@@ -0,0 +1,28 @@
+-- Migração: Vínculo explícito entre transacoes e transacoes_recorrentes
+-- Data: 2026-10-17
+-- Descrição: O agendador detecta ocorrências já geradas por (transacao_recorrente_id, dia) em uma consulta
+-- por execução, em vez de comparar descricao '[AUTO] ...' para cada recorrência.
+-- Alternativa sem DBeaver: POST /api/migration/add-transacao-recorrente-id
+
+ALTER TABLE transacoes
+ADD COLUMN IF NOT EXISTS transacao_recorrente_id INTEGER NULL REFERENCES transacoes_recorrentes(id) ON DELETE SET NULL;
+
+-- Vincular transações já geradas pelo agendador (uma por recorrência e dia; duplicatas antigas ficam sem vínculo)
+UPDATE transacoes t
+SET transacao_recorrente_id = origem.recorrente_id
+FROM (
+    SELECT DISTINCT ON (recorrente_id, date(data)) id, recorrente_id
+    FROM (
+        SELECT id, data, CAST(substring(observacoes FROM 'recorrência ID: ([0-9]+)') AS INTEGER) AS recorrente_id
+        FROM transacoes
+        WHERE observacoes LIKE 'Gerada automaticamente da recorrência ID: %'
+          AND transacao_recorrente_id IS NULL
+    ) gerada
+    WHERE recorrente_id IN (SELECT id FROM transacoes_recorrentes)
+    ORDER BY recorrente_id, date(data), id
+) origem
+WHERE t.id = origem.id;
+
+-- No máximo uma transação por recorrência e dia
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_transacoes_recorrente_dia
+ON transacoes(transacao_recorrente_id, date(data));
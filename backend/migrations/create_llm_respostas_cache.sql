@@ -0,0 +1,23 @@
+-- Migração: Criar cache persistente de respostas do OpenAI
+-- Data: 2026-10-17
+-- Descrição: Respostas das chamadas de fallback ao OpenAI (extração de transações e chat
+-- genérico), por chave sha256 de modelo + prompt normalizado + contexto do tenant. Camada
+-- opcional (LLM_CACHE_PERSISTENTE=true) atrás do cache em memória.
+-- A tabela também é criada pelo create_all no startup da aplicação.
+
+CREATE TABLE IF NOT EXISTS llm_respostas_cache (
+    chave VARCHAR(64) PRIMARY KEY,
+    modelo VARCHAR NOT NULL,
+    resposta TEXT NOT NULL,
+    tokens INTEGER DEFAULT 0,
+    hits INTEGER DEFAULT 0,
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expira_em TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_respostas_cache_expira_em ON llm_respostas_cache(expira_em);
+
+-- Comentários para documentação
+COMMENT ON TABLE llm_respostas_cache IS 'Cache de respostas do OpenAI (camada persistente do LLMCache)';
+COMMENT ON COLUMN llm_respostas_cache.chave IS 'sha256 de modelo + mensagens normalizadas + parâmetros + hash do contexto do tenant';
+COMMENT ON COLUMN llm_respostas_cache.tokens IS 'Tokens da chamada original, economizados a cada hit';
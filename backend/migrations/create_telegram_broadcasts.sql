@@ -0,0 +1,28 @@
+-- Migração: Criar broadcasts do admin via outbox do Telegram
+-- Data: 2026-10-17
+-- Descrição: Cada broadcast enfileira uma linha por destinatário em telegram_outbox (broadcast_id);
+-- o despachante do outbox envia respeitando os limites do Telegram e o progresso é contado pelas linhas.
+-- Alternativa sem DBeaver: POST /api/migration/add-telegram-broadcasts
+
+CREATE TABLE IF NOT EXISTS telegram_broadcasts (
+    id SERIAL PRIMARY KEY,
+    mensagem TEXT NOT NULL,
+    target_type VARCHAR(20) NOT NULL DEFAULT 'all',
+    total_destinatarios INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'EM_ANDAMENTO',
+    criado_por VARCHAR,
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    concluido_em TIMESTAMP
+);
+
+ALTER TABLE telegram_outbox
+ADD COLUMN IF NOT EXISTS broadcast_id INTEGER NULL REFERENCES telegram_broadcasts(id);
+
+-- Progresso do broadcast: contagem das mensagens por status
+CREATE INDEX IF NOT EXISTS ix_telegram_outbox_broadcast_id
+ON telegram_outbox(broadcast_id);
+
+-- Comentários para documentação
+COMMENT ON TABLE telegram_broadcasts IS 'Broadcasts do admin pelo Telegram (mensagens em telegram_outbox)';
+COMMENT ON COLUMN telegram_broadcasts.status IS 'EM_ANDAMENTO ou CONCLUIDO (nenhuma mensagem pendente)';
+COMMENT ON COLUMN telegram_outbox.broadcast_id IS 'Broadcast de origem (NULL = mensagem transacional)';
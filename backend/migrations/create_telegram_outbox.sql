@@ -0,0 +1,33 @@
+-- Migração: Criar outbox de mensagens do Telegram
+-- Data: 2026-10-17
+-- Descrição: Mensagens gravadas na mesma transação que as originou (ex.: confirmações do agendador)
+-- e enviadas pelo despachante do outbox (app/services/telegram_outbox_service.py).
+-- A tabela também é criada pelo create_all no startup da aplicação.
+
+CREATE TABLE IF NOT EXISTS telegram_outbox (
+    id SERIAL PRIMARY KEY,
+    chat_id VARCHAR NOT NULL,
+    texto TEXT NOT NULL,
+    parse_mode VARCHAR(20) DEFAULT 'Markdown',
+    reply_markup TEXT,
+    texto_fallback TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDENTE',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    despachante VARCHAR(64),
+    ultimo_erro TEXT,
+    telegram_message_id VARCHAR,
+    confirmacao_id INTEGER REFERENCES confirmacoes_transacao(id),
+    tenant_id INTEGER REFERENCES tenants(id),
+    criada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    enviada_em TIMESTAMP
+);
+
+-- Despachante: mensagens vencidas por status
+CREATE INDEX IF NOT EXISTS idx_telegram_outbox_status_proxima
+ON telegram_outbox(status, proxima_tentativa_em);
+
+-- Comentários para documentação
+COMMENT ON TABLE telegram_outbox IS 'Outbox de mensagens do Telegram drenado pelo despachante assíncrono';
+COMMENT ON COLUMN telegram_outbox.status IS 'PENDENTE, ENVIANDO, ENVIADA ou FALHA';
+COMMENT ON COLUMN telegram_outbox.proxima_tentativa_em IS 'Próxima tentativa (em ENVIANDO: fim da reserva do despachante)';
@@ -0,0 +1,15 @@
+-- Migração: Criar offset persistido do polling do Telegram
+-- Data: 2026-10-17
+-- Descrição: Último update_id processado pelo getUpdates de cada bot, para que um restart
+-- do polling continue de onde parou (sem reprocessar nem perder updates).
+-- A tabela também é criada pelo create_all no startup da aplicação.
+
+CREATE TABLE IF NOT EXISTS telegram_polling_offsets (
+    bot_id VARCHAR PRIMARY KEY,
+    last_update_id BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Comentários para documentação
+COMMENT ON TABLE telegram_polling_offsets IS 'Offset do long polling (getUpdates) por bot';
+COMMENT ON COLUMN telegram_polling_offsets.bot_id IS 'Parte numérica do token do bot (antes do :)';
@@ -0,0 +1,37 @@
+-- Migração: Criar rollup mensal de transações por tenant
+-- Data: 2026-10-17
+-- Descrição: Somas/contagens de transacoes por (tenant, ano, mes, categoria, conta, cartao, tipo).
+-- Mantido incrementalmente pelos eventos de flush do ORM (app/models/rollup.py).
+-- Após aplicar, rodar o backfill: python scripts/backfill_rollup_mensal.py
+
+CREATE TABLE IF NOT EXISTS transacoes_rollup_mensal (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER NOT NULL REFERENCES tenants(id),
+    ano INTEGER NOT NULL,
+    mes INTEGER NOT NULL CHECK (mes >= 1 AND mes <= 12),
+    categoria_id INTEGER NOT NULL,
+    conta_id INTEGER NOT NULL DEFAULT 0,   -- 0 = sem conta
+    cartao_id INTEGER NOT NULL DEFAULT 0,  -- 0 = sem cartão
+    tipo tipotransacao NOT NULL,
+    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_transacoes_rollup_mensal_chave
+        UNIQUE (tenant_id, ano, mes, categoria_id, conta_id, cartao_id, tipo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_transacoes_rollup_mensal_periodo
+ON transacoes_rollup_mensal(tenant_id, ano, mes);
+
+-- Tenants cujo rollup já foi reconstruído (as leituras só usam o rollup desses tenants)
+CREATE TABLE IF NOT EXISTS transacoes_rollup_tenants (
+    tenant_id INTEGER PRIMARY KEY REFERENCES tenants(id),
+    reconstruido_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Comentários para documentação
+COMMENT ON TABLE transacoes_rollup_mensal IS 'Rollup mensal de transações por tenant/categoria/conta/cartão/tipo';
+COMMENT ON COLUMN transacoes_rollup_mensal.conta_id IS 'ID da conta ou 0 quando a transação não tem conta';
+COMMENT ON COLUMN transacoes_rollup_mensal.cartao_id IS 'ID do cartão ou 0 quando a transação não tem cartão';
+COMMENT ON TABLE transacoes_rollup_tenants IS 'Tenants com rollup mensal reconstruído (backfill concluído)';
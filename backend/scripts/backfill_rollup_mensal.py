@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script de backfill do rollup mensal de transações
+Reconstrói transacoes_rollup_mensal a partir de transacoes (todos os tenants ou os informados)
+
+Uso:
+    python scripts/backfill_rollup_mensal.py            # todos os tenants
+    python scripts/backfill_rollup_mensal.py 3 7 12     # apenas os tenants 3, 7 e 12
+"""
+
+import sys
+import logging
+from datetime import datetime
+from pathlib import Path
+
+# Adicionar o diretório pai ao path para importar módulos da aplicação
+script_dir = Path(__file__).parent
+app_dir = script_dir.parent
+sys.path.insert(0, str(app_dir))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger("backfill_rollup_mensal")
+
+def main():
+    """Função principal do backfill"""
+    try:
+        tenant_ids = [int(arg) for arg in sys.argv[1:]] or None
+        logger.info(f"🚀 Iniciando backfill do rollup mensal ({'tenants ' + str(tenant_ids) if tenant_ids else 'todos os tenants'})")
+        start_time = datetime.now()
+        
+        from app.database import SessionLocal, Base, engine
+        from app.models import TransacaoRollupMensal, RollupMensalTenant
+        from app.services.rollup_service import RollupService
+        
+        # Garantir que as tabelas existem (no PostgreSQL prefira migrations/create_transacoes_rollup_mensal.sql)
+        Base.metadata.create_all(bind=engine, tables=[
+            TransacaoRollupMensal.__table__, RollupMensalTenant.__table__
+        ])
+        
+        db = SessionLocal()
+        try:
+            resultado = RollupService.reconstruir_todos(db, tenant_ids)
+        finally:
+            db.close()
+        
+        for tenant_id, linhas in resultado.items():
+            logger.info(f"   📊 Tenant {tenant_id}: {linhas} linhas de rollup")
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.info(f"✅ Backfill concluído: {len(resultado)} tenants em {duration:.2f} segundos")
+        sys.exit(0)
+        
+    except Exception as e:
+        logger.error(f"💥 Erro no backfill do rollup mensal: {e}")
+        logger.exception("Stack trace completo:")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
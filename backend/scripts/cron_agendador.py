@@ -6,6 +6,7 @@ Executa diariamente para processar transações que vencem no dia
 
 import os
 import sys
+import asyncio
 import logging
 from datetime import date, datetime
 from pathlib import Path
@@ -43,10 +44,13 @@ def main():
         
         # Log dos resultados
         logger.info(f"✅ Processamento concluído:")
-        logger.info(f"   📊 Total recorrentes ativas: {resultado['total_recorrentes_ativas']}")
+        logger.info(f"   📊 Recorrentes vencendo: {resultado['total_recorrentes_vencendo']}")
         logger.info(f"   🔄 Processadas: {resultado['processadas']}")
         logger.info(f"   ✨ Criadas: {resultado['criadas']}")
         logger.info(f"   ❌ Erros: {resultado['erros']}")
+        logger.info(f"   🧩 Lotes: {len(resultado['lotes'])} ({resultado['lotes_com_falha']} com falha) em {resultado['duracao_segundos']:.2f}s")
+        for lote in resultado['lotes']:
+            logger.info(f"      - Lote {lote['lote']}: {lote['itens']} item(ns), tenants {lote['tenants']}, {lote['duracao_segundos']:.2f}s, {lote['tentativas']} tentativa(s)")
         
         # Detalhar transações criadas
         if resultado['criadas'] > 0:
@@ -55,6 +59,23 @@ def main():
                 if detalhe.get('criada'):
                     logger.info(f"   - {detalhe['descricao']} (ID: {detalhe['transacao_id']})")
         
+        # Remover respostas expiradas do cache do OpenAI
+        from app.services.llm_cache import LLMCache
+        logger.info(f"   🧹 Respostas expiradas removidas do cache LLM: {LLMCache.limpar_expirados()}")
+        
+        # Enviar as notificações de confirmação gravadas no outbox do Telegram
+        from app.services.telegram_outbox_service import telegram_outbox
+        from app.core.http_clients import ClientesHTTP
+        
+        async def despachar_outbox():
+            try:
+                return await telegram_outbox.despachar_pendentes()
+            finally:
+                await ClientesHTTP.fechar()
+        
+        enviadas = asyncio.run(despachar_outbox())
+        logger.info(f"   📱 Notificações Telegram despachadas: {enviadas}")
+        
         # Verificar se houve erros
         if resultado['erros'] > 0:
             logger.warning(f"⚠️ {resultado['erros']} erro(s) durante o processamento:")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Script de Cron Job para verificação de consistência das faturas
+Recalcula em lote o valor de todas as faturas a partir das transações vinculadas,
+reporta divergências em relação a faturas.valor_total (mantido por deltas) e corrige
+
+Uso:
+    python scripts/cron_consistencia_faturas.py               # verifica e corrige
+    python scripts/cron_consistencia_faturas.py --so-relatorio  # apenas reporta
+"""
+
+import sys
+import logging
+from datetime import date
+from pathlib import Path
+
+# Adicionar o diretório pai ao path para importar módulos da aplicação
+script_dir = Path(__file__).parent
+app_dir = script_dir.parent
+sys.path.insert(0, str(app_dir))
+
+# Configurar logging
+log_dir = app_dir / "logs"
+log_dir.mkdir(exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(log_dir / f"faturas_{date.today().strftime('%Y%m')}.log"),
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+
+logger = logging.getLogger("cron_consistencia_faturas")
+
+def main():
+    """Função principal da verificação de consistência"""
+    corrigir = "--so-relatorio" not in sys.argv[1:]
+    
+    try:
+        logger.info("🧾 Iniciando verificação de consistência das faturas")
+        
+        # Importar após configurar o path
+        from app.database import SessionLocal
+        # app.models não importa todos os módulos; registrar os mappers usados pelos relacionamentos
+        import app.models
+        import app.models.email_verification
+        import app.models.whatsapp_user
+        import app.models.chat_history
+        import app.models.confirmacao_transacao
+        from app.services.fatura_service import FaturaService
+        
+        db = SessionLocal()
+        try:
+            resultado = FaturaService.verificar_consistencia_faturas(db, corrigir=corrigir)
+            db.commit()
+        finally:
+            db.close()
+        
+        logger.info(f"✅ Faturas verificadas: {resultado['faturas_verificadas']}")
+        logger.info(f"   ⚖️ Divergentes: {resultado['faturas_divergentes']}")
+        logger.info(f"   🔧 Corrigidas: {resultado['corrigidas']}")
+        
+        for item in resultado['divergencias']:
+            logger.warning(
+                f"   - Fatura {item['fatura_id']} (tenant {item['tenant_id']}, cartão {item['cartao_id']}): "
+                f"valor_total R$ {item['valor_total']:.2f} x recalculado R$ {item['recalculado']:.2f} "
+                f"(diferença R$ {item['diferenca']:.2f})"
+            )
+        
+        if resultado['faturas_divergentes'] > 0:
+            logger.warning("🔶 Divergências encontradas em faturas")
+            sys.exit(1)
+        
+        logger.info("🎉 Todas as faturas estão consistentes")
+        sys.exit(0)
+        
+    except Exception as e:
+        logger.error(f"💥 Erro crítico na verificação de faturas: {e}")
+        logger.exception("Stack trace completo:")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
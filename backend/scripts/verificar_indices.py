@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script de verificação de uso dos índices de transacoes
+Roda EXPLAIN nas consultas quentes (dashboard, fatura do cartão, planejamento)
+no banco configurado (SQLite ou PostgreSQL) e confere se o índice esperado aparece no plano.
+
+Uso:
+    python scripts/verificar_indices.py
+"""
+
+import sys
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adicionar o diretório pai ao path para importar módulos da aplicação
+script_dir = Path(__file__).parent
+app_dir = script_dir.parent
+sys.path.insert(0, str(app_dir))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger("verificar_indices")
+
+def consultas_quentes(tenant_id: int, cartao_id: int, categoria_id: int):
+    """Consultas representativas de cada caminho quente e o índice esperado para cada uma"""
+    from sqlalchemy import select, func, and_
+    from app.models.financial import Transacao, TipoTransacao
+
+    # Colunas da tabela (Core) para não depender da configuração de todos os mappers
+    t = Transacao.__table__.c
+    hoje = datetime.now()
+    inicio_mes = hoje.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    return [
+        (
+            "dashboard: tenant_id + data",
+            select(t.tipo, func.sum(t.valor)).where(
+                and_(t.tenant_id == tenant_id, t.data >= hoje - timedelta(days=365))
+            ).group_by(t.tipo),
+            "idx_transacoes_tenant_data"
+        ),
+        (
+            "fatura: cartao_id + data + tipo",
+            select(func.sum(t.valor)).where(
+                and_(
+                    t.cartao_id == cartao_id,
+                    t.data >= hoje - timedelta(days=30),
+                    t.data <= hoje,
+                    t.tipo == TipoTransacao.SAIDA
+                )
+            ),
+            "idx_transacoes_cartao_data_tipo"
+        ),
+        (
+            "planejamento: tenant_id + categoria_id + data",
+            select(func.sum(t.valor)).where(
+                and_(
+                    t.tenant_id == tenant_id,
+                    t.categoria_id == categoria_id,
+                    t.data >= inicio_mes,
+                    t.tipo == TipoTransacao.SAIDA
+                )
+            ),
+            "idx_transacoes_tenant_categoria_data"
+        ),
+    ]
+
+def main():
+    """Função principal da verificação"""
+    try:
+        from sqlalchemy import text
+        from app.database import engine
+
+        dialeto = engine.dialect.name
+        logger.info(f"🔎 Verificando uso de índices em transacoes ({dialeto})")
+
+        falhas = 0
+        with engine.connect() as connection:
+            # Usar ids reais quando existirem para o planner estimar corretamente
+            amostra = connection.execute(text(
+                "SELECT tenant_id, cartao_id, categoria_id FROM transacoes WHERE cartao_id IS NOT NULL LIMIT 1"
+            )).first()
+            tenant_id, cartao_id, categoria_id = amostra if amostra else (1, 1, 1)
+
+            if dialeto == "postgresql":
+                # Em tabelas pequenas o planner prefere seq scan; aqui queremos saber se o índice é utilizável
+                connection.execute(text("SET enable_seqscan = off"))
+
+            for nome, consulta, indice_esperado in consultas_quentes(tenant_id, cartao_id, categoria_id):
+                sql = str(consulta.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+                prefixo = "EXPLAIN QUERY PLAN " if dialeto == "sqlite" else "EXPLAIN "
+                plano = "\n".join(
+                    " | ".join(str(coluna) for coluna in linha)
+                    for linha in connection.execute(text(prefixo + sql)).all()
+                )
+
+                if indice_esperado in plano:
+                    logger.info(f"✅ {nome}: usa {indice_esperado}")
+                else:
+                    falhas += 1
+                    logger.warning(f"❌ {nome}: {indice_esperado} não aparece no plano")
+                logger.info(f"   Plano:\n{plano}")
+
+        if falhas:
+            logger.warning(f"🔶 {falhas} consulta(s) sem o índice esperado - aplique migrations/add_indices_transacoes.sql")
+            sys.exit(1)
+
+        logger.info("🎉 Todas as consultas quentes usam os índices compostos")
+        sys.exit(0)
+
+    except Exception as e:
+        logger.error(f"💥 Erro ao verificar índices: {e}")
+        logger.exception("Stack trace completo:")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()